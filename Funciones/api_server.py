@@ -0,0 +1,372 @@
+# Funciones/api_server.py
+#
+# API HTTP de solo lectura (JSON y PDF) para que otras herramientas del campus usen los mismos datos
+# que la app sin pasar por la interfaz de Streamlit. Comparte con la app la caché de ofertas, la de
+# carreras y la de artefactos, así que una consulta hecha desde cualquiera de las dos sirve a la otra.
+#
+#   GET /api/opciones                                 ciclos y centros del formulario de SIIAU
+#   GET /api/carreras?cup=D                           carreras de un centro
+#   GET /api/oferta?ciclo=&cup=&carrera=              oferta procesada; filtros opcionales:
+#       &materia=texto &nrc=1,2 &dia=Lunes &desde=07:00 &hasta=13:00
+#   GET /api/cruces?ciclo=&cup=&carrera=&nrcs=1,2,3   cruces entre los NRC indicados
+#   GET /api/horario.pdf?ciclo=&cup=&carrera=&nrcs=   horario en PDF (también /api/horario.xlsx)
+#
+# Todas las respuestas llevan ETag; con If-None-Match se responde 304 sin volver a generar el cuerpo.
+#
+# Uso: python -m Funciones.api_server --puerto 8080 [--hilos 16]
+
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import requests
+from Funciones import siiau_client, form_handler, offer_cache
+from Funciones.form_handler import build_post_data, parse_form_options, obtener_carreras
+from Funciones.offer_cache import obtener_oferta, clave_consulta
+from Funciones.data_processing import process_data_from_web
+from Funciones.section_index import IndiceSecciones
+from Funciones.snapshot import minutos_de_horas, COLUMNA_INICIO, COLUMNA_FIN
+from Funciones.utils import crear_clases_desde_dataframe, detectar_cruces
+from Funciones.schedule import create_schedule_sheet, create_schedule_pdf
+from Funciones.excel_export import exportar_horario_excel
+from Funciones.artifact_cache import huella_horario, obtener_artefacto
+
+API_HILOS = int(os.environ.get("API_HILOS", 16))
+API_MAX_OFERTAS = int(os.environ.get("API_MAX_OFERTAS", 32))  # Ofertas procesadas que se guardan en memoria
+OPCIONES_TTL = int(os.environ.get("OPCIONES_TTL", 3600))       # segundos
+TAMANO_MINIMO_GZIP = 1024
+JSON = "application/json; charset=utf-8"
+
+logger = logging.getLogger(__name__)
+
+class ErrorAPI(Exception):
+    """Error con el código HTTP que debe devolverse al cliente."""
+
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+# Ofertas procesadas e indexadas: clave de consulta -> (IndiceSecciones, momento de la carga)
+_ofertas = OrderedDict()
+_cargando = {}  # clave -> Lock, para no procesar dos veces la misma oferta a la vez
+_lock = threading.Lock()
+_opciones = None  # (opciones del formulario, momento de la descarga)
+
+def obtener_opciones(ttl=None):
+    """Opciones del formulario de SIIAU (ciclos y centros), guardadas `ttl` segundos."""
+    global _opciones
+    ttl = OPCIONES_TTL if ttl is None else ttl
+    if _opciones is not None and time.time() - _opciones[1] <= ttl:
+        return _opciones[0]
+    opciones = parse_form_options(siiau_client.get(form_handler.FORM_URL).text)
+    _opciones = (opciones, time.time())
+    return opciones
+
+def descripcion_ciclo(ciclo):
+    """Texto del ciclo para los horarios (ej. "Calendario 25 B"); si no se puede obtener, el propio valor."""
+    try:
+        opciones = obtener_opciones()
+    except requests.exceptions.RequestException:
+        return ciclo
+    return next((o["description"] for o in opciones.get("ciclop", []) if o["value"] == ciclo), ciclo)
+
+def obtener_indice(ciclo, cup, carrera):
+    """
+    Oferta procesada e indexada de una carrera. Se consulta a través de la caché de ofertas compartida
+    con la app y se guarda ya procesada en memoria mientras siga vigente en esa caché.
+    """
+    post_data = build_post_data({"ciclop": {"value": ciclo}, "cup": {"value": cup}, "majrp": {"value": carrera}})
+    clave = clave_consulta(post_data)
+    with _lock:
+        entrada = _ofertas.get(clave)
+        if entrada is not None and time.time() - entrada[1] <= offer_cache.CACHE_TTL:
+            _ofertas.move_to_end(clave)
+            return entrada[0]
+        cargando = _cargando.setdefault(clave, threading.Lock())
+
+    with cargando:
+        with _lock:
+            entrada = _ofertas.get(clave)
+        if entrada is not None and time.time() - entrada[1] <= offer_cache.CACHE_TTL:
+            return entrada[0]
+
+        try:
+            tabla = obtener_oferta(form_handler.POST_URL, post_data)
+            if tabla is None:
+                raise ErrorAPI(502, "No se pudo obtener la oferta de SIIAU")
+            oferta = process_data_from_web(tabla) if not tabla.empty else tabla
+            if oferta.empty:
+                raise ErrorAPI(404, f"No hay oferta para {ciclo}/{cup}/{carrera}")
+            # Minutos de inicio y fin para filtrar por hora (y que create_schedule_sheet no vuelva a calcularlos)
+            inicio, fin = minutos_de_horas(oferta["Hora"])
+            oferta[COLUMNA_INICIO] = inicio.to_numpy(zero_copy_only=False)
+            oferta[COLUMNA_FIN] = fin.to_numpy(zero_copy_only=False)
+            indice = IndiceSecciones(oferta)
+
+            with _lock:
+                _ofertas[clave] = (indice, time.time())
+                _ofertas.move_to_end(clave)
+                while len(_ofertas) > API_MAX_OFERTAS:
+                    _ofertas.popitem(last=False)
+            return indice
+        finally:
+            with _lock:
+                _cargando.pop(clave, None)
+
+def _parametro(consulta, nombre, obligatorio=True):
+    valor = consulta.get(nombre, [""])[0].strip()
+    if obligatorio and not valor:
+        raise ErrorAPI(400, f"Falta el parámetro '{nombre}'")
+    return valor
+
+def _lista(consulta, nombre):
+    return [v for valor in consulta.get(nombre, []) for v in valor.split(",") if v.strip()]
+
+def _minutos_24h(texto, nombre):
+    partes = texto.split(":")
+    # Solo dígitos (sin signo ni espacios) y dentro de rango: 00:00 a 23:59
+    if len(partes) != 2 or not all(parte.isascii() and parte.isdigit() and len(parte) <= 2 for parte in partes):
+        raise ErrorAPI(400, f"'{nombre}' debe tener el formato HH:MM (24 h)")
+    horas, minutos = int(partes[0]), int(partes[1])
+    if horas > 23 or minutos > 59:
+        raise ErrorAPI(400, f"'{nombre}' no es una hora válida: {texto} (de 00:00 a 23:59)")
+    return horas * 60 + minutos
+
+def _etag(*partes):
+    return '"' + hashlib.sha256("\x1f".join(str(p) for p in partes).encode("utf-8")).hexdigest()[:32] + '"'
+
+def _oferta_de_consulta(consulta):
+    return obtener_indice(_parametro(consulta, "ciclo"), _parametro(consulta, "cup"), _parametro(consulta, "carrera"))
+
+def _nrcs_de_consulta(indice, consulta):
+    nrcs, faltantes = indice.buscar_nrcs(_lista(consulta, "nrcs"))
+    if faltantes:
+        raise ErrorAPI(404, f"NRC que no están en la oferta: {', '.join(faltantes)}")
+    if not nrcs:
+        raise ErrorAPI(400, "Falta el parámetro 'nrcs'")
+    return sorted(set(nrcs), key=str)
+
+def _filtrar_oferta(indice, consulta):
+    df = indice.df
+    mascara = np.ones(len(df), dtype=bool)
+    materia = _parametro(consulta, "materia", obligatorio=False)
+    if materia:
+        mascara &= df["Materia"].astype(str).str.contains(materia, case=False, regex=False).to_numpy()
+    nrcs = _lista(consulta, "nrc")
+    if nrcs:
+        encontrados, _ = indice.buscar_nrcs(nrcs)
+        mascara &= df["NRC"].isin(encontrados).to_numpy()
+    dia = _parametro(consulta, "dia", obligatorio=False)
+    if dia:
+        mascara &= (df["Días"].astype(str).str.lower() == dia.lower()).to_numpy()
+    desde = _parametro(consulta, "desde", obligatorio=False)
+    if desde:
+        mascara &= df[COLUMNA_INICIO].to_numpy() >= _minutos_24h(desde, "desde")
+    hasta = _parametro(consulta, "hasta", obligatorio=False)
+    if hasta:
+        fin = df[COLUMNA_FIN].to_numpy()
+        mascara &= (fin >= 0) & (fin <= _minutos_24h(hasta, "hasta"))
+    return df.loc[mascara, [c for c in df.columns if c not in (COLUMNA_INICIO, COLUMNA_FIN)]]
+
+# Cada ruta devuelve (etag, función que genera (tipo de contenido, cuerpo)). El ETag se calcula antes
+# que el cuerpo para poder responder 304 sin serializar la oferta ni generar el PDF.
+
+def _ruta_opciones(consulta):
+    opciones = obtener_opciones()
+    cuerpo = json.dumps(opciones, ensure_ascii=False).encode("utf-8")
+    return _etag(cuerpo), lambda: (JSON, cuerpo)
+
+def _ruta_carreras(consulta):
+    carreras = obtener_carreras(_parametro(consulta, "cup"))
+    if carreras is None:
+        raise ErrorAPI(404, "SIIAU no devolvió la lista de carreras")
+    cuerpo = json.dumps(carreras, ensure_ascii=False).encode("utf-8")
+    return _etag(cuerpo), lambda: (JSON, cuerpo)
+
+def _ruta_oferta(consulta):
+    indice = _oferta_de_consulta(consulta)
+    filtros = sorted((k, v) for k, valores in consulta.items() for v in valores)
+    generar = lambda: (JSON, _filtrar_oferta(indice, consulta).to_json(
+        orient="records", force_ascii=False).encode("utf-8"))
+    return _etag("oferta", indice.version, filtros), generar
+
+def _ruta_cruces(consulta):
+    indice = _oferta_de_consulta(consulta)
+    nrcs = _nrcs_de_consulta(indice, consulta)
+
+    def generar():
+        cruces = detectar_cruces(crear_clases_desde_dataframe(indice.filas(nrcs)))
+        datos = {
+            "nrcs": [str(nrc) for nrc in nrcs],
+            "cruces": [
+                {"dia": dia, "nrcs": [str(c1.nrc), str(c2.nrc)], "materias": [c1.materia, c2.materia],
+                 "hora": f"{c1.hora_inicio} - {c1.hora_fin}"}
+                for dia, pares in cruces.items() for c1, c2 in pares
+            ],
+        }
+        return JSON, json.dumps(datos, ensure_ascii=False).encode("utf-8")
+    return _etag("cruces", indice.version, nrcs), generar
+
+def _ruta_horario(tipo):
+    def ruta(consulta):
+        indice = _oferta_de_consulta(consulta)
+        nrcs = _nrcs_de_consulta(indice, consulta)
+        ciclo = _parametro(consulta, "descripcion", obligatorio=False) or descripcion_ciclo(_parametro(consulta, "ciclo"))
+        huella = huella_horario(nrcs, ciclo, indice.version)
+
+        def generar():
+            # Mismas claves que la pestaña 3: un horario generado aquí o en la app se genera una sola vez
+            if tipo == "pdf":
+                datos = obtener_artefacto(huella, "pdf", lambda: create_schedule_pdf(
+                    create_schedule_sheet(indice.filas(nrcs)), ciclo).getvalue())
+                return "application/pdf", datos
+            datos = obtener_artefacto(huella, "horario.xlsx", lambda: exportar_horario_excel(
+                create_schedule_sheet(indice.filas(nrcs)), ciclo, sesiones=indice.filas(nrcs)))
+            return "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", datos
+        return f'"{huella[:32]}"', generar
+    return ruta
+
+RUTAS = {
+    "/api/opciones": _ruta_opciones,
+    "/api/carreras": _ruta_carreras,
+    "/api/oferta": _ruta_oferta,
+    "/api/cruces": _ruta_cruces,
+    "/api/horario.pdf": _ruta_horario("pdf"),
+    "/api/horario.xlsx": _ruta_horario("xlsx"),
+}
+
+def _coincide_etag(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidatos = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidatos or any(c.removeprefix("W/") == etag for c in candidatos)
+
+class Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = 30  # Cierra las conexiones persistentes que quedan inactivas
+
+    def log_message(self, *args):
+        pass
+
+    def _enviar(self, estado, tipo=None, cuerpo=b"", etag=None):
+        self.send_response(estado)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")  # Se puede guardar, pero revalidando con el ETag
+        if tipo:
+            self.send_header("Content-Type", tipo)
+        if (cuerpo and len(cuerpo) >= TAMANO_MINIMO_GZIP and tipo != "application/pdf"
+                and "gzip" in self.headers.get("Accept-Encoding", "")):
+            cuerpo = gzip.compress(cuerpo, compresslevel=5)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        if cuerpo and self.command != "HEAD":
+            self.wfile.write(cuerpo)
+
+    def _error(self, estado, mensaje):
+        cuerpo = json.dumps({"error": mensaje}, ensure_ascii=False).encode("utf-8")
+        self._enviar(estado, JSON, cuerpo)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        ruta = RUTAS.get(url.path.rstrip("/"))
+        if ruta is None:
+            self._error(404, f"Ruta desconocida: {url.path}")
+            return
+        try:
+            # Solo la generación ocupa un turno; el envío a clientes lentos no bloquea a los demás
+            with self.server.turnos:
+                respuesta = self._atender(ruta, parse_qs(url.query))
+        except ErrorAPI as e:
+            self._error(e.estado, str(e))
+            return
+        except requests.exceptions.RequestException as e:
+            self._error(502, f"Error al consultar SIIAU: {e}")
+            return
+        except Exception:
+            logger.exception(f"Error en {self.path}")
+            self._error(500, "Error interno")
+            return
+        self._enviar(*respuesta)
+
+    def _atender(self, ruta, consulta):
+        """Devuelve los argumentos de _enviar: 304 si el cliente ya tiene esa versión, o el cuerpo generado."""
+        etag, generar = ruta(consulta)
+        if _coincide_etag(self.headers.get("If-None-Match"), etag):
+            return 304, None, b"", etag
+        tipo, cuerpo = generar()
+        if not cuerpo:
+            raise ErrorAPI(500, "No se pudo generar la respuesta")
+        return 200, tipo, cuerpo, etag
+
+    do_HEAD = do_GET
+
+
+class _ServidorHTTP(ThreadingHTTPServer):
+    """
+    Un hilo por conexión (las conexiones persistentes inactivas solo esperan), pero como mucho `hilos`
+    peticiones trabajando a la vez: las demás esperan turno en lugar de competir por la CPU y por SIIAU.
+    """
+    daemon_threads = True
+
+    def __init__(self, direccion, hilos):
+        super().__init__(direccion, Manejador)
+        self.turnos = threading.BoundedSemaphore(hilos)
+
+class ServidorAPI:
+    """Servidor de la API en un hilo aparte (para pruebas o para arrancarlo junto a otra aplicación)."""
+
+    def __init__(self, puerto=0, host="127.0.0.1", hilos=None):
+        self._servidor = _ServidorHTTP((host, puerto), hilos or API_HILOS)
+        self._hilo = None
+
+    @property
+    def url(self):
+        host, puerto = self._servidor.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self.url
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.detener()
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP de ofertas, cruces y horarios.")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--hilos", type=int, default=API_HILOS, help="Peticiones procesadas a la vez")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    servidor = ServidorAPI(args.puerto, args.host, args.hilos)
+    print(f"API en {servidor.url}/api/opciones")
+    try:
+        servidor._servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor._servidor.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# Funciones/artifact_cache.py
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from Funciones.session_store import escribir_atomico
+
+# Caché de archivos generados (PDF, Excel, JSON) direccionada por contenido y compartida entre sesiones:
+# dos estudiantes con los mismos NRC del mismo ciclo y la misma oferta reciben los mismos bytes,
+# generados una sola vez. Primero se busca en memoria (LRU acotada) y luego en disco (también acotado).
+ARTEFACTOS_DIR = os.environ.get("ARTEFACTOS_DIR", os.path.join(".cache", "artefactos"))
+MAX_BYTES_MEMORIA = int(os.environ.get("ARTEFACTOS_MAX_MEMORIA", 64 * 1024 * 1024))
+MAX_BYTES_DISCO = int(os.environ.get("ARTEFACTOS_MAX_DISCO", 512 * 1024 * 1024))
+DESALOJO_HASTA = 0.9  # Al pasar del límite de disco se baja hasta esta fracción: no hay un recorrido por escritura
+
+_memoria = OrderedDict()  # (huella, tipo) -> bytes, del menos al más recientemente usado
+_bytes_memoria = 0
+_lock = threading.Lock()
+_generando = {}           # (huella, tipo) -> [Lock, usuarios], para no generar dos veces el mismo artefacto a la vez
+_bytes_disco = {}         # carpeta -> bytes en disco según este proceso (se recalcula al desalojar)
+_estadisticas = {"aciertos_memoria": 0, "aciertos_disco": 0, "fallos": 0}
+
+def huella_horario(nrcs, ciclo, version_oferta):
+    """Huella de un horario: NRC ordenados, ciclo y versión de la oferta de la que salen sus datos."""
+    contenido = json.dumps(
+        {"nrcs": sorted(str(nrc) for nrc in nrcs), "ciclo": ciclo, "oferta": version_oferta},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+def _ruta(huella, tipo):
+    return os.path.join(ARTEFACTOS_DIR, huella[:2], f"{huella}.{tipo}")
+
+def _contar(evento):
+    with _lock:
+        _estadisticas[evento] += 1
+
+def _guardar_en_memoria(clave, datos, max_bytes):
+    global _bytes_memoria
+    with _lock:
+        anterior = _memoria.pop(clave, None)
+        if anterior is not None:
+            _bytes_memoria -= len(anterior)
+        if len(datos) > max_bytes:
+            return
+        _memoria[clave] = datos
+        _bytes_memoria += len(datos)
+        while _bytes_memoria > max_bytes:
+            _, desalojado = _memoria.popitem(last=False)
+            _bytes_memoria -= len(desalojado)
+
+def _leer_de_disco(ruta):
+    try:
+        with open(ruta, "rb") as f:
+            datos = f.read()
+        os.utime(ruta)  # La fecha de modificación hace de "último uso" para el desalojo en disco
+        return datos
+    except OSError:
+        return None
+
+def _guardar_en_disco(ruta, datos, max_bytes):
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        try:
+            anterior = os.path.getsize(ruta)
+        except OSError:
+            anterior = 0
+        escribir_atomico(ruta, lambda f: f.write(datos))
+        # El total se lleva sumando lo que se escribe: solo se recorre la carpeta (O(archivos)) la primera vez
+        # y cuando el total pasa del límite. Otros procesos también escriben en ella; el recorrido del
+        # desalojo corrige el total con lo que haya de verdad
+        with _lock:
+            total = _bytes_disco.get(ARTEFACTOS_DIR)
+            if total is not None:
+                total = _bytes_disco[ARTEFACTOS_DIR] = total + len(datos) - anterior
+        if total is None or total > max_bytes:
+            _desalojar_disco(max_bytes)
+    except OSError as e:
+        print(f"Error al guardar el artefacto en disco: {e}")
+
+def _desalojar_disco(max_bytes):
+    """
+    Recorre la carpeta y, si pasa de `max_bytes`, borra los artefactos usados hace más tiempo hasta quedar en
+    DESALOJO_HASTA del límite. Deja anotado el total resultante.
+    """
+    archivos = []
+    total = 0
+    for raiz, _, nombres in os.walk(ARTEFACTOS_DIR):
+        for nombre in nombres:
+            if nombre.startswith(".") or nombre.endswith(".lock"):
+                continue
+            ruta = os.path.join(raiz, nombre)
+            try:
+                estado = os.stat(ruta)
+            except OSError:
+                continue
+            archivos.append((estado.st_mtime, estado.st_size, ruta))
+            total += estado.st_size
+    if total > max_bytes:
+        total = _borrar_antiguos(archivos, total, max_bytes * DESALOJO_HASTA)
+    with _lock:
+        _bytes_disco[ARTEFACTOS_DIR] = total
+
+def _borrar_antiguos(archivos, total, max_bytes):
+    """Borra los archivos [(mtime, tamaño, ruta)] del más antiguo al más reciente hasta quedar en `max_bytes`."""
+    for _, tamano, ruta in sorted(archivos):
+        try:
+            os.remove(ruta)
+            if os.path.exists(ruta + ".lock"):
+                os.remove(ruta + ".lock")
+        except OSError:
+            continue
+        total -= tamano
+        if total <= max_bytes:
+            break
+    return total
+
+def obtener_artefacto(huella, tipo, generar, max_bytes_memoria=None, max_bytes_disco=None):
+    """
+    Devuelve los bytes del artefacto `tipo` ("pdf", "xlsx", "json"...) del horario con esa huella.
+    Si no está en memoria ni en disco se llama a `generar()` (que debe devolver bytes) y se guarda.
+    """
+    max_bytes_memoria = MAX_BYTES_MEMORIA if max_bytes_memoria is None else max_bytes_memoria
+    max_bytes_disco = MAX_BYTES_DISCO if max_bytes_disco is None else max_bytes_disco
+    clave = (huella, tipo)
+
+    with _lock:
+        datos = _memoria.get(clave)
+        if datos is not None:
+            _memoria.move_to_end(clave)
+            _estadisticas["aciertos_memoria"] += 1
+            return datos
+        # Cada llamada que espera el lock lo cuenta: la entrada solo se quita cuando ya nadie lo usa, para que
+        # una petición posterior no cree otro lock y genere a la vez que la que sigue en curso
+        entrada = _generando.get(clave)
+        if entrada is None:
+            entrada = _generando[clave] = [threading.Lock(), 0]
+        entrada[1] += 1
+
+    try:
+        with entrada[0]:
+            # Otra sesión pudo haberlo generado mientras se esperaba
+            with _lock:
+                datos = _memoria.get(clave)
+            if datos is not None:
+                _contar("aciertos_memoria")
+                return datos
+
+            ruta = _ruta(huella, tipo)
+            datos = _leer_de_disco(ruta)
+            if datos is not None:
+                _contar("aciertos_disco")
+            else:
+                _contar("fallos")
+                datos = generar()
+                if not datos:
+                    return datos  # Una generación fallida (por ejemplo, un PDF vacío) no se guarda
+                _guardar_en_disco(ruta, datos, max_bytes_disco)
+            _guardar_en_memoria(clave, datos, max_bytes_memoria)
+            return datos
+    finally:
+        with _lock:
+            entrada[1] -= 1
+            if entrada[1] == 0 and _generando.get(clave) is entrada:
+                del _generando[clave]
+
+def estadisticas_artefactos():
+    """Contadores de aciertos y fallos de la caché y su ocupación en memoria."""
+    with _lock:
+        estadisticas = dict(_estadisticas)
+        estadisticas["entradas_memoria"] = len(_memoria)
+        estadisticas["bytes_memoria"] = _bytes_memoria
+    consultas = estadisticas["aciertos_memoria"] + estadisticas["aciertos_disco"] + estadisticas["fallos"]
+    aciertos = estadisticas["aciertos_memoria"] + estadisticas["aciertos_disco"]
+    estadisticas["tasa_aciertos"] = aciertos / consultas if consultas else 0.0
+    return estadisticas
+
+def vaciar_memoria():
+    """Vacía la parte en memoria de la caché (la de disco se conserva)."""
+    global _bytes_memoria
+    with _lock:
+        _memoria.clear()
+        _bytes_memoria = 0
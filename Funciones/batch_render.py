@@ -0,0 +1,153 @@
+# Funciones/batch_render.py
+#
+# Renderizado de muchos horarios a PDF en paralelo (por ejemplo, todas las opciones del generador
+# automático o los horarios de un grupo completo). El maquetado de ReportLab es CPU puro, así que se
+# reparte entre procesos; cada proceso prepara una sola vez sus estilos y los reutiliza en cada documento.
+#
+# Los procesos no se crean con "fork": el servidor de Streamlit tiene muchos hilos y un hijo copiado a mitad
+# de camino hereda los locks que otro hilo tenía tomados (el de stage_timing, que @etapa usa en cada PDF),
+# y puede quedarse bloqueado para siempre. Con "forkserver" los trabajadores salen de un proceso limpio, sin
+# hilos, que solo importó este módulo y __main__; donde no existe (Windows) se usa "spawn". Todo lo que
+# ejecutan los trabajadores vive en este módulo, así que se puede importar desde un proceso nuevo.
+
+import io
+import os
+import zipfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from Funciones.schedule import create_schedule_pdf, create_schedules_pdf, pdf_styles
+
+PROCESOS_RENDER = int(os.environ.get("PROCESOS_RENDER", min(4, os.cpu_count() or 1)))
+
+_pool = None
+_procesos_pool = 0  # Trabajadores del pool creado (el tamaño configurado, no un atributo interno del pool)
+_lock_pool = threading.Lock()  # Dos sesiones que piden el pool a la vez no deben crear dos
+
+def _pdf_writer():
+    """PdfWriter de pypdf, importado la primera vez que se unen varios PDF. None si no está instalado."""
+    try:
+        from pypdf import PdfWriter
+    except ImportError:  # Sin pypdf el PDF de varias páginas se arma en un solo proceso
+        return None
+    return PdfWriter
+
+def _inicializar_trabajador():
+    """Se ejecuta una vez por proceso: deja construidos los estilos que usarán todos sus documentos."""
+    pdf_styles()
+
+def _renderizar_lote(horarios, ciclos, multipagina):
+    if multipagina:
+        return create_schedules_pdf(horarios, ciclos)
+    pdfs = []
+    for horario, ciclo in zip(horarios, ciclos):
+        pdf = create_schedule_pdf(horario, ciclo).getvalue()
+        if not pdf:
+            raise ValueError("No se pudo generar el PDF de un horario")
+        pdfs.append(pdf)
+    return pdfs
+
+def contexto_procesos():
+    """
+    Contexto de multiprocessing para los pools de procesos (este y el de Funciones.cli): "forkserver" si
+    existe, si no "spawn". Nunca "fork" (ver el comentario del inicio del módulo).
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        contexto = multiprocessing.get_context("forkserver")
+        # El servidor de procesos carga una vez __main__ (el ejecutable de streamlit, no la app; o
+        # Funciones.cli) y ReportLab; los trabajadores los heredan ya importados
+        contexto.set_forkserver_preload(["__main__", __name__])
+        return contexto
+    return multiprocessing.get_context("spawn")
+
+def obtener_pool(procesos=None):
+    """
+    Pool de procesos compartido; se crea la primera vez para no pagar el arranque en cada lote.
+    `procesos` (PROCESOS_RENDER por defecto) solo cuenta al crearlo: si el pool ya existe se devuelve tal cual.
+    """
+    global _pool, _procesos_pool
+    with _lock_pool:
+        if _pool is None:
+            _procesos_pool = procesos or PROCESOS_RENDER
+            _pool = ProcessPoolExecutor(
+                max_workers=_procesos_pool,
+                mp_context=contexto_procesos(),
+                initializer=_inicializar_trabajador,
+            )
+        return _pool
+
+def cerrar_pool(pool=None):
+    """Cierra el pool compartido. Con `pool`, solo si sigue siendo ese (otra sesión pudo haberlo reemplazado)."""
+    global _pool, _procesos_pool
+    with _lock_pool:
+        if _pool is None or (pool is not None and _pool is not pool):
+            return
+        cerrado, _pool, _procesos_pool = _pool, None, 0
+    cerrado.shutdown()
+
+def _lotes(total, num_lotes):
+    """Parte range(total) en `num_lotes` tramos contiguos de tamaño parecido."""
+    num_lotes = max(1, min(total, num_lotes))
+    base, resto = divmod(total, num_lotes)
+    inicio = 0
+    for i in range(num_lotes):
+        fin = inicio + base + (1 if i < resto else 0)
+        yield inicio, fin
+        inicio = fin
+
+def _renderizar_tramos(horarios, ciclos, multipagina, un_tramo):
+    pool = obtener_pool()
+    # Varios lotes por proceso para repartir bien la carga sin enviar un DataFrame por tarea
+    tramos = [(0, len(horarios))] if un_tramo else list(_lotes(len(horarios), _procesos_pool * 2))
+    try:
+        futuros = [pool.submit(_renderizar_lote, horarios[inicio:fin], ciclos[inicio:fin], multipagina)
+                   for inicio, fin in tramos]
+        return [futuro.result() for futuro in futuros]
+    except BrokenProcessPool:
+        # Un trabajador murió (por ejemplo, por falta de memoria): el pool ya no sirve y se descarta
+        cerrar_pool(pool)
+        raise
+
+def renderizar_pdfs(horarios, ciclo, formato="zip", nombres=None):
+    """
+    Renderiza una lista de horarios (DataFrames de create_schedule_sheet) en paralelo.
+
+    - `ciclo`: texto del ciclo, o una lista con uno por horario.
+    - `formato`: "zip" devuelve un ZIP con un PDF por horario; "pdf", un solo PDF con una página por horario.
+    - `nombres`: nombres de los archivos dentro del ZIP (por defecto horario_1.pdf, horario_2.pdf...).
+    Devuelve los bytes del archivo resultante.
+    """
+    if formato not in ("zip", "pdf"):
+        raise ValueError(f"Formato no soportado: {formato}")
+    horarios = list(horarios)
+    ciclos = list(ciclo) if isinstance(ciclo, (list, tuple)) else [ciclo] * len(horarios)
+    if not horarios:
+        raise ValueError("No hay horarios para renderizar")
+
+    multipagina = formato == "pdf"
+    PdfWriter = _pdf_writer() if multipagina else None
+    un_tramo = multipagina and PdfWriter is None
+    try:
+        resultados = _renderizar_tramos(horarios, ciclos, multipagina, un_tramo)
+    except BrokenProcessPool:
+        # Se reintenta una vez con un pool nuevo; si vuelve a fallar, el error llega a quien llamó
+        resultados = _renderizar_tramos(horarios, ciclos, multipagina, un_tramo)
+
+    if multipagina:
+        if len(resultados) == 1:
+            return resultados[0]
+        escritor = PdfWriter()
+        for pdf in resultados:
+            escritor.append(io.BytesIO(pdf))
+        salida = io.BytesIO()
+        escritor.write(salida)
+        return salida.getvalue()
+
+    nombres = nombres or [f"horario_{i + 1}.pdf" for i in range(len(horarios))]
+    salida = io.BytesIO()
+    # Los PDF ya van comprimidos por dentro: se guardan sin volver a comprimir
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_STORED) as zf:
+        for nombre, pdf in zip(nombres, (pdf for lote in resultados for pdf in lote)):
+            zf.writestr(nombre, pdf)
+    return salida.getvalue()
@@ -0,0 +1,185 @@
+# Funciones/bulk_ingest.py
+#
+# Descarga masiva de la oferta de un ciclo completo (todos los centros y carreras), pensada para
+# ejecutarse de noche y dejar la caché de ofertas caliente antes de las horas pico de registro.
+#
+# Uso: python -m Funciones.bulk_ingest --ciclo 202520 [--centros A,D] [--hilos 8] [--rps 4]
+
+import os
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import pandas as pd
+import requests
+from Funciones import siiau_client
+from Funciones.form_handler import FORM_URL, POST_URL, build_post_data, parse_form_options, parse_carreras, carreras_url
+from Funciones.data_processing import extract_table_data_stream
+from Funciones.offer_cache import guardar_en_cache
+from Funciones.snapshot import guardar_snapshot, leer_tabla, metadatos_snapshot, tabla_a_dataframe
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOTS_DIR = os.environ.get("SNAPSHOTS_DIR", os.path.join(".cache", "snapshots"))
+TTL_PRECARGA = 24 * 3600  # Las ofertas precargadas siguen vigentes hasta la siguiente ejecución nocturna
+
+class LimitadorTasa:
+    """Cubeta de fichas por host: como mucho `por_segundo` peticiones por segundo, con ráfagas de `rafaga`."""
+
+    def __init__(self, por_segundo, rafaga=1):
+        self.por_segundo = por_segundo
+        self.rafaga = rafaga
+        self._fichas = {}
+        self._lock = threading.Lock()
+
+    def esperar(self, host):
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                fichas, ultima = self._fichas.get(host, (self.rafaga, ahora))
+                fichas = min(self.rafaga, fichas + (ahora - ultima) * self.por_segundo)
+                if fichas >= 1:
+                    self._fichas[host] = (fichas - 1, ahora)
+                    return
+                self._fichas[host] = (fichas, ahora)
+                espera = (1 - fichas) / self.por_segundo
+            time.sleep(espera)
+
+class Rastreador:
+    def __init__(self, hilos=8, por_segundo=4.0, timeout=(5, 60)):
+        self.sesion = siiau_client.crear_sesion(conexiones=hilos, reintentos=4)
+        self.limitador = LimitadorTasa(por_segundo, rafaga=max(1, int(por_segundo)))
+        self.timeout = timeout
+        self.hilos = hilos
+
+    def _peticion(self, metodo, url, **kwargs):
+        self.limitador.esperar(requests.utils.urlparse(url).netloc)
+        return siiau_client.peticion(metodo, url, timeout=self.timeout, sesion=self.sesion, **kwargs)
+
+    def opciones_formulario(self):
+        return parse_form_options(self._peticion("GET", FORM_URL).text)
+
+    def carreras(self, cup):
+        return parse_carreras(self._peticion("GET", carreras_url(cup)).text) or {}
+
+    def oferta_html(self, post_data):
+        response = self._peticion("POST", POST_URL, data=post_data)
+        return response.content, response.encoding
+
+def _parsear(contenido, encoding):
+    """Se ejecuta en un proceso aparte: el parseo es lo que más CPU consume."""
+    return pd.DataFrame(extract_table_data_stream([contenido], encoding))
+
+def ingerir_ciclo(ciclo, centros=None, hilos=8, por_segundo=4.0, procesos=None, salida=None, ttl=TTL_PRECARGA):
+    """
+    Descarga la oferta de todas las carreras de todos los centros de `ciclo` y la guarda:
+    cada consulta en la caché de ofertas (para que la app no tenga que ir a SIIAU) y todo junto
+    en un snapshot consolidado con un índice (centro, carrera) -> rango de filas.
+    Devuelve la ruta del snapshot.
+    """
+    rastreador = Rastreador(hilos, por_segundo)
+    opciones = rastreador.opciones_formulario()
+    ciclos = {opcion["value"]: opcion["description"] for opcion in opciones.get("ciclop", [])}
+    if ciclo not in ciclos:
+        raise ValueError(f"El ciclo {ciclo} no aparece en el formulario de SIIAU")
+    cups = [opcion for opcion in opciones.get("cup", []) if not centros or opcion["value"] in centros]
+
+    # 1. Carreras de cada centro
+    consultas = []
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        futuros = {pool.submit(rastreador.carreras, cup["value"]): cup for cup in cups}
+        for futuro in as_completed(futuros):
+            cup = futuros[futuro]
+            try:
+                for majrp, descripcion in futuro.result().items():
+                    consultas.append({
+                        "ciclop": {"value": ciclo, "description": ciclos[ciclo]},
+                        "cup": cup,
+                        "majrp": {"value": majrp, "description": descripcion},
+                    })
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error(f"No se pudieron obtener las carreras del centro {cup['value']}: {e}")
+    logger.info(f"{len(consultas)} consultas de oferta para el ciclo {ciclo} en {len(cups)} centros")
+
+    # 2. Descarga concurrente (hilos) y parseo en paralelo (procesos)
+    ofertas = []
+    errores = 0
+    with ThreadPoolExecutor(max_workers=hilos) as descargas, ProcessPoolExecutor(max_workers=procesos) as parseo:
+        futuros = {descargas.submit(rastreador.oferta_html, build_post_data(c)): c for c in consultas}
+        parseos = {}
+        for futuro in as_completed(futuros):
+            consulta = futuros[futuro]
+            try:
+                contenido, encoding = futuro.result()
+            except requests.exceptions.RequestException as e:
+                errores += 1
+                logger.error(f"Error al descargar {consulta['cup']['value']}/{consulta['majrp']['value']}: {e}")
+                continue
+            parseos[parseo.submit(_parsear, contenido, encoding)] = consulta
+
+        for futuro in as_completed(parseos):
+            consulta = parseos[futuro]
+            try:
+                df = futuro.result()
+            except Exception as e:
+                errores += 1
+                logger.error(f"Error al parsear {consulta['cup']['value']}/{consulta['majrp']['value']}: {e}")
+                continue
+            if df.empty:
+                continue
+            guardar_en_cache(build_post_data(consulta), df, ttl=ttl)
+            ofertas.append((consulta["cup"]["value"], consulta["majrp"]["value"], df))
+
+    # 3. Snapshot consolidado, ordenado por (centro, carrera) para que el índice sean rangos contiguos
+    ofertas.sort(key=lambda oferta: (oferta[0], oferta[1]))
+    indice = {}
+    inicio = 0
+    for cup, majrp, df in ofertas:
+        indice[f"{cup}|{majrp}"] = [inicio, inicio + len(df)]
+        inicio += len(df)
+    if ofertas:
+        consolidado = pd.concat(
+            [df.assign(Centro=cup, Carrera=majrp) for cup, majrp, df in ofertas], ignore_index=True
+        )
+    else:
+        consolidado = pd.DataFrame(columns=["Centro", "Carrera"])
+    salida = salida or os.path.join(SNAPSHOTS_DIR, f"oferta_{ciclo}.arrow")
+    guardar_snapshot(consolidado, salida, metadatos={
+        "ciclo": ciclo,
+        "descripcion_ciclo": ciclos[ciclo],
+        "generado": time.time(),
+        "indice": indice,
+    })
+    logger.info(f"Snapshot {salida}: {len(consolidado)} filas, {len(indice)} carreras, {errores} errores")
+    return salida
+
+def oferta_de_snapshot(ruta, cup, majrp, categoricas=True):
+    """
+    Devuelve las filas de una carrera de un snapshot consolidado usando su índice, sin leer el resto.
+    Con categoricas=False las columnas quedan como texto, igual que la oferta que devuelve obtener_oferta.
+    """
+    rango = metadatos_snapshot(ruta).get("indice", {}).get(f"{cup}|{majrp}")
+    if rango is None:
+        return None
+    inicio, fin = rango
+    tabla = leer_tabla(ruta).slice(inicio, fin - inicio).drop_columns(["Centro", "Carrera"])
+    return tabla_a_dataframe(tabla, categoricas)
+
+def main():
+    parser = argparse.ArgumentParser(description="Descarga la oferta completa de un ciclo de SIIAU.")
+    parser.add_argument("--ciclo", required=True, help="Valor de ciclop (ej. 202520)")
+    parser.add_argument("--centros", help="Lista de centros separados por coma (por defecto, todos)")
+    parser.add_argument("--hilos", type=int, default=8, help="Descargas simultáneas")
+    parser.add_argument("--rps", type=float, default=4.0, help="Peticiones por segundo por host")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos para parsear (por defecto, núcleos)")
+    parser.add_argument("--salida", help="Ruta del snapshot consolidado")
+    parser.add_argument("--ttl", type=int, default=TTL_PRECARGA, help="Vigencia en caché de cada oferta (s)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    centros = set(args.centros.split(",")) if args.centros else None
+    ingerir_ciclo(args.ciclo, centros, args.hilos, args.rps, args.procesos, args.salida, args.ttl)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# Funciones/cli.py
+#
+# Modo por lotes sin interfaz: consulta -> horario para todo un grupo de estudiantes.
+# Lee un archivo JSONL con una solicitud por línea, por ejemplo:
+#   {"id": "219000001", "ciclo": "202520", "cup": "D", "carrera": "INCO", "nrcs": [123456, 123457]}
+# y por cada una deja en la carpeta de salida su PDF (y opcionalmente su Excel) junto con una línea
+# en resultados.jsonl con los NRC encontrados, los faltantes y los cruces detectados.
+#
+# Uso: python -m Funciones.cli solicitudes.jsonl --salida lote/ [--snapshot .cache/snapshots/oferta_202520.arrow]
+#
+# Con --snapshot (generado por Funciones.bulk_ingest) no se usa la red: la oferta de cada carrera se lee
+# del snapshot consolidado. Sin él, cada oferta se consulta una sola vez en SIIAU (a través de la caché).
+
+import os
+import re
+import sys
+import json
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import requests
+from Funciones import siiau_client
+from Funciones.form_handler import FORM_URL, POST_URL, build_post_data, parse_form_options
+from Funciones.offer_cache import obtener_oferta
+from Funciones.data_processing import process_data_from_web
+from Funciones.bulk_ingest import oferta_de_snapshot
+from Funciones.snapshot import metadatos_snapshot
+from Funciones.section_index import IndiceSecciones
+from Funciones.utils import crear_clases_desde_dataframe, detectar_cruces
+from Funciones.schedule import create_schedule_sheet, create_schedule_pdf
+from Funciones.excel_export import exportar_horario_excel
+from Funciones.batch_render import contexto_procesos
+from Funciones.session_store import escribir_atomico
+
+logger = logging.getLogger(__name__)
+
+RESULTADOS = "resultados.jsonl"
+# El id de cada solicitud es el nombre de su carpeta de salida: sin rutas ni caracteres especiales
+PATRON_ID = re.compile(r"[A-Za-z0-9_-]+")
+
+# Ofertas procesadas e indexadas del lote: (ciclo, cup, carrera) -> IndiceSecciones.
+# Se llenan en el proceso principal antes de crear el pool; cada trabajador recibe una copia al arrancar
+# (_inicializar_trabajador), así que no dependen de heredarlas con fork.
+_ofertas = {}
+_descripciones_ciclo = {}
+
+def leer_solicitudes(ruta):
+    """Lee el JSONL de solicitudes. Las líneas vacías se ignoran; las inválidas detienen el lote."""
+    solicitudes = []
+    with open(ruta, encoding="utf-8") as f:
+        for numero, linea in enumerate(f, start=1):
+            if not linea.strip():
+                continue
+            try:
+                solicitud = json.loads(linea)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Línea {numero}: JSON inválido ({e})")
+            faltantes = [campo for campo in ("ciclo", "cup", "carrera", "nrcs") if campo not in solicitud]
+            if faltantes:
+                raise ValueError(f"Línea {numero}: faltan los campos {', '.join(faltantes)}")
+            solicitud.setdefault("id", str(numero))
+            solicitudes.append(solicitud)
+    validar_ids(solicitudes)
+    return solicitudes
+
+def validar_ids(solicitudes):
+    """
+    Comprueba que cada id sirva como nombre de carpeta dentro de la salida y que no se repita
+    (dos solicitudes con el mismo id escribirían en la misma carpeta). Lanza ValueError si no.
+    """
+    vistos = set()
+    for solicitud in solicitudes:
+        id_solicitud = str(solicitud["id"])
+        if not PATRON_ID.fullmatch(id_solicitud):
+            raise ValueError(f"Id inválido {id_solicitud!r}: solo se admiten letras, dígitos, '_' y '-'")
+        if id_solicitud in vistos:
+            raise ValueError(f"Id repetido: {id_solicitud}")
+        vistos.add(id_solicitud)
+
+def _clave_oferta(solicitud):
+    return (str(solicitud["ciclo"]), str(solicitud["cup"]), str(solicitud["carrera"]))
+
+def _snapshots_por_ciclo(rutas):
+    """Relaciona cada ciclo con su snapshot consolidado según los metadatos que guardó bulk_ingest."""
+    snapshots = {}
+    for ruta in rutas:
+        metadatos = metadatos_snapshot(ruta)
+        ciclo = str(metadatos.get("ciclo", ""))
+        if not ciclo:
+            raise ValueError(f"El snapshot {ruta} no indica su ciclo")
+        snapshots[ciclo] = ruta
+        if metadatos.get("descripcion_ciclo"):
+            _descripciones_ciclo[ciclo] = metadatos["descripcion_ciclo"]
+    return snapshots
+
+def _descargar_descripciones():
+    """Descripción de cada ciclo (ej. "Calendario 25 B") tal como aparece en el formulario de SIIAU."""
+    try:
+        opciones = parse_form_options(siiau_client.get(FORM_URL).text)
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"No se pudieron obtener las descripciones de los ciclos: {e}")
+        return
+    for opcion in opciones.get("ciclop", []):
+        _descripciones_ciclo.setdefault(opcion["value"], opcion["description"])
+
+def _cargar_oferta(clave, snapshots):
+    """Oferta cruda de una carrera: del snapshot si se indicó, o de SIIAU (con caché) si no."""
+    ciclo, cup, carrera = clave
+    if snapshots is not None:
+        if ciclo not in snapshots:
+            raise ValueError(f"No hay snapshot para el ciclo {ciclo}")
+        tabla = oferta_de_snapshot(snapshots[ciclo], cup, carrera, categoricas=False)
+        if tabla is None:
+            raise ValueError(f"La carrera {cup}/{carrera} no está en el snapshot del ciclo {ciclo}")
+        return tabla
+    post_data = build_post_data({
+        "ciclop": {"value": ciclo}, "cup": {"value": cup}, "majrp": {"value": carrera}
+    })
+    return obtener_oferta(POST_URL, post_data)
+
+def cargar_ofertas(claves, snapshots=None, hilos=4):
+    """
+    Carga, procesa e indexa una sola vez cada oferta distinta del lote.
+    Devuelve {clave: mensaje de error} con las que no se pudieron cargar.
+    """
+    errores = {}
+
+    def cargar(clave):
+        try:
+            tabla = _cargar_oferta(clave, snapshots)
+            if tabla is None or tabla.empty:
+                raise ValueError("La consulta no devolvió oferta")
+            oferta = process_data_from_web(tabla)
+            if oferta.empty:
+                raise ValueError("No se pudo procesar la oferta")
+            _ofertas[clave] = IndiceSecciones(oferta)
+        except (requests.exceptions.RequestException, ValueError, OSError) as e:
+            errores[clave] = str(e)
+            logger.error(f"Oferta {'/'.join(clave)}: {e}")
+
+    # La descarga es E/S (varias a la vez); desde snapshot cada lectura es casi inmediata
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        list(pool.map(cargar, claves))
+    return errores
+
+def _inicializar_trabajador(ofertas, descripciones):
+    """Se ejecuta una vez en cada proceso del pool: deja las ofertas del lote y las descripciones de ciclo."""
+    _ofertas.update(ofertas)
+    _descripciones_ciclo.update(descripciones)
+
+def procesar_solicitud(solicitud, salida, excel=False):
+    """
+    Genera el horario de una solicitud. Se ejecuta en los procesos del pool; usa las ofertas del lote.
+    Devuelve el registro de resultados.jsonl (nunca lanza: los errores quedan en el registro).
+    """
+    resultado = {"id": solicitud["id"], "ok": False}
+    try:
+        clave = _clave_oferta(solicitud)
+        indice = _ofertas.get(clave)
+        if indice is None:
+            raise ValueError(f"No hay oferta para {'/'.join(clave)}")
+        nrcs, faltantes = indice.buscar_nrcs(solicitud["nrcs"])
+        resultado["nrcs"] = [str(nrc) for nrc in nrcs]
+        resultado["faltantes"] = [str(nrc) for nrc in faltantes]
+        if not nrcs:
+            raise ValueError("Ninguno de los NRC está en la oferta")
+
+        filas = indice.filas(nrcs)
+        cruces = detectar_cruces(crear_clases_desde_dataframe(filas))
+        resultado["materias"] = sorted({indice.secciones[nrc].materia for nrc in nrcs})
+        resultado["cruces"] = [
+            {"dia": dia, "nrcs": [str(clase1.nrc), str(clase2.nrc)], "materias": [clase1.materia, clase2.materia],
+             "hora": f"{clase1.hora_inicio} - {clase1.hora_fin}"}
+            for dia, pares in cruces.items() for clase1, clase2 in pares
+        ]
+
+        ciclo = solicitud.get("descripcion_ciclo") or _descripciones_ciclo.get(clave[0], clave[0])
+        hoja = create_schedule_sheet(filas)
+        carpeta = os.path.join(salida, str(solicitud["id"]))
+        os.makedirs(carpeta, exist_ok=True)
+        archivos = []
+
+        pdf = create_schedule_pdf(hoja, ciclo).getvalue()
+        if not pdf:
+            raise ValueError("No se pudo generar el PDF")
+        archivos.append(_escribir(carpeta, "horario.pdf", pdf))
+        if excel:
+            archivos.append(_escribir(carpeta, "horario.xlsx", exportar_horario_excel(hoja, ciclo, sesiones=filas)))
+
+        resultado["archivos"] = archivos
+        resultado["ok"] = True
+    except Exception as e:
+        resultado["error"] = str(e)
+    return resultado
+
+def _escribir(carpeta, nombre, datos):
+    ruta = os.path.join(carpeta, nombre)
+    escribir_atomico(ruta, lambda f: f.write(datos))
+    return ruta
+
+def procesar_lote(solicitudes, salida, snapshots=None, procesos=None, hilos=4, excel=False):
+    """
+    Procesa todas las solicitudes y escribe resultados.jsonl en `salida` (en el orden de entrada).
+    `snapshots`: rutas de snapshots consolidados; si se indican, el lote no usa la red.
+    Devuelve la lista de resultados. Lanza ValueError si algún id no es válido o está repetido.
+    """
+    validar_ids(solicitudes)
+    os.makedirs(salida, exist_ok=True)
+    por_ciclo = _snapshots_por_ciclo(snapshots) if snapshots else None
+    if por_ciclo is None:
+        _descargar_descripciones()
+
+    claves = list(dict.fromkeys(_clave_oferta(s) for s in solicitudes))
+    errores = cargar_ofertas(claves, por_ciclo, hilos)
+    logger.info(f"{len(solicitudes)} solicitudes, {len(claves)} ofertas distintas, {len(errores)} sin cargar")
+
+    # Las ofertas se envían una sola vez a cada proceso al arrancarlo, no con cada solicitud
+    procesos = procesos or os.cpu_count() or 1
+    tamano_bloque = max(1, len(solicitudes) // (procesos * 4))
+    ofertas = {clave: _ofertas[clave] for clave in claves if clave in _ofertas}
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto_procesos(),
+                             initializer=_inicializar_trabajador, initargs=(ofertas, _descripciones_ciclo)) as pool:
+        resultados = list(pool.map(
+            procesar_solicitud, solicitudes, [salida] * len(solicitudes), [excel] * len(solicitudes),
+            chunksize=tamano_bloque
+        ))
+
+    for solicitud, resultado in zip(solicitudes, resultados):
+        if not resultado["ok"] and _clave_oferta(solicitud) in errores:
+            resultado["error"] = errores[_clave_oferta(solicitud)]
+    contenido = "".join(json.dumps(resultado, ensure_ascii=False) + "\n" for resultado in resultados)
+    escribir_atomico(os.path.join(salida, RESULTADOS), lambda f: f.write(contenido.encode("utf-8")))
+    return resultados
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera los horarios de un lote de solicitudes (JSONL).")
+    parser.add_argument("solicitudes", help="Archivo JSONL con ciclo, cup, carrera y nrcs por línea")
+    parser.add_argument("--salida", required=True, help="Carpeta donde se escriben los horarios y resultados.jsonl")
+    parser.add_argument("--snapshot", action="append",
+                        help="Snapshot consolidado de un ciclo (se puede repetir); con él no se usa la red")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos para generar horarios (por defecto, núcleos)")
+    parser.add_argument("--hilos", type=int, default=4, help="Consultas de oferta simultáneas")
+    parser.add_argument("--excel", action="store_true", help="Genera también el Excel de cada horario")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        solicitudes = leer_solicitudes(args.solicitudes)
+    except (OSError, ValueError) as e:
+        logger.error(f"No se pudieron leer las solicitudes: {e}")
+        return 1
+    resultados = procesar_lote(solicitudes, args.salida, args.snapshot, args.procesos, args.hilos, args.excel)
+    correctos = sum(resultado["ok"] for resultado in resultados)
+    logger.info(f"{correctos}/{len(resultados)} horarios generados en {args.salida}")
+    return 0 if correctos == len(resultados) else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,27 @@
 # data_processing.py
 
 from bs4 import BeautifulSoup
+from lxml import etree
 import pandas as pd
 import requests
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from Funciones import siiau_client
 from Funciones.utils import clean_days
+from Funciones.snapshot import guardar_snapshot, cargar_snapshot, COLUMNA_INICIO, COLUMNA_FIN
+from Funciones.stage_timing import etapa
+
+# Motor para leer el HTML de la oferta: "lxml" (por fragmentos) o "bs4" (árbol completo con html.parser)
+PARSER_OFERTA = os.environ.get("PARSER_OFERTA", "lxml")
+
+COLUMNAS_OFERTA = [
+    "NRC", "Clave", "Materia", "Sec", "CR", "CUP", "DIS",
+    "Sesión", "Hora", "Días", "Edificio", "Aula", "Periodo", "Ses", "Profesor"
+]
+
+# Un solo hilo para las escrituras en disco: se hacen en orden y sin bloquear la interfaz
+_persistencia = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persistencia")
 
 def process_subtable(subtable, row_data, column_name):
     rows = subtable.find_all("tr")
@@ -81,13 +97,111 @@ def extract_table_data(soup):
 
     return rows
 
-def fetch_table_data(post_url, post_data):
+def _texto(elemento):
+    """Equivalente en lxml de get_text(strip=True)."""
+    if len(elemento) == 0:
+        return (elemento.text or "").strip()
+    return "".join(texto.strip() for texto in elemento.itertext())
+
+def _filas_subtabla(tabla):
+    filas = []
+    for tr in tabla.iter("tr"):
+        cols = [_texto(td) for td in tr.iter("td")]
+        if cols:
+            filas.append(cols)
+    return filas
+
+def _agregar_fila(tr, columnas):
+    """Agrega a `columnas` las filas que extract_table_data generaría para este <tr>."""
+    cells = list(tr.iter("td"))
+    if len(cells) < 8:
+        return
+
+    base = [_texto(cell) for cell in cells[:7]]
+    session_table = next(cells[7].iter("table"), None)
+    if session_table is None:
+        return
+    sesiones = _filas_subtabla(session_table)
+    professor_table = session_table.xpath("following::table[1]")
+    profesores = _filas_subtabla(professor_table[0]) if professor_table else []
+    if not profesores:
+        return
+
+    # extract_table_data agrega la misma fila una vez por profesor y todas quedan con los datos del último
+    ultimo = profesores[-1]
+    ses_profesor = [ultimo[0], " | ".join(ultimo[1:])]
+    for sesion in sesiones:
+        valores = base + (sesion + [""] * 6)[:6] + ses_profesor
+        for _ in profesores:
+            for columna, valor in zip(COLUMNAS_OFERTA, valores):
+                columnas[columna].append(valor)
+
+def extract_table_data_stream(chunks, encoding=None):
+    """
+    Lee el HTML de la oferta por fragmentos de bytes con lxml y devuelve las filas como columnas.
+
+    Produce las mismas filas que extract_table_data, pero cada fila de la tabla principal se procesa
+    en cuanto el parser la cierra y después se libera, así que nunca se construye el árbol completo.
+    """
+    parser = etree.HTMLPullParser(events=("start", "end"), tag=("table", "tr"), encoding=encoding)
+    columnas = {columna: [] for columna in COLUMNAS_OFERTA}
+    estado = {"tabla": None, "filas": 0, "terminada": False}
+
+    def procesar_eventos():
+        for evento, elemento in parser.read_events():
+            if estado["terminada"]:
+                return
+            if elemento.tag == "table":
+                if evento == "start" and estado["tabla"] is None and elemento.get("border") == "1":
+                    estado["tabla"] = elemento
+                elif evento == "end" and elemento is estado["tabla"]:
+                    estado["terminada"] = True
+                continue
+            if estado["tabla"] is None or next(elemento.iterancestors("table"), None) is not estado["tabla"]:
+                continue
+            if evento == "start":
+                estado["filas"] += 1
+                continue
+            # Las dos primeras filas de la tabla son encabezados
+            if estado["filas"] > 2:
+                try:
+                    _agregar_fila(elemento, columnas)
+                except Exception as e:
+                    raise Exception(f"Error procesando una fila de la tabla: {e}")
+            elemento.clear()
+            while elemento.getprevious() is not None:
+                del elemento.getparent()[0]
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        procesar_eventos()
+        if estado["terminada"]:
+            break
+    else:
+        parser.close()
+        procesar_eventos()
+
+    if estado["tabla"] is None:
+        raise ValueError("No se encontró la tabla de la oferta académica en la respuesta")
+    return columnas
+
+def fetch_table_data(post_url, post_data, parser=None):
+    parser = parser or PARSER_OFERTA
     try:
-        response = requests.post(post_url, data=post_data, timeout=10)
-        response.raise_for_status()  # Lanza una excepción para códigos de estado HTTP erróneos (4xx o 5xx)
-        soup = BeautifulSoup(response.text, "html.parser")
-        rows = extract_table_data(soup)
-        return pd.DataFrame(rows)
+        if parser == "bs4":
+            with etapa("siiau.consulta_oferta"):
+                response = siiau_client.post(post_url, data=post_data)
+            with etapa("parseo_html", parser="bs4"):
+                soup = BeautifulSoup(response.text, "html.parser")
+                rows = extract_table_data(soup)
+                return pd.DataFrame(rows)
+
+        # En modo por fragmentos la consulta mide hasta las cabeceras; el resto de la descarga va con el parseo
+        with etapa("siiau.consulta_oferta"):
+            response = siiau_client.post(post_url, data=post_data, stream=True)
+        with response, etapa("parseo_html", parser="lxml"):
+            columnas = extract_table_data_stream(response.iter_content(chunk_size=64 * 1024), response.encoding)
+            return pd.DataFrame(columnas)
     except requests.exceptions.RequestException as e:
         print(f"Error al obtener los datos: {e}")
         return None
@@ -107,24 +221,58 @@ def parse_time_range(time_string):
     except (ValueError, AttributeError): #Capturar el error si time_string es None
         return time_string
 
-def process_data_from_web(df, nombre_archivo="datos.json"):
+def _tipar_columnas(df):
     """
-    Procesa los datos de la web, los guarda en un archivo JSON y devuelve un DataFrame.
+    Convierte a número las columnas cuyo contenido es completamente numérico (NRC, Sesión...),
+    con la misma inferencia que aplicaba pd.read_json al releer el archivo.
     """
-    try:
-        df = filter_relevant_columns(df)
-        df.columns = ["NRC", "Materia", "Sección", "Sesión", "Hora", "Días", "Edificio", "Aula", "Profesor"]
-        df.loc[:, "Días"] = df["Días"].apply(clean_days)
-        df.loc[:, "Hora"] = df["Hora"].apply(parse_time_range)
-        expanded_data = df.explode("Días").reset_index(drop=True)
+    for columna in df.columns:
+        try:
+            numeros = pd.to_numeric(df[columna])
+        except (ValueError, TypeError):
+            continue
+        if numeros.notna().all() and (numeros % 1 == 0).all():
+            numeros = numeros.astype("int64")
+        df[columna] = numeros
+    return df
 
-        processed_data = expanded_data.to_dict(orient='records')
+def guardar_oferta_async(df, nombre_archivo):
+    """Guarda la oferta como snapshot columnar en segundo plano. Devuelve un Future con el resultado."""
+    futuro = _persistencia.submit(guardar_snapshot, df, nombre_archivo)
+    futuro.add_done_callback(
+        lambda f: f.exception() and print(f"Error al guardar la oferta en {nombre_archivo}: {f.exception()}")
+    )
+    return futuro
 
-        with open(nombre_archivo, 'w', encoding='utf-8') as f:
-            json.dump(processed_data, f, ensure_ascii=False, indent=4)
+def cargar_oferta(nombre_archivo):
+    """
+    Carga una oferta guardada con guardar_oferta_async. Devuelve None si no existe.
+    Queda igual que la de process_data_from_web: columnas de texto (no categóricas, que se ordenarían por
+    orden de aparición y no alfabéticamente) y sin las columnas auxiliares de minutos del snapshot.
+    """
+    try:
+        df = cargar_snapshot(nombre_archivo, categoricas=False)
+    except FileNotFoundError:
+        return None
+    return df.drop(columns=[COLUMNA_INICIO, COLUMNA_FIN], errors="ignore")
+
+@etapa("process_data_from_web")
+def process_data_from_web(df, nombre_archivo=None):
+    """
+    Procesa los datos de la web y devuelve directamente el DataFrame tipado.
+    Si se indica `nombre_archivo`, la oferta también se guarda en disco (snapshot columnar) en segundo plano.
+    """
+    try:
+        df = filter_relevant_columns(df).copy()
+        df.columns = ["NRC", "Materia", "Sección", "Sesión", "Hora", "Días", "Edificio", "Aula", "Profesor"]
+        # Hay pocos valores distintos de días y horas, así que se convierten una sola vez cada uno
+        df["Días"] = df["Días"].map({valor: clean_days(valor) for valor in df["Días"].unique()})
+        df["Hora"] = df["Hora"].map({valor: parse_time_range(valor) for valor in df["Hora"].unique()})
+        expanded_data = _tipar_columnas(df.explode("Días").reset_index(drop=True))
 
-        df_from_json = pd.read_json(nombre_archivo, encoding='utf-8')
-        return df_from_json
+        if nombre_archivo:
+            guardar_oferta_async(expanded_data, nombre_archivo)
+        return expanded_data
 
     except (KeyError, TypeError, AttributeError, ValueError) as e:
         print(f"Error al procesar los datos: {e}")
@@ -156,9 +304,9 @@ def cargar_datos_desde_json(nombre_archivo="datos.json"):
         print(f"Error al cargar datos desde JSON: {e}")
         return {}
 
-def guardar_datos_local(data):
+def guardar_datos_local(data, nombre_archivo="datos.json"):
     try:
-        with open('datos.json', 'w', encoding='utf-8') as f:
+        with open(nombre_archivo, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=4)
     except Exception as e:
         print(f"Error al guardar datos localmente: {e}")
\ No newline at end of file
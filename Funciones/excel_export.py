@@ -0,0 +1,201 @@
+# Funciones/excel_export.py
+#
+# Exportación a Excel escrita directamente con xlsxwriter en modo constant_memory: cada fila se vuelca
+# al archivo temporal de su hoja en cuanto se pasa a la siguiente, así que el libro no se guarda completo
+# en memoria aunque incluya la oferta entera de un centro (decenas de miles de filas).
+
+import io
+import pandas as pd
+import xlsxwriter
+from Funciones.schedule import INSTITUTION_NAME, vertical_spans
+
+# Colores de relleno por materia, en el orden en que aparecen en el horario
+COLORES_MATERIAS = [
+    "#DCE9F7", "#E2F0D9", "#FFF2CC", "#FCE4D6", "#EADCF4",
+    "#D9F2F0", "#F8DCE8", "#EDEDED", "#E6F4C8", "#FDE9C9",
+]
+COLOR_CRUCE = "#F4B6B6"
+COLUMNAS_OMITIDAS = ("InicioMin", "FinMin")  # Columnas internas de los snapshots
+
+ANCHO_HORA = 20
+ANCHO_DIA = 28
+ALTO_FILA = 48
+
+# Versiones de xlsxwriter en las que se probó la combinación manual de celdas de _escribir_cuadricula,
+# que usa la lista interna `Worksheet.merge`. Con cualquier otra versión las clases de varias horas se
+# escriben sin combinar (texto en la primera celda y el resto en blanco con el mismo color).
+VERSIONES_MERGE_MANUAL = ((3, 0), (4, 0))
+
+def _version(texto):
+    partes = []
+    for parte in texto.split(".")[:2]:
+        if not parte.isdigit():
+            break
+        partes.append(int(parte))
+    return tuple(partes)
+
+def _merge_manual_disponible(hoja):
+    desde, hasta = VERSIONES_MERGE_MANUAL
+    return desde <= _version(xlsxwriter.__version__) < hasta and isinstance(getattr(hoja, "merge", None), list)
+
+def _formatos(libro):
+    """Formatos fijos del libro; los de cada materia se crean al vuelo en _formato_materia."""
+    celda = {"border": 1, "text_wrap": True, "valign": "vcenter", "font_size": 9}
+    return {
+        "titulo": libro.add_format({"bold": True, "font_size": 14, "align": "center", "valign": "vcenter"}),
+        "subtitulo": libro.add_format({"italic": True, "align": "center", "valign": "vcenter"}),
+        "encabezado": libro.add_format({
+            "bold": True, "bg_color": "#D3D3D3", "border": 1, "align": "center", "valign": "vcenter"
+        }),
+        "hora": libro.add_format({"border": 1, "align": "center", "valign": "vcenter", "font_size": 9}),
+        "vacia": libro.add_format({"border": 1}),
+        "cruce": libro.add_format({**celda, "bg_color": COLOR_CRUCE}),
+        "celda": celda,
+        "materias": {},
+    }
+
+def _formato_materia(libro, formatos, materia):
+    materias = formatos["materias"]
+    formato = materias.get(materia)
+    if formato is None:
+        color = COLORES_MATERIAS[len(materias) % len(COLORES_MATERIAS)]
+        formato = materias[materia] = libro.add_format({**formatos["celda"], "bg_color": color})
+    return formato
+
+def _vacia(valor):
+    return valor is None or (not isinstance(valor, str) and pd.isna(valor)) or str(valor).strip() == ""
+
+def _escribir_cuadricula(libro, formatos, schedule, ciclo=None):
+    """
+    Hoja "Horario": la semana como cuadrícula (horas x días) con una celda combinada por cada clase
+    que dura varias horas. Las horas sin clases se omiten, igual que en el PDF.
+    """
+    hoja = libro.add_worksheet("Horario")
+    column_names = list(schedule.columns)
+    dias = [c for c in column_names if c != "Hora"]
+    grid = schedule.to_numpy(dtype=object).tolist()
+
+    # El sábado solo se incluye si tiene alguna clase
+    if "Sábado" in dias and all(_vacia(row[column_names.index("Sábado")]) for row in grid):
+        dias.remove("Sábado")
+    grid = [row for row in grid if not all(_vacia(x) for x in row[1:])]
+
+    columnas = []
+    for dia in dias:
+        k = column_names.index(dia)
+        columnas.append([None if _vacia(row[k]) else str(row[k]) for row in grid])
+    # Tramos de celdas iguales: (columna, fila de inicio) -> fila de fin, con la numeración de vertical_spans
+    # (fila 0 = encabezado, columna 0 = hora)
+    tramos = {
+        (j, inicio): fin
+        for (j, inicio), (_, fin) in vertical_spans(columnas)
+        if columnas[j - 1][inicio - 1] is not None
+    }
+
+    primera_fila = 3  # Título, subtítulo y encabezado
+    ultima_columna = len(dias)
+    hoja.set_column(0, 0, ANCHO_HORA)
+    hoja.set_column(1, ultima_columna, ANCHO_DIA)
+    hoja.freeze_panes(primera_fila, 1)
+    hoja.set_landscape()
+    hoja.fit_to_pages(1, 1)
+
+    hoja.merge_range(0, 0, 0, ultima_columna, INSTITUTION_NAME, formatos["titulo"])
+    hoja.merge_range(1, 0, 1, ultima_columna,
+                     f"Horario de Clases - {ciclo}" if ciclo else "Horario de Clases", formatos["subtitulo"])
+    hoja.write_row(2, 0, ["Hora"] + dias, formatos["encabezado"])
+
+    # En constant_memory las filas se escriben en orden y no se puede volver a una fila ya volcada.
+    # merge_range escribe en todas las filas del rango (y rechaza rangos que empiezan en una fila ya volcada),
+    # así que las combinaciones verticales se arman a mano: la celda superior lleva el texto, las demás van
+    # en blanco con el mismo formato y, al llegar a la última, el rango se añade a la lista de celdas
+    # combinadas de la hoja, que xlsxwriter escribe al cerrar el libro. Esa lista no es API pública: solo se
+    # usa con las versiones probadas (VERSIONES_MERGE_MANUAL).
+    combinar = _merge_manual_disponible(hoja)
+    hora_index = column_names.index("Hora")
+    abiertos = {}  # columna -> (fila de inicio, fila de fin, formato) del tramo en curso
+    for i, row in enumerate(grid, start=1):
+        fila = primera_fila + i - 1
+        hoja.set_row(fila, ALTO_FILA)
+        hoja.write_string(fila, 0, str(row[hora_index]), formatos["hora"])
+        for j, columna in enumerate(columnas, start=1):
+            texto = columna[i - 1]
+            if j in abiertos:
+                inicio, fin, formato = abiertos[j]
+                hoja.write_blank(fila, j, None, formato)
+                if i == fin:
+                    if combinar:
+                        hoja.merge.append([primera_fila + inicio - 1, j, fila, j])
+                    del abiertos[j]
+                continue
+            if texto is None:
+                hoja.write_blank(fila, j, None, formatos["vacia"])
+                continue
+            lineas = texto.split("\n")
+            # Más de una clase en la misma celda (tres líneas por clase) es un cruce
+            formato = formatos["cruce"] if len(lineas) > 3 else _formato_materia(libro, formatos, lineas[0])
+            hoja.write_string(fila, j, texto, formato)
+            fin = tramos.get((j, i))
+            if fin is not None:
+                abiertos[j] = (i, fin, formato)
+    return hoja
+
+def _valores_columna(serie):
+    """Valores de una columna como tipos de Python que xlsxwriter escribe directamente (None = celda vacía)."""
+    if pd.api.types.is_numeric_dtype(serie) and not serie.isna().any():
+        return serie.tolist()
+    valores = serie.astype(object)
+    return valores.where(valores.notna(), None).tolist()
+
+def escribir_tabla(libro, formatos, nombre, df, anchos=None):
+    """
+    Escribe un DataFrame como hoja plana, fila por fila y sin pasar por pandas.to_excel.
+    Cada columna se convierte una sola vez a lista de Python; después solo se recorren tuplas.
+    """
+    hoja = libro.add_worksheet(nombre)
+    columnas = [c for c in df.columns if c not in COLUMNAS_OMITIDAS]
+    for k, columna in enumerate(columnas):
+        hoja.set_column(k, k, (anchos or {}).get(columna, max(10, min(40, len(str(columna)) + 4))))
+    hoja.write_row(0, 0, [str(c) for c in columnas], formatos["encabezado"])
+    hoja.freeze_panes(1, 0)
+    if not columnas or df.empty:
+        return hoja
+    hoja.autofilter(0, 0, len(df), len(columnas) - 1)
+
+    write_row = hoja.write_row
+    for fila, valores in enumerate(zip(*(_valores_columna(df[c]) for c in columnas)), start=1):
+        write_row(fila, 0, valores)
+    return hoja
+
+ANCHOS_OFERTA = {"NRC": 9, "Materia": 40, "Sección": 9, "Sesión": 8, "Hora": 20, "Días": 11,
+                 "Edificio": 10, "Aula": 8, "Profesor": 36}
+
+def exportar_horario_excel(schedule, ciclo=None, sesiones=None, alternativas=None, oferta=None):
+    """
+    Devuelve un libro de Excel (bytes) con el horario como cuadrícula semanal y, opcionalmente:
+    - `sesiones`: filas de la oferta de los NRC del horario (hoja "Sesiones").
+    - `alternativas`: lista de horarios del generador automático, cada uno {materia: nrc} (hoja "Alternativas").
+    - `oferta`: la oferta completa consultada (hoja "Oferta").
+    """
+    buffer = io.BytesIO()
+    # Los textos de SIIAU se escriben tal cual: sin convertir a fórmulas ni a hipervínculos
+    libro = xlsxwriter.Workbook(buffer, {
+        "constant_memory": True, "strings_to_formulas": False, "strings_to_urls": False
+    })
+    formatos = _formatos(libro)
+
+    _escribir_cuadricula(libro, formatos, schedule, ciclo)
+    if sesiones is not None:
+        escribir_tabla(libro, formatos, "Sesiones", sesiones, ANCHOS_OFERTA)
+    if alternativas:
+        materias = list(dict.fromkeys(m for horario in alternativas for m in horario))
+        tabla = pd.DataFrame(
+            [[i + 1] + [horario.get(m) for m in materias] for i, horario in enumerate(alternativas)],
+            columns=["Opción"] + materias
+        )
+        escribir_tabla(libro, formatos, "Alternativas", tabla, {m: 16 for m in materias})
+    if oferta is not None:
+        escribir_tabla(libro, formatos, "Oferta", oferta, ANCHOS_OFERTA)
+
+    libro.close()
+    return buffer.getvalue()
@@ -1,15 +1,27 @@
 # form_handler.py
 
+import os
 import re
+import time
+import threading
 import requests
 import pandas as pd
 import streamlit as st
 from io import StringIO
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from Funciones import siiau_client
 
-# URLs
-FORM_URL = "https://siiauescolar.siiau.udg.mx/wal/sspseca.forma_consulta"
-POST_URL = "https://siiauescolar.siiau.udg.mx/wal/sspseca.consulta_oferta"
+# URLs (el servidor se configura con SIIAU_BASE_URL en siiau_client)
+FORM_URL = siiau_client.BASE_URL + siiau_client.RUTA_FORMULARIO
+POST_URL = siiau_client.BASE_URL + siiau_client.RUTA_OFERTA
+
+# Caché de carreras por centro (compartida por todas las sesiones del proceso)
+CARRERAS_TTL = int(os.environ.get("CARRERAS_TTL", 12 * 3600))  # segundos
+_carreras = {}   # cup -> (diccionario de carreras o None, momento de la descarga)
+_en_curso = {}   # cup -> Future de la descarga en marcha
+_lock_carreras = threading.Lock()
+_pool_carreras = ThreadPoolExecutor(max_workers=8, thread_name_prefix="carreras")
 
 # Función para construir el cuerpo de la solicitud POST
 def build_post_data(selected_options):
@@ -27,58 +39,119 @@ def build_post_data(selected_options):
         "ordenp": "0"
     }
 
+def parse_form_options(html):
+    """Extrae las opciones de ciclo y centro (con su descripción) del HTML del formulario de consulta."""
+    soup = BeautifulSoup(html, "html.parser")
+    important_fields = ["ciclop", "cup"]
+    options_data = {}
+
+    for field_name in important_fields:
+        select_tag = soup.find("select", {"name": field_name})
+        if select_tag:
+            options = []
+            for option in select_tag.find_all("option"):
+                value = option.get("value", "").strip()
+                # Extracción precisa del texto *inmediato* dentro del option
+                text_parts = []
+                for child in option.contents: #Iterar sobre los hijos directos del option
+                    if isinstance(child, str): #Verificar que el hijo sea texto
+                        text_parts.append(child.strip())
+                full_text = " ".join(text_parts).strip()
+                full_text = re.sub(r'\s+', ' ', full_text).strip()
+
+                if value:
+                    parts = full_text.split("-", 1)
+                    if len(parts) == 2:
+                        description = parts[1].strip()
+                    else:
+                        description = full_text.strip()
+
+                    options.append({"value": value, "description": description})
+            options_data[field_name] = options
+    return options_data
+
 def fetch_form_options_with_descriptions(url):
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-        important_fields = ["ciclop", "cup"]
-        options_data = {}
-
-        for field_name in important_fields:
-            select_tag = soup.find("select", {"name": field_name})
-            if select_tag:
-                options = []
-                for option in select_tag.find_all("option"):
-                    value = option.get("value", "").strip()
-                    # Extracción precisa del texto *inmediato* dentro del option
-                    text_parts = []
-                    for child in option.contents: #Iterar sobre los hijos directos del option
-                        if isinstance(child, str): #Verificar que el hijo sea texto
-                            text_parts.append(child.strip())
-                    full_text = " ".join(text_parts).strip()
-                    full_text = re.sub(r'\s+', ' ', full_text).strip()
-
-                    if value:
-                        parts = full_text.split("-", 1)
-                        if len(parts) == 2:
-                            description = parts[1].strip()
-                        else:
-                            description = full_text.strip()
-
-                        options.append({"value": value, "description": description})
-                options_data[field_name] = options
-        return options_data
+        response = siiau_client.get(url)
+        return parse_form_options(response.text)
 
     except requests.exceptions.RequestException as e:
         
         st.markdown("<h4 style='text-align: center;'>SIIAU NO FUNCIONA ＞︿＜</h4>", unsafe_allow_html=True)
-        
-def show_abbreviations(cup_value):
-    """Muestra la tabla de abreviaturas y devuelve un diccionario de carreras."""
-    abrev_url = f"https://siiauescolar.siiau.udg.mx/wal/sspseca.lista_carreras?cup={cup_value}"
+
+def carreras_url(cup_value):
+    return f"{siiau_client.BASE_URL}{siiau_client.RUTA_CARRERAS}?cup={cup_value}"
+
+def parse_carreras(html):
+    """
+    Extrae el diccionario de carreras (clave: abreviatura, valor: descripción) de la página de abreviaturas.
+    Devuelve None si la página no contiene la tabla.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find("table")
+    if not table:
+        return None
+    df = pd.read_html(StringIO(str(table)))[0]
+    return dict(zip(df['CICLO'], df['DESCRIPCION']))
+
+def descargar_carreras(cup_value):
+    """Descarga de SIIAU las carreras de un centro (None si la página no trae la tabla)."""
+    return parse_carreras(siiau_client.get(carreras_url(cup_value)).text)
+
+def _actualizar_carreras(cup_value):
     try:
-        response = requests.get(abrev_url, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
+        carreras = descargar_carreras(cup_value)
+        # Un centro sin tabla de carreras (None) también se guarda, con la misma vigencia, para no volver a
+        # pedir su página en cada rerun; solo los errores de red se reintentan en la siguiente llamada
+        with _lock_carreras:
+            _carreras[cup_value] = (carreras, time.time())
+        return carreras
+    except Exception as e:
+        print(f"Error al descargar las carreras del centro {cup_value}: {e}")
+        raise
+    finally:
+        with _lock_carreras:
+            _en_curso.pop(cup_value, None)
+
+def _programar_descarga(cup_value):
+    """Lanza la descarga en segundo plano si no hay ya una en marcha. Requiere tener _lock_carreras."""
+    futuro = _en_curso.get(cup_value)
+    if futuro is None:
+        futuro = _en_curso[cup_value] = _pool_carreras.submit(_actualizar_carreras, cup_value)
+    return futuro
 
-        table = soup.find("table")
-        if table:
-            html_string = str(table)
-            df = pd.read_html(StringIO(html_string))[0]
+def obtener_carreras(cup_value, ttl=None):
+    """
+    Devuelve las carreras del centro desde la caché. Si la copia tiene más de `ttl` segundos se devuelve
+    igualmente y se actualiza en segundo plano; solo se espera a SIIAU si el centro nunca se ha descargado.
+    """
+    ttl = CARRERAS_TTL if ttl is None else ttl
+    with _lock_carreras:
+        entrada = _carreras.get(cup_value)
+        if entrada is not None:
+            carreras, obtenido = entrada
+            if time.time() - obtenido > ttl:
+                _programar_descarga(cup_value)
+            return carreras
+        futuro = _programar_descarga(cup_value)
+    return futuro.result()
 
-            # Crear diccionario de carreras (clave: abreviatura, valor: descripción)
-            carreras_dict = dict(zip(df['CICLO'], df['DESCRIPCION']))
+def precargar_carreras(cup_values, ttl=None):
+    """Descarga en paralelo y sin bloquear las carreras de los centros que falten o estén vencidos."""
+    ttl = CARRERAS_TTL if ttl is None else ttl
+    ahora = time.time()
+    with _lock_carreras:
+        for cup_value in cup_values:
+            entrada = _carreras.get(cup_value)
+            if entrada is None or ahora - entrada[1] > ttl:
+                _programar_descarga(cup_value)
+
+def show_abbreviations(cup_value):
+    """Muestra la tabla de abreviaturas y devuelve un diccionario de carreras."""
+    try:
+        # Crear diccionario de carreras (clave: abreviatura, valor: descripción)
+        carreras_dict = obtener_carreras(cup_value)
+        if carreras_dict is not None:
             return carreras_dict  # Devolver el diccionario
 
         else:
@@ -0,0 +1,172 @@
+# Funciones/offer_cache.py
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import pyarrow as pa
+from Funciones.data_processing import fetch_table_data
+from Funciones.snapshot import snapshot_a_bytes, snapshot_desde_bytes
+
+# Caché en disco de ofertas ya parseadas (en formato snapshot), compartida por todas las sesiones del servidor
+CACHE_PATH = os.environ.get("OFERTA_CACHE_PATH", os.path.join(".cache", "ofertas.sqlite3"))
+CACHE_TTL = int(os.environ.get("OFERTA_CACHE_TTL", 15 * 60))                       # segundos
+CACHE_MAX_BYTES = int(os.environ.get("OFERTA_CACHE_MAX_BYTES", 200 * 1024 * 1024))  # bytes
+
+_lock = threading.Lock()
+_inicializadas = set()   # (pid, ruta) de las bases en las que este proceso ya creó la tabla
+_conexiones = threading.local()  # Conexiones abiertas por cada hilo: {(pid, ruta): conexión}
+_consultando = {}        # clave -> [Lock, usuarios], para no consultar dos veces a SIIAU la misma oferta a la vez
+
+def clave_consulta(post_data):
+    """Clave estable de una consulta a partir del cuerpo de build_post_data."""
+    return hashlib.sha256(json.dumps(post_data, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _conectar(ruta=None):
+    """
+    Conexión del hilo actual a la caché. Cada hilo abre la suya una sola vez y la reutiliza; la tabla y el
+    modo WAL se preparan solo la primera vez que el proceso usa esa base. La clave lleva el pid para que un
+    proceso hijo (fork) no use la conexión heredada de su padre.
+    """
+    ruta = ruta or CACHE_PATH
+    clave = (os.getpid(), ruta)
+    conexiones = getattr(_conexiones, "por_ruta", None)
+    if conexiones is None:
+        conexiones = _conexiones.por_ruta = {}
+    conn = conexiones.get(clave)
+    if conn is not None:
+        return conn
+
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    conn = sqlite3.connect(ruta, timeout=30, isolation_level=None)
+    try:
+        with _lock:
+            if clave not in _inicializadas:
+                _preparar(conn)
+                _inicializadas.add(clave)
+    except sqlite3.Error:
+        conn.close()
+        raise
+    conexiones[clave] = conn
+    return conn
+
+def _preparar(conn):
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ofertas (
+            clave TEXT PRIMARY KEY,
+            consulta TEXT NOT NULL,
+            datos BLOB NOT NULL,
+            tamano INTEGER NOT NULL,
+            creado REAL NOT NULL,
+            usado REAL NOT NULL,
+            expira REAL
+        )
+    """)
+    # Cachés creadas antes de que cada entrada tuviera su propia expiración
+    if "expira" not in [fila[1] for fila in conn.execute("PRAGMA table_info(ofertas)")]:
+        conn.execute("ALTER TABLE ofertas ADD COLUMN expira REAL")
+
+def obtener_de_cache(post_data, ttl=None, ruta=None):
+    """
+    Devuelve la oferta guardada para la consulta o None si no existe o ya expiró.
+    Una entrada expira en la fecha con la que se guardó o, si se indica `ttl`, `ttl` segundos después de crearse.
+    """
+    clave = clave_consulta(post_data)
+    ahora = time.time()
+    conn = _conectar(ruta)
+    fila = conn.execute("SELECT datos, creado, expira FROM ofertas WHERE clave = ?", (clave,)).fetchone()
+    if fila is None:
+        return None
+    datos, creado, expira = fila
+    if ttl is not None or expira is None:
+        expira = creado + (CACHE_TTL if ttl is None else ttl)
+    if ahora > expira:
+        conn.execute("DELETE FROM ofertas WHERE clave = ?", (clave,))
+        return None
+    try:
+        df = snapshot_desde_bytes(datos, categoricas=False)
+    except (pa.ArrowInvalid, OSError):
+        # Entrada de un formato anterior o dañada: se descarta como si no existiera
+        conn.execute("DELETE FROM ofertas WHERE clave = ?", (clave,))
+        return None
+    conn.execute("UPDATE ofertas SET usado = ? WHERE clave = ?", (ahora, clave))
+    return df
+
+def guardar_en_cache(post_data, df, ttl=None, max_bytes=None, ruta=None):
+    """
+    Guarda la oferta parseada con una vigencia de `ttl` segundos (CACHE_TTL por defecto)
+    y desaloja las menos usadas si la caché supera `max_bytes`.
+    """
+    ttl = CACHE_TTL if ttl is None else ttl
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    datos = snapshot_a_bytes(df)
+    ahora = time.time()
+    conn = _conectar(ruta)
+    conn.execute(
+        "INSERT OR REPLACE INTO ofertas (clave, consulta, datos, tamano, creado, usado, expira) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (clave_consulta(post_data), json.dumps(post_data, sort_keys=True), datos, len(datos), ahora, ahora, ahora + ttl)
+    )
+    _desalojar(conn, max_bytes)
+
+def _desalojar(conn, max_bytes):
+    total = conn.execute("SELECT COALESCE(SUM(tamano), 0) FROM ofertas").fetchone()[0]
+    if total <= max_bytes:
+        return
+    for clave, tamano in conn.execute("SELECT clave, tamano FROM ofertas ORDER BY usado").fetchall():
+        conn.execute("DELETE FROM ofertas WHERE clave = ?", (clave,))
+        total -= tamano
+        if total <= max_bytes:
+            break
+
+def obtener_oferta(post_url, post_data, ttl=None):
+    """
+    Versión con caché de fetch_table_data.
+
+    Si otra sesión ya consultó la misma combinación (ciclo, centro, carrera) dentro del TTL,
+    se devuelve la oferta guardada sin volver a llamar a SIIAU. Si varias sesiones piden a la vez una oferta
+    que no está en la caché, solo una la consulta; las demás esperan y la leen de la caché.
+    """
+    df = _leer_cache(post_data, ttl)
+    if df is not None:
+        return df
+
+    clave = clave_consulta(post_data)
+    with _lock:
+        # Como en artifact_cache: la entrada se quita solo cuando ya no la usa nadie
+        entrada = _consultando.get(clave)
+        if entrada is None:
+            entrada = _consultando[clave] = [threading.Lock(), 0]
+        entrada[1] += 1
+
+    try:
+        with entrada[0]:
+            # Otra sesión pudo haberla consultado mientras se esperaba
+            df = _leer_cache(post_data, ttl)
+            if df is not None:
+                return df
+
+            df = fetch_table_data(post_url, post_data)
+            if df is not None and not df.empty:
+                try:
+                    guardar_en_cache(post_data, df)
+                except sqlite3.Error as e:
+                    print(f"Error al guardar en la caché de ofertas: {e}")
+            return df
+    finally:
+        with _lock:
+            entrada[1] -= 1
+            if entrada[1] == 0 and _consultando.get(clave) is entrada:
+                del _consultando[clave]
+
+def _leer_cache(post_data, ttl):
+    try:
+        return obtener_de_cache(post_data, ttl)
+    except sqlite3.Error as e:
+        print(f"Error al leer la caché de ofertas: {e}")
+        return None
@@ -1,191 +1,254 @@
 # Funciones/schedule.py
 import io
 import os
+import json
+import threading
 import numpy as np
 import pandas as pd
 from Funciones.utils import obtener_fecha_guadalajara
+from Funciones.stage_timing import etapa
 from reportlab.lib import colors, units
 from reportlab.lib.pagesizes import letter, landscape
-from reportlab.platypus import Table, TableStyle, SimpleDocTemplate, Paragraph
+from reportlab.platypus import Table, TableStyle, SimpleDocTemplate, Paragraph, PageBreak
 import traceback
 from Diseño.styles import get_reportlab_styles
 
 INSTITUTION_NAME = "UNIVERSIDAD DE GUADALAJARA"
 URL_PAGINA = os.environ.get("URL_PAGINA")
 
+HOURS_LIST = [
+    "07:00 AM - 07:59 AM", "08:00 AM - 08:59 AM", "09:00 AM - 09:59 AM", "10:00 AM - 10:59 AM",
+    "11:00 AM - 11:59 AM", "12:00 PM - 12:59 PM", "01:00 PM - 01:59 PM", "02:00 PM - 02:59 PM",
+    "03:00 PM - 03:59 PM", "04:00 PM - 04:59 PM", "05:00 PM - 05:59 PM", "06:00 PM - 06:59 PM",
+    "07:00 PM - 07:59 PM", "08:00 PM - 08:59 PM"
+]
+DAYS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"]
+
+# Márgenes de la página del PDF (carta horizontal)
+PDF_LEFT_MARGIN = 0.5 * units.inch
+PDF_RIGHT_MARGIN = 0.5 * units.inch
+PDF_TOP_MARGIN = 0.2 * units.inch
+PDF_BOTTOM_MARGIN = 1 * units.inch
+
+# Inicio y fin de cada bloque del horario en minutos desde la medianoche
+_SLOT_START = np.array([7 * 60 + 60 * i for i in range(len(HOURS_LIST))])
+_SLOT_END = _SLOT_START + 59
+
+def _to_minutes(times):
+    """Convierte una serie de horas 'HH:MM AM' a minutos desde la medianoche."""
+    parsed = pd.to_datetime(times, format="%I:%M %p")
+    return (parsed.dt.hour * 60 + parsed.dt.minute).to_numpy()
+
+def _column_or_default(df, column, default):
+    if column in df.columns:
+        return df[column].astype(object).astype(str)
+    return pd.Series(default, index=df.index)
+
 def create_schedule_sheet(expanded_data):
     """Crea una hoja de horario en formato pandas DataFrame."""
-    hours_list = [
-        "07:00 AM - 07:59 AM", "08:00 AM - 08:59 AM", "09:00 AM - 09:59 AM", "10:00 AM - 10:59 AM",
-        "11:00 AM - 11:59 AM", "12:00 PM - 12:59 PM", "01:00 PM - 01:59 PM", "02:00 PM - 02:59 PM",
-        "03:00 PM - 03:59 PM", "04:00 PM - 04:59 PM", "05:00 PM - 05:59 PM", "06:00 PM - 06:59 PM",
-        "07:00 PM - 07:59 PM", "08:00 PM - 08:59 PM"
-    ]
-    days = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"]
-    schedule = pd.DataFrame(columns=["Hora"] + days)
-    schedule["Hora"] = hours_list
-
-    for index, row in expanded_data.iterrows():
-        for hour_range in hours_list:
-            start_hour, end_hour = [pd.to_datetime(hr, format="%I:%M %p") for hr in hour_range.split(" - ")]
-            class_start, class_end = [pd.to_datetime(hr, format="%I:%M %p") for hr in row["Hora"].split(" - ")]
-            if start_hour < class_end and class_start < end_hour:
-                day_col = row["Días"]
-
-                materia = row.get("Materia", "Información no disponible")
-                edificio = row.get("Edificio", "")
-                letra_edificio = edificio[-1] if edificio else ""
-                aula = row.get("Aula", "Información no disponible")
-                profesor = row.get("Profesor", "Información no disponible")
-
-                content = f"{materia}\n{letra_edificio} - {aula}\n{profesor}"
-
-                if pd.notna(schedule.loc[schedule["Hora"] == hour_range, day_col].values[0]):
-                    schedule.loc[schedule["Hora"] == hour_range, day_col] += "\n" + content
-                else:
-                    schedule.loc[schedule["Hora"] == hour_range, day_col] = content
+    schedule = pd.DataFrame(columns=["Hora"] + DAYS)
+    schedule["Hora"] = HOURS_LIST
+    if expanded_data.empty:
+        return schedule
+
+    # Minutos de inicio y fin de cada clase, calculados una sola vez por DataFrame
+    # (las ofertas cargadas de un snapshot ya los traen en InicioMin/FinMin)
+    if {"InicioMin", "FinMin"} <= set(expanded_data.columns) and (expanded_data["InicioMin"] >= 0).all():
+        class_start = expanded_data["InicioMin"].to_numpy()
+        class_end = expanded_data["FinMin"].to_numpy()
+    else:
+        class_hours = expanded_data["Hora"].astype(object).str.split(" - ", n=1, expand=True)
+        class_start = _to_minutes(class_hours[0])
+        class_end = _to_minutes(class_hours[1])
+
+    # Matriz fila x bloque: True si la clase ocupa parte del bloque
+    overlap = (_SLOT_START[None, :] < class_end[:, None]) & (class_start[:, None] < _SLOT_END[None, :])
+    rows, slots = np.nonzero(overlap)
+    if len(rows) == 0:
+        return schedule
+
+    edificio = _column_or_default(expanded_data, "Edificio", "").where(
+        expanded_data["Edificio"].notna() if "Edificio" in expanded_data.columns else True, ""
+    )
+    content = (
+        _column_or_default(expanded_data, "Materia", "Información no disponible") + "\n"
+        + edificio.str[-1].fillna("") + " - "
+        + _column_or_default(expanded_data, "Aula", "Información no disponible") + "\n"
+        + _column_or_default(expanded_data, "Profesor", "Información no disponible")
+    ).to_numpy()
+
+    # np.nonzero recorre fila por fila, así que cada celda conserva el orden original de las clases
+    cells = pd.DataFrame({
+        "slot": slots,
+        "day": expanded_data["Días"].to_numpy()[rows],
+        "content": content[rows],
+    })
+    joined = cells.groupby(["day", "slot"], sort=False)["content"].agg("\n".join)
+
+    for day in joined.index.get_level_values("day").unique():
+        if day not in schedule.columns:
+            schedule[day] = np.nan
+        column = schedule[day].to_numpy(dtype=object, copy=True)
+        day_cells = joined.loc[day]
+        column[day_cells.index.to_numpy()] = day_cells.to_numpy()
+        schedule[day] = pd.Series(column, index=schedule.index, dtype=object)
 
     return schedule
 
-def create_schedule_pdf(schedule, ciclo):
+# Plantilla fija de la tabla del PDF: se construye una vez por proceso y por número de días;
+# en cada documento solo se le añaden los SPAN de las celdas combinadas
+_BASE_TABLE_COMMANDS = (
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+    ('ALIGN', (0, 0), (0, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('LEFTPADDING', (0, 0), (-1, -1), 2),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 2),
+    ('TOPPADDING', (0, 0), (-1, -1), 2),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+)
+_HORA_WIDTH = 0.7 * units.inch
+_pdf_styles = None
+_table_layouts = {}
+_hora_cells = threading.local()
+
+def pdf_styles():
+    """Estilos de ReportLab del proceso (get_reportlab_styles se llama una sola vez)."""
+    global _pdf_styles
+    if _pdf_styles is None:
+        _pdf_styles = get_reportlab_styles()
+    return _pdf_styles
+
+def _table_layout(num_dias):
+    """Anchos de columna y comandos base de TableStyle para una tabla de `num_dias` días."""
+    layout = _table_layouts.get(num_dias)
+    if layout is None:
+        available_width = landscape(letter)[0] - (PDF_LEFT_MARGIN + PDF_RIGHT_MARGIN) - _HORA_WIDTH
+        col_width = available_width / num_dias
+        col_widths = [_HORA_WIDTH] + [col_width] * num_dias
+        commands = list(_BASE_TABLE_COMMANDS) + [('WORDWRAP', (1, 1), (-1, -1), col_width)]
+        layout = _table_layouts[num_dias] = (col_widths, commands)
+    return layout
+
+def _hora_cell(hora, styles):
+    """
+    Celda de la columna de horas. Es parte fija de la plantilla: sus Paragraph se construyen una vez
+    por hilo y estilos, y se reutilizan en cada documento (ReportLab recalcula su maquetado al dibujar).
+    """
+    cache = getattr(_hora_cells, "cache", None)
+    if cache is None or _hora_cells.styles is not styles:
+        cache = _hora_cells.cache = {}
+        _hora_cells.styles = styles
+    cell = cache.get(hora)
+    if cell is None:
+        try:
+            hora_inicio, hora_fin = hora.split(" - ")
+        except (ValueError, AttributeError):
+            hora_inicio = hora
+            hora_fin = ""
+        cell = cache[hora] = [Paragraph(hora_inicio, styles['Hora']), Paragraph(hora_fin, styles['Hora'])]
+    return cell
+
+def vertical_spans(columns):
+    """
+    Calcula las celdas combinadas de la tabla con codificación por tramos (run-length) de cada columna:
+    cada tramo de 2 o más filas seguidas con el mismo contenido se convierte en un SPAN.
+    `columns` es una lista de columnas de valores comparables (sin la fila de encabezado).
+    Devuelve [((col, fila_inicio), (col, fila_fin)), ...] con las coordenadas de la tabla
+    (la columna 0 es la hora y la fila 0 el encabezado).
+    """
+    spans = []
+    for j, column in enumerate(columns, start=1):
+        start = 0
+        for i in range(1, len(column) + 1):
+            if i == len(column) or column[i] != column[start]:
+                if i - start > 1:
+                    spans.append(((j, start + 1), (j, i)))
+                start = i
+    return spans
+
+def schedule_flowables(schedule, ciclo, styles=None):
+    """
+    Devuelve los elementos de ReportLab (título, tabla y pie) de la página de un horario.
+    `styles` permite reutilizar los estilos de get_reportlab_styles entre documentos.
+    """
+    styles = styles or pdf_styles()
+    dias_semana = ["Hora", "Lunes", "Martes", "Miércoles", "Jueves", "Viernes"]
+
+    # La hoja tiene pocas filas (una por hora): se recorre como lista de Python, sin operaciones de pandas
+    column_names = list(schedule.columns)
+    grid = schedule.to_numpy(dtype=object).tolist()
+
+    if "Sábado" in column_names:
+        sabado = column_names.index("Sábado")
+        if any(not pd.isna(row[sabado]) and row[sabado] not in ("", " ") for row in grid[1:]):
+            dias_semana.append("Sábado")
+
+    # Se quitan las horas sin ninguna clase
+    grid = [row for row in grid if not all(pd.isna(x) or str(x).strip() == "" for x in row[1:])]
+
+    # Contenido visible de cada celda por día: materia, aula y profesor (las tres primeras líneas).
+    # Es lo que se compara para combinar celdas, igual que el texto que se ve en el PDF.
+    columns = []
+    for dia in dias_semana[1:]:
+        k = column_names.index(dia)
+        columns.append([() if pd.isna(row[k]) else tuple((str(row[k]).split('\n') + ["", ""])[:3]) for row in grid])
+    spans = vertical_spans(columns)
+    # Las celdas tapadas por un SPAN no se dibujan, así que no se construyen sus Paragraph
+    covered = {(j, i) for (j, start), (_, end) in spans for i in range(start + 1, end + 1)}
+
+    data_for_table = [[Paragraph(dia, styles['TableHeader']) for dia in dias_semana]]
+    hora_index = column_names.index("Hora")
+    for i, row in enumerate(grid, start=1):
+        data_row = [_hora_cell(row[hora_index], styles)]
+
+        for j, column in enumerate(columns, start=1):
+            cell = column[i - 1]
+            if not cell or (j, i) in covered:
+                data_row.append("")
+                continue
+            materia, aula, profesor = cell
+            data_row.append([
+                Paragraph(materia, styles['Materia']),
+                Paragraph(aula, styles['Aula']),
+                Paragraph(profesor, styles['Profesor'])
+            ])
+        data_for_table.append(data_row)
+
+    col_widths, commands = _table_layout(len(dias_semana) - 1)
+    table = Table(data_for_table, colWidths=col_widths)
+    table.setStyle(TableStyle(commands + [('SPAN', start, end) for start, end in spans]))
+
+    elements = []
+    elements.append(Paragraph(f"{INSTITUTION_NAME}", styles['Title']))
+    elements.append(Paragraph(f"Horario de Clases - {ciclo}", styles['Subtitle']))
+    elements.append(table)
+    
+    fecha_generacion = obtener_fecha_guadalajara()
+    footer_text = f"Creado el: {fecha_generacion}"
+    footer_link_text = f"{URL_PAGINA}"
+
+    elements.append(Paragraph(footer_text, styles['Footer']))
+    elements.append(Paragraph(footer_link_text, styles['FooterLink']))
+    return elements
+
+def schedule_doc(buffer):
+    """Plantilla de documento (carta horizontal) en la que se dibujan los horarios."""
+    return SimpleDocTemplate(buffer, pagesize=landscape(letter),
+                             leftMargin=PDF_LEFT_MARGIN, rightMargin=PDF_RIGHT_MARGIN,
+                             topMargin=PDF_TOP_MARGIN, bottomMargin=PDF_BOTTOM_MARGIN)
+
+@etapa("create_schedule_pdf")
+def create_schedule_pdf(schedule, ciclo, styles=None):
     """Crea un archivo PDF con el horario."""
     try:
         buffer = io.BytesIO()
-        styles = get_reportlab_styles()
-        dias_semana = ["Hora", "Lunes", "Martes", "Miércoles", "Jueves", "Viernes"]
-
-        if "Sábado" in schedule.columns:
-            sabado_data = schedule["Sábado"].iloc[1:].replace("", np.nan).replace(" ", np.nan)
-            sabado_data = sabado_data.dropna()
-            if not sabado_data.empty:
-                dias_semana.append("Sábado")
-
-        filas_no_vacias = []
-        for index, row in schedule.iterrows():
-            if not all(pd.isna(x) or str(x).strip() == "" for x in row[1:]):
-                filas_no_vacias.append(index)
-
-        schedule = schedule.loc[filas_no_vacias].reset_index(drop=True)
-
-        styles = get_reportlab_styles() #Obtener los estilos
-
-        data_for_table = []
-        header_row = []
-
-        for dia in dias_semana:
-            header_row.append(Paragraph(dia, styles['TableHeader']))  # Crea Paragraphs con estilo
-        data_for_table.append(header_row)
-
-        horas = schedule.index.to_list()
-
-        for index, row in schedule.iterrows():
-            hora = row["Hora"]
-            try:
-                hora_inicio, hora_fin = hora.split(" - ")
-            except (ValueError, AttributeError):
-                hora_inicio = hora
-                hora_fin = ""
-            p_hora_inicio = Paragraph(hora_inicio, styles['Hora'])
-            p_hora_fin = Paragraph(hora_fin, styles['Hora'])
-            hora_cell = [p_hora_inicio, p_hora_fin]
-
-            data_row = [hora_cell]
-
-            for dia in dias_semana[1:]:
-                materia_data = row[dia]
-                if pd.isna(materia_data):
-                    data_row.append("")
-                else:
-                    parts = str(materia_data).split('\n')
-                    materia = parts[0] if len(parts) >= 1 else ""
-                    aula = parts[1] if len(parts) >= 2 else ""
-                    profesor = parts[2] if len(parts) >= 3 else ""
-                    data_row.append([
-                        Paragraph(materia, styles['Materia']),
-                        Paragraph(aula, styles['Aula']),
-                        Paragraph(profesor, styles['Profesor'])
-                    ])
-            data_for_table.append(data_row)
-
-        num_dias = len(dias_semana) - 1
-        hora_width = 0.7 * units.inch
-        left_margin = 0.5 * units.inch
-        right_margin = 0.5 * units.inch
-
-        available_width = landscape(letter)[0] - (left_margin + right_margin) - hora_width
-        col_width = available_width / num_dias
-
-        col_widths = [hora_width] + [col_width] * num_dias
-
-        spans = []
-        for j in range(1, len(dias_semana)):
-            start_row = None
-            for i in range(1, len(horas) + 1):
-                if i < len(data_for_table) and j < len(data_for_table[0]):
-                    current_cell = data_for_table[i][j]
-                    prev_cell = data_for_table[i - 1][j] if i > 0 else None
-
-                    if current_cell != " " and prev_cell is not None:
-                        current_text = current_cell.getPlainText().strip() if isinstance(current_cell, Paragraph) else str(current_cell).strip()
-                        prev_text = prev_cell.getPlainText().strip() if isinstance(prev_cell, Paragraph) else str(prev_cell).strip()
-
-                        if current_text == prev_text:
-                            if start_row is None:
-                                start_row = i - 1
-                            else:
-                                pass #No es nesesario este if
-                        else: #Se agrega un else para guardar el span
-                            if start_row is not None:
-                                spans.append(((j, start_row), (j, i - 1)))
-                                start_row = None
-            if start_row is not None:
-                spans.append(((j, start_row), (j, len(data_for_table) - 1)))  # Corrección crucial
-
-        table = Table(data_for_table, colWidths=col_widths)
-        table_style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (0, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('LEFTPADDING', (0, 0), (-1, -1), 2),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 2),
-            ('TOPPADDING', (0, 0), (-1, -1), 2),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-            ('WORDWRAP', (1,1), (-1,-1), col_width)
-        ])
-
-        for start, end in spans:
-            try:
-                table_style.add('SPAN', start, end)
-            except IndexError as e:
-                print(f"Error al aplicar span: {start}, {end}. Dimensiones de la tabla: {table.getSize()}")
-                traceback.print_exc()
-
-        table.setStyle(table_style)
-
-        doc = SimpleDocTemplate(buffer, pagesize=landscape(letter),
-                                leftMargin=left_margin, rightMargin=right_margin,
-                                topMargin=0.2 * units.inch, bottomMargin=1 * units.inch)
-
-        elements = []
-        elements.append(Paragraph(f"{INSTITUTION_NAME}", styles['Title']))
-        elements.append(Paragraph(f"Horario de Clases - {ciclo}", styles['Subtitle']))
-        elements.append(table)
-        
-        fecha_generacion = obtener_fecha_guadalajara()
-        footer_text = f"Creado el: {fecha_generacion}"
-        footer_link_text = f"{URL_PAGINA}"
-
-        elements.append(Paragraph(footer_text, styles['Footer']))
-        elements.append(Paragraph(footer_link_text, styles['FooterLink']))
-
-        doc.build(elements)
-
+        schedule_doc(buffer).build(schedule_flowables(schedule, ciclo, styles))
         buffer.seek(0)
         return buffer
 
@@ -193,3 +256,26 @@ def create_schedule_pdf(schedule, ciclo):
         print(f"Error al construir el PDF: {e}")
         traceback.print_exc()
         return io.BytesIO()
+
+def create_schedules_pdf(schedules, ciclos, styles=None):
+    """Crea un solo PDF con un horario por página. `ciclos` tiene un ciclo por horario."""
+    buffer = io.BytesIO()
+    styles = styles or pdf_styles()
+    elements = []
+    for i, (schedule, ciclo) in enumerate(zip(schedules, ciclos)):
+        if i:
+            elements.append(PageBreak())
+        elements.extend(schedule_flowables(schedule, ciclo, styles))
+    schedule_doc(buffer).build(elements)
+    return buffer.getvalue()
+
+
+def export_schedule_json(schedule, materias, nrcs, ciclo):
+    """Devuelve el horario y su selección como JSON (bytes)."""
+    json_data = {
+        "horario": schedule.to_dict(orient='records'),
+        "materias": materias,
+        "nrcs": nrcs,
+        "ciclo": ciclo
+    }
+    return json.dumps(json_data, indent=2, default=str).encode('utf-8')
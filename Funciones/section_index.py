@@ -0,0 +1,114 @@
+# Funciones/section_index.py
+
+import hashlib
+import numpy as np
+import pandas as pd
+from Funciones.snapshot import COLUMNA_INICIO, COLUMNA_FIN
+
+class Seccion:
+    """Datos de un NRC ya agrupados: sus sesiones y el texto que se muestra en el selector de grupos."""
+    __slots__ = ("nrc", "materia", "profesor", "sesiones", "descripcion", "filas")
+
+    def __init__(self, nrc, materia, profesor, sesiones, filas):
+        self.nrc = nrc
+        self.materia = materia
+        self.profesor = profesor
+        self.sesiones = sesiones  # [(día, hora, edificio, aula), ...] en el orden de la oferta
+        self.filas = filas        # posiciones de sus filas en la oferta
+        horarios = " | ".join(f"{dia} {hora} ({edificio}-{aula})" for dia, hora, edificio, aula in sesiones)
+        self.descripcion = f"{nrc} | {profesor} | {horarios}"
+
+class IndiceSecciones:
+    """
+    Índice de la oferta construido una sola vez por consulta: NRC -> Seccion y materia -> NRCs.
+    Permite pintar la pestaña de selección y obtener las filas de los NRC elegidos sin recorrer
+    toda la oferta en cada rerun.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._version = None
+        self._por_texto = None
+        self.secciones = {}
+        self.por_materia = {}
+
+        nrcs = df["NRC"].tolist()
+        materias = df["Materia"].tolist()
+        profesores = df["Profesor"].tolist()
+        dias = df["Días"].astype(object).astype(str).tolist()
+        horas = df["Hora"].astype(object).astype(str).tolist()
+        # Solo la letra del módulo (ej. "DEDX" -> "X"), como se muestra en el selector
+        edificios = df["Edificio"].astype(object).str[-1].fillna("").tolist()
+        aulas = df["Aula"].astype(object).astype(str).tolist()
+
+        datos = {}
+        for fila, nrc in enumerate(nrcs):
+            entrada = datos.get(nrc)
+            if entrada is None:
+                entrada = datos[nrc] = [materias[fila], None, [], []]
+                self.por_materia.setdefault(materias[fila], []).append(nrc)
+            if entrada[1] is None and not pd.isna(profesores[fila]):
+                entrada[1] = profesores[fila]
+            entrada[2].append((dias[fila], horas[fila], edificios[fila], aulas[fila]))
+            entrada[3].append(fila)
+
+        for nrc, (materia, profesor, sesiones, filas) in datos.items():
+            self.secciones[nrc] = Seccion(nrc, materia, profesor, sesiones, np.array(filas, dtype=np.intp))
+        for materia in self.por_materia:
+            self.por_materia[materia].sort()
+
+    @property
+    def version(self):
+        """
+        Huella del contenido de la oferta. Es la misma para dos sesiones que consultaron los mismos datos,
+        tanto si la oferta viene recién procesada como de un snapshot (con columnas categóricas).
+        """
+        if self._version is None:
+            columnas = [c for c in self.df.columns if c not in (COLUMNA_INICIO, COLUMNA_FIN)]
+            hashes = pd.util.hash_pandas_object(self.df[columnas], index=False).to_numpy()
+            self._version = hashlib.sha256(hashes.tobytes()).hexdigest()
+        return self._version
+
+    @property
+    def materias(self):
+        """Materias en el orden en que aparecen en la oferta."""
+        return list(self.por_materia)
+
+    def nrcs_de(self, materia):
+        return self.por_materia.get(materia, [])
+
+    def buscar_nrcs(self, nrcs):
+        """
+        Separa NRC recibidos como texto o número (de un JSON, una URL...) en los que existen en la oferta,
+        con el tipo que tienen en ella, y los que no. Devuelve (encontrados, faltantes).
+        """
+        if self._por_texto is None:
+            self._por_texto = {str(nrc): nrc for nrc in self.secciones}
+        encontrados, faltantes = [], []
+        for nrc in nrcs:
+            nrc_oferta = self._por_texto.get(str(nrc).strip())
+            if nrc_oferta is None:
+                faltantes.append(nrc)
+            else:
+                encontrados.append(nrc_oferta)
+        return encontrados, faltantes
+
+    def descripcion(self, nrc):
+        seccion = self.secciones.get(nrc)
+        return seccion.descripcion if seccion is not None else str(nrc)
+
+    def filas(self, nrcs):
+        """Filas de la oferta de los NRC dados, en el orden original (equivale a df[df['NRC'].isin(nrcs)])."""
+        posiciones = [self.secciones[nrc].filas for nrc in set(nrcs) if nrc in self.secciones]
+        if not posiciones:
+            return self.df.iloc[0:0]
+        return self.df.iloc[np.sort(np.concatenate(posiciones))]
+
+    def filas_de_materias(self, materias):
+        return self.filas([nrc for materia in materias for nrc in self.nrcs_de(materia)])
+
+def indice_de_oferta(df, indice=None):
+    """Devuelve `indice` si se construyó para este mismo DataFrame; si no, construye uno nuevo."""
+    if indice is not None and indice.df is df:
+        return indice
+    return IndiceSecciones(df)
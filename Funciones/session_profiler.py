@@ -0,0 +1,202 @@
+# Funciones/session_profiler.py
+#
+# Perfilado a pedido de un rerun completo de la app, para diagnosticar reruns lentos en producción sin
+# volver a desplegar. Se activa para una sola sesión con el parámetro de URL ?perfil=cprofile (o =muestreo)
+# junto con &perfil_token=<PERFIL_TOKEN>, o para todas con la variable de entorno PERFIL_APP. Sin
+# PERFIL_TOKEN configurado el parámetro de URL se ignora: no cualquier visitante puede perfilar el servidor.
+#
+# - "cprofile": cProfile determinista; se descarga como .pstats (python -m pstats, snakeviz...).
+# - "muestreo": muestreo de la pila del hilo del rerun cada PERFIL_INTERVALO segundos; se descarga como
+#   pilas colapsadas ("a;b;c 12" por línea), listas para flamegraph.pl o speedscope. Casi no añade coste.
+#
+# Además, las secciones marcadas con seccion_memoria() (las pestañas 2 y 3) guardan con tracemalloc el pico
+# de memoria y las líneas que más memoria reservaron. tracemalloc es global al proceso, así que solo una
+# sección a la vez lo usa: si otra sesión ya lo tiene (o alguien más lo encendió), la sección se omite.
+# Las reservas de otras sesiones activas durante la sección también cuentan.
+
+import io
+import os
+import hmac
+import sys
+import time
+import marshal
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+MODOS = ("cprofile", "muestreo")
+PERFIL_APP = os.environ.get("PERFIL_APP", "")                         # "", "cprofile" o "muestreo"
+INTERVALO_MUESTREO = float(os.environ.get("PERFIL_INTERVALO", 0.005))  # segundos entre muestras
+PERFIL_TOKEN = os.environ.get("PERFIL_TOKEN", "")                      # Necesario para ?perfil= (vacío = desactivado)
+MARCOS_MEMORIA = 1    # Profundidad de las trazas de tracemalloc (basta la línea que reserva)
+TOP_MEMORIA = 25      # Líneas que se conservan por sección
+TOP_FUNCIONES = 40    # Funciones en el resumen de texto
+
+_activos = {}  # ident del hilo -> Perfil en curso (para cerrar uno que quedó abierto por st.stop o un rerun)
+_lock = threading.Lock()
+_lock_memoria = threading.Lock()  # Dueño de tracemalloc: una sola sección de memoria a la vez en el proceso
+
+def token_valido(token):
+    """True si `token` coincide con PERFIL_TOKEN (que debe estar configurado)."""
+    return bool(PERFIL_TOKEN) and bool(token) and hmac.compare_digest(str(token), PERFIL_TOKEN)
+
+def modo_solicitado(parametro=None, token=None):
+    """
+    Modo de perfilado pedido por el parámetro de URL (solo con un token válido) o, si no hay, por PERFIL_APP.
+    None = sin perfilar.
+    """
+    if not token_valido(token):
+        parametro = None
+    valor = (parametro or PERFIL_APP or "").strip().lower()
+    if valor in ("1", "true", "si", "sí"):
+        return "cprofile"
+    return valor if valor in MODOS else None
+
+class _Muestreador(threading.Thread):
+    """Toma la pila de un hilo a intervalos fijos y cuenta cada pila distinta."""
+
+    def __init__(self, objetivo, intervalo):
+        super().__init__(name="perfil-muestreo", daemon=True)
+        self.objetivo = objetivo
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self._fin = threading.Event()
+
+    def run(self):
+        # Durante el muestreo solo se guardan tuplas de objetos de código; el texto se arma al final
+        muestras = Counter()
+        while not self._fin.wait(self.intervalo):
+            marco = sys._current_frames().get(self.objetivo)
+            pila = []
+            while marco is not None:
+                pila.append(marco.f_code)
+                marco = marco.f_back
+            if pila:
+                muestras[tuple(pila)] += 1
+        for pila, n in muestras.items():
+            self.pilas[";".join(
+                f"{c.co_name} ({os.path.basename(c.co_filename)}:{c.co_firstlineno})" for c in reversed(pila)
+            )] += n
+
+    def detener(self):
+        self._fin.set()
+        self.join()
+
+class Perfil:
+    """Perfil de un rerun: iniciar() al principio del script y detener() al final."""
+
+    def __init__(self, modo):
+        if modo not in MODOS:
+            raise ValueError(f"Modo de perfilado desconocido: {modo}")
+        self.modo = modo
+        self.memoria = {}
+        self._perfilador = None
+        self._muestreador = None
+        self._inicio = None
+        self._ident = None
+
+    def iniciar(self):
+        self._ident = threading.get_ident()
+        with _lock:
+            anterior = _activos.get(self._ident)
+            _activos[self._ident] = self
+        if anterior is not None:
+            anterior.detener()
+        self._inicio = time.perf_counter()
+        if self.modo == "cprofile":
+            self._perfilador = cProfile.Profile()
+            self._perfilador.enable()
+        else:
+            self._muestreador = _Muestreador(self._ident, INTERVALO_MUESTREO)
+            self._muestreador.start()
+        return self
+
+    @contextmanager
+    def seccion_memoria(self, nombre):
+        """
+        Registra el pico y las líneas que más memoria reservaron dentro del bloque. Si tracemalloc ya está
+        en uso (otra sesión perfilando su sección, o encendido desde fuera), el bloque corre sin medirse.
+        """
+        if not _lock_memoria.acquire(blocking=False):
+            yield
+            return
+        try:
+            if tracemalloc.is_tracing():
+                # Lo encendió alguien más: apagarlo o reiniciar su pico le rompería la medición
+                yield
+                return
+            # tracemalloc se enciende solo durante la sección: así la instantánea final contiene únicamente
+            # lo que se reservó en ella y no hay que compararla con otra (lo que cuesta segundos con muchas trazas)
+            tracemalloc.start(MARCOS_MEMORIA)
+            base = tracemalloc.get_traced_memory()[0]
+            try:
+                yield
+            finally:
+                self._cerrar_seccion(nombre, base)
+        finally:
+            _lock_memoria.release()
+
+    def _cerrar_seccion(self, nombre, base):
+        """Toma la instantánea de la sección, apaga tracemalloc y guarda el resultado."""
+        if not tracemalloc.is_tracing():
+            return  # Alguien lo apagó durante la sección: no hay nada que leer
+        actual, pico = tracemalloc.get_traced_memory()
+        despues = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        estadisticas = [(e.traceback[0], e.size, e.count) for e in despues.statistics("lineno")]
+        self.memoria[nombre] = {
+            "pico_mb": (pico - base) / 1e6,
+            "neto_mb": (actual - base) / 1e6,
+            "lineas": [
+                {"lugar": str(lugar), "kb": tamano / 1024, "bloques": bloques}
+                for lugar, tamano, bloques in estadisticas[:TOP_MEMORIA]
+            ],
+        }
+
+    def detener(self):
+        """Detiene el perfil y devuelve el resultado (ver _resultado). Se puede llamar más de una vez."""
+        with _lock:
+            if _activos.get(self._ident) is self:
+                del _activos[self._ident]
+        if self._perfilador is not None:
+            self._perfilador.disable()
+        if self._muestreador is not None and self._muestreador.is_alive():
+            self._muestreador.detener()
+        return self._resultado()
+
+    def _resultado(self):
+        """
+        {"modo", "segundos", "archivo": (nombre, bytes) descargable, "resumen": texto, "memoria": {sección: ...}}
+        """
+        resultado = {"modo": self.modo, "segundos": time.perf_counter() - self._inicio, "memoria": self.memoria}
+        if self._perfilador is not None:
+            self._perfilador.create_stats()
+            # Mismo formato que Profile.dump_stats, sin pasar por un archivo
+            resultado["archivo"] = ("rerun.pstats", marshal.dumps(self._perfilador.stats))
+            texto = io.StringIO()
+            pstats.Stats(self._perfilador, stream=texto).sort_stats("cumulative").print_stats(TOP_FUNCIONES)
+            resultado["resumen"] = texto.getvalue()
+        else:
+            pilas = self._muestreador.pilas
+            colapsado = "".join(f"{pila} {n}\n" for pila, n in pilas.most_common())
+            resultado["archivo"] = ("rerun.collapsed", colapsado.encode("utf-8"))
+            hojas = Counter()
+            for pila, n in pilas.items():
+                hojas[pila.rsplit(";", 1)[-1]] += n
+            total = sum(pilas.values()) or 1
+            resultado["resumen"] = f"{total} muestras cada {INTERVALO_MUESTREO * 1000:.0f} ms\n" + "".join(
+                f"{n / total:6.1%}  {funcion}\n" for funcion, n in hojas.most_common(TOP_FUNCIONES)
+            )
+        return resultado
+
+def iniciar_perfil(parametro=None, token=None):
+    """Crea e inicia el perfil del rerun si se pidió (con `token` válido si viene de la URL); si no, None."""
+    modo = modo_solicitado(parametro, token)
+    return Perfil(modo).iniciar() if modo else None
+
+def seccion_memoria(perfil, nombre):
+    """seccion_memoria del perfil, o un bloque que no hace nada si no se está perfilando."""
+    return perfil.seccion_memoria(nombre) if perfil is not None else nullcontext()
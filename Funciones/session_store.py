@@ -0,0 +1,138 @@
+# Funciones/session_store.py
+
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import tempfile
+from filelock import FileLock, Timeout
+
+# Cada sesión de Streamlit guarda sus datos en su propio directorio, con su propio lock,
+# para que los usuarios concurrentes no se pisen ni se esperen entre sí.
+SESIONES_DIR = os.environ.get("SESIONES_DIR", os.path.join(".cache", "sesiones"))
+SESION_TTL = int(os.environ.get("SESION_TTL", 6 * 3600))        # segundos sin actividad antes de borrar
+INTERVALO_LIMPIEZA = int(os.environ.get("SESION_INTERVALO_LIMPIEZA", 10 * 60))
+LOCK_TIMEOUT = 10
+# Un solo lock por sesión para todos sus archivos (datos.json, oferta.arrow...): la limpieza lo toma antes de
+# borrar el directorio, así que nunca lo borra mientras se escribe cualquiera de ellos
+LOCK_SESION = "sesion.lock"
+
+_ID_VALIDO = re.compile(r"^[0-9a-f]{32}$")
+_ultima_limpieza = 0.0
+
+def nuevo_id_sesion():
+    return uuid.uuid4().hex
+
+def directorio_sesion(session_id, crear=False):
+    """Devuelve el directorio de la sesión; con crear=True (al escribir) lo crea si no existe."""
+    if not _ID_VALIDO.match(str(session_id)):
+        raise ValueError(f"Identificador de sesión inválido: {session_id}")
+    directorio = os.path.join(SESIONES_DIR, session_id)
+    if crear:
+        os.makedirs(directorio, exist_ok=True)
+    return directorio
+
+def ruta_sesion(session_id, nombre_archivo="datos.json", crear=False):
+    return os.path.join(directorio_sesion(session_id, crear), nombre_archivo)
+
+def _ruta_lock(ruta):
+    """Lock de un archivo: el de su sesión si está en un directorio de sesión; si no, uno propio."""
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    if (_ID_VALIDO.match(os.path.basename(directorio))
+            and os.path.dirname(directorio) == os.path.abspath(SESIONES_DIR)):
+        return os.path.join(directorio, LOCK_SESION)
+    return ruta + ".lock"
+
+def escribir_atomico(ruta, escribir):
+    """
+    Escribe un archivo en un temporal del mismo directorio y lo renombra sobre el destino.
+    Los lectores ven siempre la versión anterior completa o la nueva, nunca una a medias.
+    """
+    directorio = os.path.dirname(ruta) or "."
+    with FileLock(_ruta_lock(ruta), timeout=LOCK_TIMEOUT):
+        fd, temporal = tempfile.mkstemp(dir=directorio, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                escribir(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporal, ruta)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+
+def _a_json(valor):
+    """Convierte escalares de NumPy (por ejemplo, los NRC de un multiselect) a tipos nativos."""
+    if hasattr(valor, "item"):
+        return valor.item()
+    raise TypeError(f"Object of type {type(valor).__name__} is not JSON serializable")
+
+def guardar_datos_sesion(session_id, data, nombre_archivo="datos.json"):
+    """Guarda un diccionario como JSON en el almacenamiento de la sesión."""
+    contenido = json.dumps(data, ensure_ascii=False, indent=2, default=_a_json).encode("utf-8")
+    escribir_atomico(ruta_sesion(session_id, nombre_archivo, crear=True), lambda f: f.write(contenido))
+    os.utime(directorio_sesion(session_id))
+    limpiar_sesiones_expiradas()
+
+def cargar_datos_sesion(session_id, nombre_archivo="datos.json"):
+    """Carga el JSON de la sesión. Devuelve un diccionario vacío si no existe o está dañado."""
+    ruta = ruta_sesion(session_id, nombre_archivo)
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        print(f"Error al decodificar JSON de la sesión: {e}")
+        return {}
+
+def existen_datos_sesion(session_id, nombre_archivo="datos.json"):
+    return os.path.exists(ruta_sesion(session_id, nombre_archivo))
+
+def eliminar_sesion(session_id):
+    """Borra todos los archivos de una sesión (por ejemplo, al pulsar 'Nueva Consulta')."""
+    shutil.rmtree(directorio_sesion(session_id), ignore_errors=True)
+
+def _sin_actividad(directorio, ttl):
+    """True si ningún archivo de la sesión (sin contar su lock) cambió en los últimos `ttl` segundos."""
+    ahora = time.time()
+    with os.scandir(directorio) as entradas:
+        return all(ahora - entrada.stat().st_mtime > ttl for entrada in entradas if entrada.name != LOCK_SESION)
+
+def limpiar_sesiones_expiradas(ttl=None, forzar=False):
+    """
+    Borra los directorios de sesiones sin actividad durante más de `ttl` segundos.
+    Se ejecuta como mucho una vez cada INTERVALO_LIMPIEZA segundos por proceso, salvo con forzar=True.
+    """
+    global _ultima_limpieza
+    ahora = time.time()
+    if not forzar and ahora - _ultima_limpieza < INTERVALO_LIMPIEZA:
+        return 0
+    _ultima_limpieza = ahora
+    ttl = SESION_TTL if ttl is None else ttl
+
+    eliminadas = 0
+    try:
+        entradas = list(os.scandir(SESIONES_DIR))
+    except FileNotFoundError:
+        return 0
+    for entrada in entradas:
+        if not entrada.is_dir() or not _ID_VALIDO.match(entrada.name):
+            continue
+        try:
+            if ahora - entrada.stat().st_mtime <= ttl:
+                continue
+            # Si la sesión está escribiendo cualquiera de sus archivos se deja para la siguiente limpieza
+            with FileLock(os.path.join(entrada.path, LOCK_SESION), timeout=0):
+                # Ya con el lock se vuelve a comprobar: la sesión pudo escribir entre el stat y el lock. Se miran
+                # sus archivos y no el directorio, cuya fecha cambia al crear el propio lock
+                if not _sin_actividad(entrada.path, ttl):
+                    continue
+                shutil.rmtree(entrada.path, ignore_errors=True)
+            eliminadas += 1
+        except (Timeout, OSError):
+            continue
+    return eliminadas
@@ -0,0 +1,98 @@
+# Funciones/siiau_client.py
+#
+# Cliente HTTP compartido para todas las llamadas a SIIAU: una sola requests.Session por proceso,
+# con conexiones persistentes (sin handshake TCP+TLS en cada consulta), respuestas comprimidas,
+# reintentos con espera exponencial y jitter, y timeouts de conexión y de lectura separados.
+#
+# SIIAU_BASE_URL apunta la app (y todas las consultas) a otro servidor, por ejemplo al servidor local
+# de Funciones.siiau_local; SIIAU_GRABAR guarda cada respuesta en un almacén de fixtures (ver siiau_fixtures).
+
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from Funciones import siiau_fixtures
+
+BASE_URL = os.environ.get("SIIAU_BASE_URL", "https://siiauescolar.siiau.udg.mx").rstrip("/")
+RUTA_FORMULARIO = "/wal/sspseca.forma_consulta"
+RUTA_CARRERAS = "/wal/sspseca.lista_carreras"
+RUTA_OFERTA = "/wal/sspseca.consulta_oferta"
+
+CONNECT_TIMEOUT = float(os.environ.get("SIIAU_CONNECT_TIMEOUT", 5))   # segundos para abrir la conexión
+READ_TIMEOUT = float(os.environ.get("SIIAU_READ_TIMEOUT", 30))        # segundos sin recibir datos
+REINTENTOS = int(os.environ.get("SIIAU_REINTENTOS", 3))
+BACKOFF = float(os.environ.get("SIIAU_BACKOFF", 0.5))                 # 0.5 s, 1 s, 2 s... más jitter
+TAMANO_POOL = int(os.environ.get("SIIAU_POOL", 10))                   # conexiones simultáneas por host
+
+ESTADOS_REINTENTABLES = (429, 500, 502, 503, 504)
+HEADERS = {
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+    "User-Agent": "Crear_horarios_udg",
+}
+
+_sesion = None
+_lock = threading.Lock()
+
+def crear_sesion(conexiones=None, reintentos=None, backoff=None):
+    """Crea una sesión con pool de conexiones persistentes y política de reintentos."""
+    conexiones = TAMANO_POOL if conexiones is None else conexiones
+    reintentos = REINTENTOS if reintentos is None else reintentos
+    backoff = BACKOFF if backoff is None else backoff
+    retry = Retry(
+        total=reintentos,
+        connect=reintentos,
+        read=reintentos,
+        status=reintentos,
+        backoff_factor=backoff,
+        backoff_jitter=backoff,
+        status_forcelist=ESTADOS_REINTENTABLES,
+        allowed_methods=None,  # La consulta de oferta es un POST de solo lectura: se puede reintentar
+        respect_retry_after_header=True,
+    )
+    adaptador = HTTPAdapter(pool_connections=2, pool_maxsize=conexiones, max_retries=retry)
+    sesion = requests.Session()
+    sesion.headers.update(HEADERS)
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
+    return sesion
+
+def obtener_sesion():
+    """Devuelve la sesión compartida del proceso (se crea la primera vez)."""
+    global _sesion
+    if _sesion is None:
+        with _lock:
+            if _sesion is None:
+                _sesion = crear_sesion()
+    return _sesion
+
+def cerrar_sesion():
+    """Cierra las conexiones del pool; la siguiente petición crea una sesión nueva."""
+    global _sesion
+    with _lock:
+        if _sesion is not None:
+            _sesion.close()
+            _sesion = None
+
+def peticion(metodo, url, timeout=None, sesion=None, **kwargs):
+    """
+    Hace una petición a SIIAU con la sesión compartida y lanza requests.exceptions.RequestException
+    si falla después de los reintentos o si la respuesta final es un error HTTP.
+    """
+    sesion = sesion or obtener_sesion()
+    response = sesion.request(metodo, url, timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT), **kwargs)
+    try:
+        response.raise_for_status()
+    except requests.exceptions.HTTPError:
+        response.close()
+        raise
+    if siiau_fixtures.GRABAR_DIR:
+        siiau_fixtures.grabar_respuesta(response, kwargs.get("data"), stream=kwargs.get("stream", False))
+    return response
+
+def get(url, **kwargs):
+    return peticion("GET", url, **kwargs)
+
+def post(url, data=None, **kwargs):
+    return peticion("POST", url, data=data, **kwargs)
@@ -0,0 +1,108 @@
+# Funciones/siiau_fixtures.py
+#
+# Almacén de respuestas grabadas de SIIAU para reproducirlas después con el servidor local
+# (Funciones.siiau_local) sin depender del servidor real.
+#
+# Grabar: SIIAU_GRABAR=fixtures/siiau streamlit run streamlit_app.py
+#   Cada respuesta correcta que recibe siiau_client se guarda en esa carpeta.
+# Reproducir: python -m Funciones.siiau_local --fixtures fixtures/siiau
+#   y apuntar la app al servidor local con SIIAU_BASE_URL=http://127.0.0.1:8765
+#
+# Cada respuesta se guarda en dos archivos: <clave>.json (método, ruta, formulario, estado y tipo de
+# contenido) y <clave>.body (el cuerpo ya descomprimido). La clave no depende del host, así que lo grabado
+# en SIIAU se encuentra igual al pedirlo al servidor local.
+
+import os
+import json
+import hashlib
+from urllib.parse import urlsplit, parse_qsl
+from Funciones.session_store import escribir_atomico
+
+GRABAR_DIR = os.environ.get("SIIAU_GRABAR")  # Carpeta donde se graban las respuestas (vacío = no grabar)
+
+def _normalizar_formulario(datos):
+    """Formulario como lista ordenada de pares (campo, valor) de texto; los valores vacíos cuentan."""
+    if not datos:
+        return []
+    if isinstance(datos, (bytes, str)):
+        if isinstance(datos, bytes):
+            datos = datos.decode("latin-1")
+        return sorted(parse_qsl(datos, keep_blank_values=True))
+    return sorted((str(campo), "" if valor is None else str(valor)) for campo, valor in dict(datos).items())
+
+def clave_peticion(metodo, url, datos=None):
+    """Clave de una petición: método, ruta, parámetros de la URL y formulario, sin importar el host ni el orden."""
+    partes = urlsplit(url)
+    contenido = json.dumps([
+        metodo.upper(), partes.path, sorted(parse_qsl(partes.query, keep_blank_values=True)),
+        _normalizar_formulario(datos)
+    ], ensure_ascii=False)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+def grabar(carpeta, metodo, url, datos, estado, tipo, cuerpo):
+    """Guarda una respuesta en la carpeta de fixtures (sobrescribe la anterior de la misma petición)."""
+    os.makedirs(carpeta, exist_ok=True)
+    clave = clave_peticion(metodo, url, datos)
+    partes = urlsplit(url)
+    metadatos = {
+        "metodo": metodo.upper(),
+        "ruta": partes.path,
+        "consulta": partes.query,
+        "formulario": dict(_normalizar_formulario(datos)),
+        "estado": estado,
+        "tipo": tipo,
+        "bytes": len(cuerpo),
+    }
+    # Primero el cuerpo: un .json sin su .body se trataría como fixture roto
+    escribir_atomico(os.path.join(carpeta, f"{clave}.body"), lambda f: f.write(cuerpo))
+    texto = json.dumps(metadatos, ensure_ascii=False, indent=2).encode("utf-8")
+    escribir_atomico(os.path.join(carpeta, f"{clave}.json"), lambda f: f.write(texto))
+    return clave
+
+def buscar(carpeta, metodo, url, datos=None):
+    """Devuelve (estado, tipo de contenido, cuerpo) de la respuesta grabada, o None si no hay."""
+    clave = clave_peticion(metodo, url, datos)
+    try:
+        with open(os.path.join(carpeta, f"{clave}.json"), encoding="utf-8") as f:
+            metadatos = json.load(f)
+        with open(os.path.join(carpeta, f"{clave}.body"), "rb") as f:
+            cuerpo = f.read()
+    except (OSError, ValueError):
+        return None
+    return metadatos.get("estado", 200), metadatos.get("tipo") or "text/html", cuerpo
+
+def grabar_respuesta(response, datos=None, carpeta=None, stream=False):
+    """
+    Graba una respuesta de requests si el modo de grabación está activo. Nunca interrumpe la consulta.
+    Con stream=True el cuerpo no se lee aquí (se consumiría el flujo que el llamador va a recorrer): se
+    graba cuando el llamador termina de leerlo con iter_content (o content / iter_lines, que lo usan).
+    """
+    carpeta = carpeta or GRABAR_DIR
+    if not carpeta:
+        return
+    if stream:
+        _grabar_al_consumir(response, datos, carpeta)
+        return
+    _grabar_cuerpo(response, datos, carpeta, response.content)
+
+def _grabar_cuerpo(response, datos, carpeta, cuerpo):
+    try:
+        grabar(carpeta, response.request.method, response.url, datos, response.status_code,
+               response.headers.get("Content-Type"), cuerpo)
+    except OSError as e:  # Incluye el Timeout del lock
+        print(f"No se pudo grabar la respuesta de {response.url}: {e}")
+
+def _grabar_al_consumir(response, datos, carpeta):
+    """Envuelve iter_content para ir guardando los fragmentos y grabar el cuerpo al llegar al final."""
+    iter_content_original = response.iter_content
+
+    def iter_content(chunk_size=1, decode_unicode=False):
+        partes = []
+        for parte in iter_content_original(chunk_size, decode_unicode):
+            partes.append(parte)
+            yield parte
+        # Un cuerpo leído a medias no se graba; uno decodificado a texto tampoco (el fixture guarda bytes)
+        if not decode_unicode:
+            _grabar_cuerpo(response, datos, carpeta, b"".join(partes))
+
+    response.iter_content = iter_content
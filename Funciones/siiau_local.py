@@ -0,0 +1,268 @@
+# Funciones/siiau_local.py
+#
+# Servidor local que imita las tres páginas de SIIAU que usa la app (formulario, lista de carreras y
+# consulta de oferta) para probar el cliente sin depender del servidor real: se le puede añadir
+# retraso, respuestas lentas y errores 5xx.
+#
+# Las respuestas se reproducen de un almacén de fixtures grabado con SIIAU_GRABAR (ver siiau_fixtures)
+# o se sintetizan: una oferta de prueba fija o una generada con el número de sesiones que se pida.
+#
+# Uso: python -m Funciones.siiau_local --puerto 8765 --retraso 0.2 --fallos 1
+#      python -m Funciones.siiau_local --fixtures fixtures/siiau --variacion 0.3 --tasa-error 0.05
+#      python -m Funciones.siiau_local --sesiones 20000
+# y la app se apunta a él con SIIAU_BASE_URL=http://127.0.0.1:8765 streamlit run streamlit_app.py
+
+import gzip
+import socket
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from Funciones import siiau_fixtures
+from Funciones.siiau_client import RUTA_FORMULARIO, RUTA_CARRERAS, RUTA_OFERTA
+
+EDIFICIOS = ["DEDX", "DEDT", "DEDN", "DEDR", "DUCT1", "DBETA"]
+
+FORMULARIO_HTML = """<html><body><form>
+<select name="ciclop"><option value="202520">202520 - Calendario 25 B</option></select>
+<select name="cup"><option value="D">D - CENTRO UNIVERSITARIO DE CIENCIAS EXACTAS E INGENIERIAS</option></select>
+</form></body></html>"""
+
+CARRERAS_HTML = """<html><body><table>
+<tr><th>CICLO</th><th>DESCRIPCION</th></tr>
+<tr><td>INCO</td><td>INGENIERIA EN COMPUTACION</td></tr>
+<tr><td>INNI</td><td>INGENIERIA INFORMATICA</td></tr>
+</table></body></html>"""
+
+OFERTA_HTML = """<html><body><table border="1">
+<tr><th colspan="9">OFERTA</th></tr>
+<tr><th>NRC</th><th>Clave</th><th>Materia</th><th>Sec</th><th>CR</th><th>CUP</th><th>DIS</th><th>Ses/Hora/Días/Edif/Aula/Periodo</th><th>Ses/Profesor</th></tr>
+<tr><td>100001</td><td>I5882</td><td>PROGRAMACION</td><td>D01</td><td>8</td><td>40</td><td>10</td>
+<td><table><tr><td>01</td><td>0700-0855</td><td>L . I . . .</td><td>DEDX</td><td>A001</td><td>13/01/25 - 30/05/25</td></tr></table></td>
+<td><table><tr><td>01</td><td>PROFESOR DE PRUEBA</td></tr></table></td></tr>
+</table></body></html>"""
+
+_LETRAS_DIAS = "LMIJVS"
+
+def _dias_siiau(indices):
+    """Formato de días de SIIAU: una letra por día ocupado y un punto en los libres (ej. 'L . I . . .')."""
+    return " ".join(_LETRAS_DIAS[i] if i in indices else "." for i in range(len(_LETRAS_DIAS)))
+
+def generar_html_oferta(num_sesiones, semilla=0, profesores_extra=0.1):
+    """
+    Genera el HTML de una consulta de oferta con la misma estructura anidada que devuelve SIIAU:
+    una tabla border="1" con dos filas de encabezado y, por NRC, una subtabla de sesiones y otra de profesores.
+    `num_sesiones` es el número de sesiones generadas; extract_table_data produce una fila extra
+    por sesión cuando el NRC tiene dos profesores (proporción `profesores_extra`).
+    """
+    rnd = random.Random(semilla)
+    partes = [
+        '<html><head><meta http-equiv="Content-Type" content="text/html; charset=ISO-8859-1"></head><body>',
+        '<table border="1">',
+        '<tr><th colspan="9">OFERTA ACADÉMICA</th></tr>',
+        '<tr><th>NRC</th><th>Clave</th><th>Materia</th><th>Sec</th><th>CR</th><th>CUP</th><th>DIS</th>'
+        '<th>Ses/Hora/Días/Edif/Aula/Periodo</th><th>Ses/Profesor</th></tr>',
+    ]
+    nrc = 100000
+    generadas = 0
+    while generadas < num_sesiones:
+        nrc += 1
+        num = min(rnd.choice([1, 1, 2]), num_sesiones - generadas)
+        generadas += num
+        sesiones = []
+        for sesion in range(1, num + 1):
+            inicio = rnd.randrange(7, 20)
+            fin = inicio + rnd.choice([0, 1])
+            dias = set(rnd.sample(range(6), rnd.choice([1, 2])))
+            sesiones.append(
+                f"<tr><td>{sesion:02d}</td><td>{inicio:02d}00-{fin:02d}55</td><td>{_dias_siiau(dias)}</td>"
+                f"<td>{rnd.choice(EDIFICIOS)}</td><td>A{rnd.randint(1, 300):03d}</td>"
+                f"<td>13/01/25 - 30/05/25</td></tr>"
+            )
+        profesores = [f"<tr><td>01</td><td>PROFESOR SINTÉTICO {rnd.randint(1, 500)}</td></tr>"]
+        if rnd.random() < profesores_extra:
+            profesores.append(f"<tr><td>02</td><td>PROFESOR ADJUNTO {rnd.randint(1, 500)}</td></tr>")
+        partes.append(
+            f"<tr><td>{nrc}</td><td>I{nrc % 9000:04d}</td><td>MATERIA SINTÉTICA {nrc % 400}</td>"
+            f"<td>D{nrc % 30:02d}</td><td>8</td><td>{rnd.randint(20, 40)}</td><td>{rnd.randint(0, 20)}</td>"
+            f"<td><table>{''.join(sesiones)}</table></td>"
+            f"<td><table>{''.join(profesores)}</table></td></tr>"
+        )
+    partes.append("</table></body></html>")
+    return "\n".join(partes).encode("iso-8859-1")
+
+class ServidorSIIAU:
+    """
+    Servidor de prueba en un hilo aparte.
+
+    - `oferta`: HTML (bytes o str) de la consulta de oferta, o una función que recibe el formulario del POST.
+    - `retraso`: segundos de espera antes de cada respuesta (latencia de SIIAU).
+    - `variacion`: segundos extra aleatorios (0 a `variacion`) que se suman al retraso de cada respuesta.
+    - `fallos`: número de respuestas `estado_fallo` que se envían antes de cada respuesta correcta.
+    - `tasa_error`: probabilidad (0 a 1) de que una respuesta sea `estado_fallo`, además de `fallos`.
+    - `lento`: segundos que se queda callado antes de enviar cada respuesta fallida (simula un SIIAU que
+      se estanca; el cliente debe cortar por timeout de lectura y reintentar).
+    - `fixtures`: carpeta de respuestas grabadas; las peticiones que estén ahí se reproducen tal cual y
+      las demás se sintetizan, o devuelven 404 si `estricto`.
+    - `semilla`: semilla de la latencia y los errores aleatorios, para que una prueba se pueda repetir.
+    """
+
+    def __init__(self, oferta=OFERTA_HTML, retraso=0.0, fallos=0, estado_fallo=503, lento=0.0, puerto=0,
+                 variacion=0.0, tasa_error=0.0, fixtures=None, estricto=False, semilla=None):
+        self.oferta = oferta
+        self.retraso = retraso
+        self.variacion = variacion
+        self.fallos = fallos
+        self.tasa_error = tasa_error
+        self.estado_fallo = estado_fallo
+        self.lento = lento
+        self.fixtures = fixtures
+        self.estricto = estricto
+        self.peticiones = 0
+        self.conexiones = 0
+        self.reproducidas = 0
+        self._azar = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", puerto), self._manejador())
+        self._servidor.daemon_threads = True
+        self._hilo = None
+
+    @property
+    def url(self):
+        host, puerto = self._servidor.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def _siguiente(self):
+        """Devuelve (si a esta petición le toca fallar, segundos de latencia)."""
+        with self._lock:
+            self.peticiones += 1
+            falla = self.fallos > 0 and (self.peticiones - 1) % (self.fallos + 1) < self.fallos
+            if self.tasa_error and self._azar.random() < self.tasa_error:
+                falla = True
+            latencia = self.retraso + (self._azar.uniform(0, self.variacion) if self.variacion else 0.0)
+            return falla, latencia
+
+    def _grabada(self, metodo, ruta, formulario=None):
+        """Respuesta grabada (estado, tipo, cuerpo) de la petición, o None."""
+        if not self.fixtures:
+            return None
+        respuesta = siiau_fixtures.buscar(self.fixtures, metodo, ruta, formulario)
+        if respuesta is not None:
+            with self._lock:
+                self.reproducidas += 1
+        return respuesta
+
+    def _manejador(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Permite conexiones persistentes
+
+            def setup(self):
+                super().setup()
+                # Como SIIAU, responde sin esperar al ACK retardado del cliente entre cabeceras y cuerpo
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with servidor._lock:
+                    servidor.conexiones += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, cuerpo, estado=200, tipo="text/html; charset=ISO-8859-1"):
+                falla, latencia = servidor._siguiente()
+                if latencia:
+                    time.sleep(latencia)
+                if falla:
+                    if servidor.lento:
+                        time.sleep(servidor.lento)
+                        self.close_connection = True
+                    self.send_response(servidor.estado_fallo)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if isinstance(cuerpo, str):
+                    cuerpo = cuerpo.encode("iso-8859-1")
+                self.send_response(estado)
+                self.send_header("Content-Type", tipo)
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    cuerpo = gzip.compress(cuerpo, compresslevel=5)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def do_GET(self):
+                grabada = servidor._grabada("GET", self.path)
+                if grabada is not None:
+                    estado, tipo, cuerpo = grabada
+                    self._responder(cuerpo, estado, tipo)
+                    return
+                ruta = urlparse(self.path).path
+                if ruta == RUTA_FORMULARIO and not servidor.estricto:
+                    self._responder(FORMULARIO_HTML)
+                elif ruta == RUTA_CARRERAS and not servidor.estricto:
+                    self._responder(CARRERAS_HTML)
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                longitud = int(self.headers.get("Content-Length", 0))
+                cuerpo = self.rfile.read(longitud).decode("latin-1")
+                grabada = servidor._grabada("POST", self.path, cuerpo)
+                if grabada is not None:
+                    estado, tipo, contenido = grabada
+                    self._responder(contenido, estado, tipo)
+                    return
+                if urlparse(self.path).path != RUTA_OFERTA or servidor.estricto:
+                    self.send_error(404)
+                    return
+                formulario = {k: v[0] for k, v in parse_qs(cuerpo).items()}
+                oferta = servidor.oferta(formulario) if callable(servidor.oferta) else servidor.oferta
+                self._responder(oferta)
+
+        return Manejador
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self.url
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.detener()
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita SIIAU para pruebas.")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--retraso", type=float, default=0.0, help="Latencia por respuesta (s)")
+    parser.add_argument("--variacion", type=float, default=0.0, help="Latencia extra aleatoria, de 0 a este valor (s)")
+    parser.add_argument("--fallos", type=int, default=0, help="Errores 503 antes de cada respuesta correcta")
+    parser.add_argument("--tasa-error", type=float, default=0.0, help="Probabilidad de responder 503 (0 a 1)")
+    parser.add_argument("--fixtures", help="Carpeta de respuestas grabadas con SIIAU_GRABAR")
+    parser.add_argument("--estricto", action="store_true",
+                        help="Con --fixtures, responde 404 a lo que no esté grabado en lugar de sintetizarlo")
+    parser.add_argument("--sesiones", type=int, default=None,
+                        help="Sintetiza una oferta de este número de sesiones en lugar de la de prueba")
+    parser.add_argument("--semilla", type=int, default=None, help="Semilla de la oferta, la latencia y los errores")
+    args = parser.parse_args()
+    oferta = OFERTA_HTML if args.sesiones is None else generar_html_oferta(args.sesiones, semilla=args.semilla or 0)
+    servidor = ServidorSIIAU(
+        oferta=oferta, retraso=args.retraso, variacion=args.variacion, fallos=args.fallos,
+        tasa_error=args.tasa_error, fixtures=args.fixtures, estricto=args.estricto, semilla=args.semilla,
+        puerto=args.puerto
+    )
+    print(f"SIIAU local en {servidor.url}{RUTA_FORMULARIO}")
+    print(f"Para usarlo desde la app: SIIAU_BASE_URL={servidor.url}")
+    servidor._servidor.serve_forever()
+
+if __name__ == "__main__":
+    main()
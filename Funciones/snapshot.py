@@ -0,0 +1,112 @@
+# Funciones/snapshot.py
+
+import os
+import json
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import ipc
+from Funciones.session_store import escribir_atomico
+
+# Formato columnar de las ofertas guardadas (Arrow IPC sin compresión para poder mapearlo en memoria):
+# - las columnas de texto van codificadas como diccionario (cada materia, profesor, aula... se guarda una vez)
+# - la hora se guarda además como minutos enteros de inicio y fin (-1 si no se pudo interpretar)
+FORMATO_SNAPSHOT = "oferta-v1"
+COLUMNA_INICIO = "InicioMin"
+COLUMNA_FIN = "FinMin"
+
+def _minutos(hora_12h):
+    try:
+        horas_min, periodo = hora_12h.strip().split(" ")
+        horas, minutos = (int(parte) for parte in horas_min.split(":"))
+        return (horas % 12 + (12 if periodo.upper() == "PM" else 0)) * 60 + minutos
+    except (ValueError, AttributeError):
+        return -1
+
+def minutos_de_horas(horas):
+    """Devuelve (inicio, fin) en minutos para una serie de rangos 'HH:MM AM - HH:MM PM'."""
+    rangos = {}
+    for valor in pd.unique(horas):
+        partes = valor.split(" - ") if isinstance(valor, str) else []
+        rangos[valor] = (_minutos(partes[0]), _minutos(partes[1])) if len(partes) == 2 else (-1, -1)
+    pares = [rangos[valor] for valor in horas]
+    inicio = pa.array([par[0] for par in pares], type=pa.int16())
+    fin = pa.array([par[1] for par in pares], type=pa.int16())
+    return inicio, fin
+
+def _columna_arrow(serie):
+    if pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_bool_dtype(serie):
+        return pa.array(serie, from_pandas=True)
+    try:
+        arreglo = pa.array(serie, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Columnas con tipos mezclados (por ejemplo, aulas numéricas y alfanuméricas)
+        arreglo = pa.array([None if pd.isna(v) else str(v) for v in serie], type=pa.string())
+    if pa.types.is_string(arreglo.type) or pa.types.is_large_string(arreglo.type):
+        return arreglo.dictionary_encode()
+    return arreglo
+
+def tabla_desde_oferta(df, metadatos=None):
+    """Convierte una oferta (DataFrame) a una tabla Arrow con el formato del snapshot."""
+    columnas = {str(columna): _columna_arrow(df[columna]) for columna in df.columns
+                if columna not in (COLUMNA_INICIO, COLUMNA_FIN)}
+    if "Hora" in df.columns:
+        inicio, fin = minutos_de_horas(df["Hora"])
+        # Solo las ofertas procesadas (horas en formato de 12 h) llevan las columnas de minutos
+        if pc.any(pc.not_equal(inicio, -1)).as_py():
+            columnas[COLUMNA_INICIO], columnas[COLUMNA_FIN] = inicio, fin
+    tabla = pa.table(columnas)
+    meta = {"formato": FORMATO_SNAPSHOT}
+    if metadatos:
+        meta["metadatos"] = json.dumps(metadatos, ensure_ascii=False)
+    return tabla.replace_schema_metadata(meta)
+
+def escribir_snapshot(df, destino, metadatos=None):
+    """Escribe el snapshot en un archivo abierto en modo binario o en un sink de Arrow."""
+    tabla = tabla_desde_oferta(df, metadatos)
+    with ipc.new_file(destino, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+
+def guardar_snapshot(df, ruta, metadatos=None):
+    """Guarda la oferta como snapshot columnar de forma atómica."""
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    escribir_atomico(ruta, lambda f: escribir_snapshot(df, f, metadatos))
+
+def snapshot_a_bytes(df, metadatos=None):
+    sink = pa.BufferOutputStream()
+    escribir_snapshot(df, sink, metadatos)
+    return sink.getvalue().to_pybytes()
+
+def tabla_a_dataframe(tabla, categoricas=True):
+    """
+    Convierte una tabla de Arrow leída de un snapshot en DataFrame. Con categoricas=False las columnas
+    de diccionario se convierten antes a su tipo de valores (texto normal en lugar de pandas.Categorical).
+    """
+    if not categoricas:
+        tabla = pa.table({
+            nombre: columna.cast(columna.type.value_type) if pa.types.is_dictionary(columna.type) else columna
+            for nombre, columna in zip(tabla.column_names, tabla.columns)
+        })
+    return tabla.to_pandas()
+
+def leer_tabla(ruta):
+    """Abre el snapshot mapeado en memoria; las columnas se leen sin copiarlas del archivo."""
+    return ipc.open_file(pa.memory_map(ruta, "r")).read_all()
+
+def cargar_snapshot(ruta, categoricas=True):
+    """
+    Carga un snapshot como DataFrame. Con categoricas=True las columnas de texto quedan como
+    pandas.Categorical, que comparte el diccionario en lugar de repetir cada cadena.
+    """
+    return tabla_a_dataframe(leer_tabla(ruta), categoricas)
+
+def snapshot_desde_bytes(datos, categoricas=True):
+    tabla = ipc.open_file(pa.BufferReader(datos)).read_all()
+    return tabla_a_dataframe(tabla, categoricas)
+
+def metadatos_snapshot(ruta):
+    """Devuelve los metadatos guardados con guardar_snapshot (o {} si no hay)."""
+    meta = ipc.open_file(pa.memory_map(ruta, "r")).schema.metadata or {}
+    return json.loads(meta.get(b"metadatos", b"{}").decode("utf-8"))
@@ -0,0 +1,82 @@
+# Funciones/solver.py
+
+import time
+from Funciones.utils import Clase, formatear_hora, mascara_horario
+
+MAX_HORARIOS = 200       # Límite duro de horarios generados por búsqueda
+TIEMPO_LIMITE = 3.0      # Segundos máximos de búsqueda
+
+def agrupar_secciones(df, materias):
+    """
+    Agrupa la oferta por materia y NRC.
+
+    Devuelve una lista [(materia, [(nrc, [Clase, ...]), ...]), ...] en el orden de `materias`.
+    Las sesiones sin un horario válido no ocupan tiempo y se omiten de las clases.
+    """
+    grupos = []
+    for materia in materias:
+        secciones = {}
+        for _, row in df[df["Materia"] == materia].iterrows():
+            clases = secciones.setdefault(row["NRC"], [])
+            hora_formateada = formatear_hora(row["Hora"])
+            if hora_formateada is None:
+                continue
+            hora_inicio, hora_fin = hora_formateada.split(" - ")
+            clases.append(Clase(row["NRC"], materia, row["Días"], hora_inicio, hora_fin,
+                                row.get("Edificio", ""), row.get("Aula", "")))
+        grupos.append((materia, list(secciones.items())))
+    return grupos
+
+def generar_horarios(df, materias, max_resultados=MAX_HORARIOS, tiempo_limite=TIEMPO_LIMITE):
+    """
+    Genera de forma perezosa todas las combinaciones de NRC sin cruces (una sección por materia).
+
+    Usa backtracking con poda temprana: una sección se descarta en cuanto choca con las ya elegidas.
+    Cada sección se reduce a su máscara semanal, así que probarla contra el horario parcial es un solo AND.
+    Las materias con menos secciones se exploran primero para podar antes.
+    Cada resultado es un diccionario {materia: nrc} en el orden de `materias`.
+    La búsqueda se detiene al llegar a `max_resultados` o al agotar `tiempo_limite` segundos.
+    """
+    grupos = agrupar_secciones(df, materias)
+    if not grupos or any(not secciones for _, secciones in grupos):
+        return
+
+    grupos.sort(key=lambda grupo: len(grupo[1]))
+    grupos = [(materia, [(nrc, mascara_horario(clases)) for nrc, clases in secciones])
+              for materia, secciones in grupos]
+    limite = time.monotonic() + tiempo_limite if tiempo_limite else None
+    elegidos = []
+    ocupado = 0
+    generados = 0
+
+    # Pila explícita de iteradores para no depender de la recursión de Python
+    pila = [iter(grupos[0][1])]
+    while pila:
+        if limite is not None and time.monotonic() > limite:
+            return
+
+        nivel = len(pila) - 1
+        siguiente = next(pila[-1], None)
+        if siguiente is None:
+            pila.pop()
+            if elegidos:
+                _, mascara = elegidos.pop()
+                ocupado ^= mascara
+            continue
+
+        nrc, mascara = siguiente
+        if mascara & ocupado:
+            continue
+
+        if nivel + 1 == len(grupos):
+            seleccion = {grupos[i][0]: elegido for i, (elegido, _) in enumerate(elegidos)}
+            seleccion[grupos[nivel][0]] = nrc
+            yield {materia: seleccion[materia] for materia in materias if materia in seleccion}
+            generados += 1
+            if max_resultados and generados >= max_resultados:
+                return
+            continue
+
+        elegidos.append((nrc, mascara))
+        ocupado |= mascara
+        pila.append(iter(grupos[nivel + 1][1]))
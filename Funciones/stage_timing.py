@@ -0,0 +1,99 @@
+# Funciones/stage_timing.py
+#
+# Medición por etapas: consulta a SIIAU, parseo del HTML, procesamiento de la oferta, cruces, estilos,
+# PDF... Cada etapa se mide con `etapa("nombre")` (como bloque `with` o como decorador) y queda en tres sitios:
+# - una ventana de las últimas mediciones de cada etapa, de la que salen p50 y p95 (resumen()),
+# - la lista de la ronda actual (un rerun de Streamlit, una petición), para el panel de la app,
+# - una línea de log en JSON por medición (logger "horarios.tiempos"; TIEMPOS_LOG=0 lo desactiva).
+
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import ContextDecorator
+
+logger = logging.getLogger("horarios.tiempos")
+
+VENTANA = int(os.environ.get("TIEMPOS_VENTANA", 500))  # Mediciones que se conservan por etapa
+LOG_ACTIVO = os.environ.get("TIEMPOS_LOG", "1") != "0"
+
+_mediciones = {}  # etapa -> deque de duraciones (s), de la más antigua a la más reciente
+_lock = threading.Lock()
+# Mediciones de la ronda en curso [(etapa, segundos)]; None fuera de una ronda. Los hilos de los pools no
+# heredan el contexto, así que lo que hacen en segundo plano no se mezcla con la ronda de la interfaz.
+_ronda = contextvars.ContextVar("ronda_tiempos", default=None)
+
+class etapa(ContextDecorator):
+    """
+    Mide una etapa. Los campos extra (`**campos`) solo van al log, por ejemplo el número de filas:
+        with etapa("process_data_from_web", filas=len(df)):
+            ...
+    """
+
+    def __init__(self, nombre, **campos):
+        self.nombre = nombre
+        self.campos = campos
+
+    def _recreate_cm(self):
+        # Como decorador, cada llamada usa su propia instancia: la función puede ejecutarse en varios hilos a la vez
+        return etapa(self.nombre, **self.campos)
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo_error, error, traza):
+        registrar(self.nombre, time.perf_counter() - self._inicio, error is None, **self.campos)
+        return False
+
+def registrar(nombre, segundos, ok=True, **campos):
+    """Registra una medición hecha por fuera de `etapa` (por ejemplo, el total de un rerun)."""
+    with _lock:
+        ventana = _mediciones.get(nombre)
+        if ventana is None:
+            ventana = _mediciones[nombre] = deque(maxlen=VENTANA)
+        ventana.append(segundos)
+    ronda = _ronda.get()
+    if ronda is not None:
+        ronda.append((nombre, segundos))
+    if LOG_ACTIVO and logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(
+            {"evento": "etapa", "etapa": nombre, "ms": round(segundos * 1000, 3), "ok": ok, **campos},
+            ensure_ascii=False, default=str
+        ))
+
+def iniciar_ronda():
+    """Empieza una ronda nueva (un rerun) en el contexto actual y devuelve su lista de mediciones."""
+    ronda = []
+    _ronda.set(ronda)
+    return ronda
+
+def ronda_actual():
+    """Mediciones [(etapa, segundos)] de la ronda en curso, en el orden en que terminaron."""
+    return list(_ronda.get() or [])
+
+def _percentil(ordenados, fraccion):
+    return ordenados[min(len(ordenados) - 1, int(round(fraccion * (len(ordenados) - 1))))]
+
+def resumen():
+    """Por etapa: número de mediciones en la ventana, p50, p95 y última duración (en ms)."""
+    with _lock:
+        copias = {nombre: list(ventana) for nombre, ventana in _mediciones.items()}
+    resultado = {}
+    for nombre, valores in copias.items():
+        ordenados = sorted(valores)
+        resultado[nombre] = {
+            "n": len(valores),
+            "p50_ms": _percentil(ordenados, 0.50) * 1000,
+            "p95_ms": _percentil(ordenados, 0.95) * 1000,
+            "ultimo_ms": valores[-1] * 1000,
+        }
+    return resultado
+
+def reiniciar():
+    """Borra todas las mediciones acumuladas."""
+    with _lock:
+        _mediciones.clear()
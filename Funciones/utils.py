@@ -1,7 +1,9 @@
 # Funciones/utils.py
 
+import heapq
 import datetime
 import pytz
+from Funciones.stage_timing import etapa
 
 def clean_days(value):
     days_mapping = {
@@ -13,8 +15,44 @@ def clean_days(value):
         return [day for day in cleaned_days if day and "Desconocido" not in day]
     return []
 
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"]
+# Un bit por minuto (1440 por día, 8640 por semana: sigue siendo un solo entero de Python). Con bloques más
+# grandes habría que redondear y hay_cruce marcaría cruces que detectar_cruces, con minutos exactos, no ve
+MINUTOS_POR_BLOQUE = 1
+BLOQUES_POR_DIA = 24 * 60 // MINUTOS_POR_BLOQUE
+_INDICE_DIA = {dia: i for i, dia in enumerate(DIAS_SEMANA)}
+
+def hora_a_minutos(hora):
+    """Convierte una hora HH:MM (24h) a minutos desde la medianoche. Devuelve None si no es válida."""
+    try:
+        horas, minutos = (int(parte) for parte in hora.split(":"))
+    except (ValueError, AttributeError):
+        return None
+    # Fuera de rango no es una hora: su máscara invadiría los bits del día siguiente
+    if not (0 <= horas <= 23 and 0 <= minutos <= 59):
+        return None
+    return horas * 60 + minutos
+
+def mascara_semanal(dia, inicio_min, fin_min):
+    """
+    Devuelve la ocupación semanal de una sesión como entero de bits.
+
+    Cada día ocupa BLOQUES_POR_DIA bits consecutivos y cada bit representa MINUTOS_POR_BLOQUE minutos.
+    La sesión ocupa [inicio, fin), igual que en detectar_cruces: una clase que termina cuando empieza
+    la siguiente no se cruza con ella.
+    """
+    indice = _INDICE_DIA.get(dia) if isinstance(dia, str) else None
+    if indice is None or inicio_min is None or fin_min is None or fin_min <= inicio_min:
+        return 0
+    primer_bloque = inicio_min // MINUTOS_POR_BLOQUE
+    ultimo_bloque = -(-fin_min // MINUTOS_POR_BLOQUE)
+    return ((1 << (ultimo_bloque - primer_bloque)) - 1) << (indice * BLOQUES_POR_DIA + primer_bloque)
+
 class Clase:
-    def __init__(self, nrc, materia, dia, hora_inicio, hora_fin, edificio, aula): # <-- ¡Cambio aquí!
+    __slots__ = ("nrc", "materia", "dia", "hora_inicio", "hora_fin", "edificio", "aula", "profesor",
+                 "inicio_min", "fin_min", "mascara")
+
+    def __init__(self, nrc, materia, dia, hora_inicio, hora_fin, edificio, aula, profesor=""): # <-- ¡Cambio aquí!
         self.nrc = nrc
         self.materia = materia
         self.dia = dia
@@ -22,27 +60,69 @@ class Clase:
         self.hora_fin = hora_fin
         self.edificio = edificio # <-- ¡Nuevo atributo!
         self.aula = aula     # <-- ¡Nuevo atributo!
+        self.profesor = profesor
+        # Ocupación precalculada para que comparar dos clases sea un solo AND
+        self.inicio_min = hora_a_minutos(hora_inicio)
+        self.fin_min = hora_a_minutos(hora_fin)
+        self.mascara = mascara_semanal(dia, self.inicio_min, self.fin_min)
 
 def hay_cruce(clase1, clase2):
-    if clase1.dia != clase2.dia:
-        return False
+    return (clase1.mascara & clase2.mascara) != 0
+
+def mascara_horario(clases):
+    """Une la ocupación de varias clases en una sola máscara semanal."""
+    mascara = 0
+    for clase in clases:
+        mascara |= clase.mascara
+    return mascara
+
+# Claves para agrupar las sesiones al buscar cruces: el alumno compara toda su selección,
+# las auditorías comparan solo sesiones que comparten aula o profesor.
+CLAVES_AGRUPACION = {
+    "seleccion": None,
+    "aula": lambda clase: (clase.edificio, clase.aula) if clase.aula else None,
+    "profesor": lambda clase: clase.profesor or None,
+}
+
+@etapa("detectar_cruces")
+def detectar_cruces(clases, agrupar_por="seleccion"):
+    """
+    Detecta los cruces de horario con un barrido por día y hora de inicio en O(n log n + k).
+
+    Devuelve {dia: [(Clase, Clase), ...]} con los pares en el mismo orden que la comparación
+    de todos contra todos. Con agrupar_por="aula" o "profesor" solo se comparan sesiones del
+    mismo aula o profesor y se ignoran los pares de un mismo NRC (dobles reservas).
+    """
+    if agrupar_por not in CLAVES_AGRUPACION:
+        raise ValueError(f"Agrupación de cruces desconocida: {agrupar_por}")
+    clave = CLAVES_AGRUPACION[agrupar_por]
 
-    inicio1 = int(clase1.hora_inicio.replace(":", ""))
-    fin1 = int(clase1.hora_fin.replace(":", ""))
-    inicio2 = int(clase2.hora_inicio.replace(":", ""))
-    fin2 = int(clase2.hora_fin.replace(":", ""))
+    grupos = {}
+    for i, clase in enumerate(clases):
+        if clase.inicio_min is None or clase.fin_min is None:
+            continue
+        grupo = clave(clase) if clave else None
+        if clave and grupo is None:
+            continue
+        grupos.setdefault((clase.dia, grupo), []).append((clase.inicio_min, clase.fin_min, i))
 
-    if inicio1 < fin2 and inicio2 < fin1:
-        return True
-    return False
+    pares = []
+    for sesiones in grupos.values():
+        sesiones.sort()
+        activas = []  # Montículo (fin, índice) de las sesiones que siguen abiertas
+        for inicio, fin, i in sesiones:
+            while activas and activas[0][0] <= inicio:
+                heapq.heappop(activas)
+            for _, j in activas:
+                if clave and clases[i].nrc == clases[j].nrc:
+                    continue
+                pares.append((j, i) if j < i else (i, j))
+            heapq.heappush(activas, (fin, i))
 
-def detectar_cruces(clases):
+    pares.sort()
     cruces = {}
-    for i in range(len(clases)):
-        for j in range(i + 1, len(clases)):
-            if hay_cruce(clases[i], clases[j]):
-                dia = clases[i].dia
-                cruces.setdefault(dia, []).append((clases[i], clases[j]))
+    for i, j in pares:
+        cruces.setdefault(clases[i].dia, []).append((clases[i], clases[j]))
     return cruces
 
 def generar_mensaje_cruces(cruces):
@@ -79,7 +159,8 @@ def crear_clases_desde_dataframe(df):
                     hora_inicio,
                     hora_fin,
                     row["Edificio"], # <-- ¡Nuevo parámetro!
-                    row["Aula"]      # <-- ¡Nuevo parámetro!
+                    row["Aula"],     # <-- ¡Nuevo parámetro!
+                    row.get("Profesor", "")
                 )
             )
         except (ValueError, KeyError, Exception) as e:
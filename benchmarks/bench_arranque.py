@@ -0,0 +1,129 @@
+# benchmarks/bench_arranque.py
+#
+# Arranque en frío de la app: cuánto tarda el primer render de la pestaña 1 en un proceso nuevo
+# (importaciones de streamlit_app incluidas) y qué módulos se importan en ese primer rerun, medido con
+# -X importtime. También mide el primer rerun que llega a la pestaña 3, donde se cargan PDF y Excel.
+#
+# Cada repetición es un proceso nuevo con streamlit ya importado (como un worker recién arrancado que
+# recibe su primera sesión) y SIIAU servido por el servidor local.
+# Uso: python -m benchmarks.bench_arranque [--repeticiones 5] [--top 15]
+
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MARCA = "### primer rerun ###"
+_LINEA = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+def _medir():
+    """Se ejecuta en el proceso hijo: imprime en stdout un JSON con los tiempos de los dos reruns."""
+    import time
+    import tempfile
+    os.environ.setdefault("ARTEFACTOS_DIR", tempfile.mkdtemp())
+    os.environ["TIEMPOS_LOG"] = "0"
+    from Funciones import siiau_client
+    from Funciones.siiau_local import ServidorSIIAU
+    servidor = ServidorSIIAU()
+    servidor.iniciar()
+    # form_handler arma sus URL al importarse, ya dentro de la app: basta con cambiar la base antes
+    siiau_client.BASE_URL = servidor.url
+    from streamlit.testing.v1 import AppTest
+
+    # Todo lo que se importe a partir de aquí lo importa la propia app
+    print(MARCA, file=sys.stderr, flush=True)
+    app = AppTest.from_file(os.path.join(RAIZ, "streamlit_app.py"), default_timeout=120)
+    inicio = time.perf_counter()
+    app.run()
+    primer_render = time.perf_counter() - inicio
+    modulos_tab1 = set(sys.modules)
+    errores = [e.value for e in app.exception]
+
+    # Primera vez que se usa la pestaña 3: una selección ya hecha sobre una oferta sintética
+    print(MARCA, file=sys.stderr, flush=True)
+    from benchmarks.sinteticos import generar_oferta_procesada
+    oferta = generar_oferta_procesada(3000)
+    nrcs = list(oferta["NRC"].unique()[:6])
+    app.session_state["query_state"] = {
+        "done": True, "table_data": None, "selected_nrcs": nrcs,
+        "selected_subjects": sorted(set(oferta[oferta["NRC"].isin(nrcs)]["Materia"])),
+    }
+    app.session_state["expanded_data"] = oferta
+    app.session_state["selected_options"] = {"ciclop": {"value": "202520", "description": "Calendario 25 B"}}
+    app.session_state["pestana"] = "3️⃣ Generar Horario"  # Solo se ejecuta la pestaña abierta
+    inicio = time.perf_counter()
+    app.run()
+    primer_tab3 = time.perf_counter() - inicio
+    errores += [e.value for e in app.exception]
+    servidor.detener()
+
+    pesados = ("reportlab", "pypdf", "xlsxwriter", "openpyxl", "matplotlib")
+    print(json.dumps({
+        "primer_render_s": primer_render,
+        "primer_tab3_s": primer_tab3,
+        "pesados_en_tab1": sorted(m for m in pesados if m in modulos_tab1),
+        "errores": errores,
+    }))
+
+def _importaciones(stderr):
+    """
+    Tiempos de -X importtime de cada tramo (separados por MARCA): lista de {módulo: µs acumulados}
+    con solo las importaciones de primer nivel del tramo.
+    """
+    tramos = []
+    for linea in stderr.splitlines():
+        if linea.startswith(MARCA):
+            tramos.append({})
+            continue
+        coincidencia = _LINEA.match(linea)
+        if coincidencia and tramos:
+            _, acumulado, sangria, modulo = coincidencia.groups()
+            if len(sangria) == 1:  # Solo las importaciones de primer nivel
+                tramos[-1][modulo] = tramos[-1].get(modulo, 0) + int(acumulado)
+    return tramos
+
+def ejecutar(repeticiones=5, top=15):
+    medidas = []
+    importaciones = None
+    for _ in range(repeticiones):
+        proceso = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "benchmarks.bench_arranque", "--hijo"],
+            cwd=RAIZ, capture_output=True, text=True, timeout=600
+        )
+        if proceso.returncode != 0:
+            print(proceso.stderr[-2000:])
+            raise SystemExit(1)
+        medidas.append(json.loads(proceso.stdout.strip().splitlines()[-1]))
+        importaciones = importaciones or _importaciones(proceso.stderr)
+
+    errores = [e for m in medidas for e in m["errores"]]
+    if errores:
+        print(f"Errores de la app: {errores[:3]}")
+    primer_render = statistics.median(m["primer_render_s"] for m in medidas)
+    primer_tab3 = statistics.median(m["primer_tab3_s"] for m in medidas)
+    print(f"Primer render (pestaña 1): {primer_render * 1000:8.1f} ms  (mediana de {repeticiones} procesos)")
+    print(f"Primer uso de la pestaña 3: {primer_tab3 * 1000:8.1f} ms")
+    print(f"Dependencias pesadas cargadas antes de la pestaña 1: {', '.join(medidas[0]['pesados_en_tab1']) or 'ninguna'}")
+    for titulo, tramo in zip(("Importaciones del primer render", "Importaciones del primer uso de la pestaña 3"),
+                             importaciones):
+        print(f"\n{titulo} (total {sum(tramo.values()) / 1000:.1f} ms):")
+        for modulo, micros in sorted(tramo.items(), key=lambda x: -x[1])[:top]:
+            print(f"  {modulo:<40} {micros / 1000:8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Arranque en frío e importaciones de la app.")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Módulos que se muestran por tramo")
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.hijo:
+        _medir()
+    else:
+        ejecutar(args.repeticiones, args.top)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# benchmarks/bench_batch_pdf.py
+#
+# Compara renderizar N horarios uno por uno con create_schedule_pdf (como en la app) frente a
+# renderizar_pdfs en un pool de procesos, en ZIP y en un solo PDF de varias páginas.
+# Uso: python -m benchmarks.bench_batch_pdf
+
+import io
+import os
+import time
+import zipfile
+from Funciones.schedule import create_schedule_sheet, create_schedule_pdf
+from Funciones.batch_render import renderizar_pdfs, obtener_pool, cerrar_pool, _pdf_writer
+from benchmarks.sinteticos import generar_oferta_procesada
+
+NUM_HORARIOS = 60
+NRCS_POR_HORARIO = 7
+
+def _horarios(num_horarios):
+    oferta = generar_oferta_procesada(num_horarios * NRCS_POR_HORARIO * 2)
+    nrcs = oferta["NRC"].unique()
+    return [
+        create_schedule_sheet(oferta[oferta["NRC"].isin(nrcs[i * NRCS_POR_HORARIO:(i + 1) * NRCS_POR_HORARIO])])
+        for i in range(num_horarios)
+    ]
+
+def main():
+    horarios = _horarios(NUM_HORARIOS)
+    print(f"{NUM_HORARIOS} horarios, {os.cpu_count()} CPU, pypdf {'sí' if _pdf_writer() else 'no'}")
+
+    inicio = time.perf_counter()
+    secuencial = [create_schedule_pdf(horario, "Calendario 25 B").getvalue() for horario in horarios]
+    t_secuencial = time.perf_counter() - inicio
+    print(f"secuencial (un documento a la vez): {t_secuencial:6.2f} s")
+
+    # El arranque del pool (procesos nuevos + estilos) se paga una vez por servidor, no por lote
+    inicio = time.perf_counter()
+    obtener_pool()
+    renderizar_pdfs(horarios[:1], "Calendario 25 B")
+    print(f"arranque del pool:                  {time.perf_counter() - inicio:6.2f} s")
+
+    inicio = time.perf_counter()
+    archivo_zip = renderizar_pdfs(horarios, "Calendario 25 B", formato="zip")
+    t_zip = time.perf_counter() - inicio
+    with zipfile.ZipFile(io.BytesIO(archivo_zip)) as zf:
+        assert len(zf.namelist()) == len(secuencial)
+    print(f"pool, ZIP:                          {t_zip:6.2f} s  (x{t_secuencial / t_zip:.1f})")
+
+    inicio = time.perf_counter()
+    pdf = renderizar_pdfs(horarios, "Calendario 25 B", formato="pdf")
+    t_pdf = time.perf_counter() - inicio
+    print(f"pool, PDF de varias páginas:        {t_pdf:6.2f} s  (x{t_secuencial / t_pdf:.1f}), {len(pdf) / 1e3:.0f} KB")
+    cerrar_pool()
+
+if __name__ == "__main__":
+    main()
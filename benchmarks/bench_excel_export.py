@@ -0,0 +1,49 @@
+# benchmarks/bench_excel_export.py
+#
+# Compara la exportación anterior (DataFrame.to_excel a un BytesIO) con exportar_horario_excel en modo
+# constant_memory al exportar la oferta completa de un centro: tiempo y pico de memoria de Python.
+# Uso: python -m benchmarks.bench_excel_export
+
+import io
+import time
+import tracemalloc
+import pandas as pd
+from Funciones.schedule import create_schedule_sheet
+from Funciones.excel_export import exportar_horario_excel
+from benchmarks.sinteticos import generar_oferta_procesada
+
+TAMANOS = [1_000, 10_000, 40_000]
+
+def exportar_to_excel(schedule, oferta):
+    """Exportación anterior con pandas, añadiendo la oferta como segunda hoja."""
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+        schedule.to_excel(writer, sheet_name="Horario", index=False)
+        oferta.to_excel(writer, sheet_name="Oferta", index=False)
+    return buffer.getvalue()
+
+def exportar_nuevo(schedule, oferta):
+    return exportar_horario_excel(schedule, "Calendario 25 B", sesiones=oferta.iloc[:20], oferta=oferta)
+
+def _medir(funcion, *args):
+    """Devuelve (segundos, MB de pico); la memoria se mide en una segunda pasada para no inflar el tiempo."""
+    inicio = time.perf_counter()
+    datos = funcion(*args)
+    duracion = time.perf_counter() - inicio
+    tracemalloc.start()
+    funcion(*args)
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duracion, pico / 1e6, len(datos) / 1e6
+
+def main():
+    for filas in TAMANOS:
+        oferta = generar_oferta_procesada(filas)
+        schedule = create_schedule_sheet(oferta.iloc[:20])
+        print(f"Oferta de {filas} filas")
+        for nombre, funcion in (("to_excel", exportar_to_excel), ("constant_memory", exportar_nuevo)):
+            duracion, pico, tamano = _medir(funcion, schedule, oferta)
+            print(f"  {nombre:<16} {duracion:6.2f} s | pico {pico:7.1f} MB | archivo {tamano:5.1f} MB")
+
+if __name__ == "__main__":
+    main()
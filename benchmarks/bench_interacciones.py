@@ -0,0 +1,268 @@
+# benchmarks/bench_interacciones.py
+#
+# Llamadas costosas por interacción: cuántas veces se consulta SIIAU, se guarda la sesión, se calculan
+# cruces, se aplican estilos o se piden artefactos (PDF, Excel, JSON) cuando el usuario cambia un solo
+# widget. Cada interacción se mide dos veces:
+# - "fragmento": como la manda el navegador, un rerun solo del fragmento que contiene el widget,
+# - "completo": como un rerun de toda la app (lo que pasaba antes de los fragmentos), como referencia.
+#
+# Las cuentas de "fragmento" se comparan con benchmarks/baselines/interacciones.json: cualquier llamada
+# de más es una regresión (código de salida 1), porque aquí no hay ruido que tolerar.
+#
+# AppTest no simula los reruns de fragmento por sí mismo (siempre ejecuta la app entera); el benchmark
+# añade a la petición de rerun el fragmento con la clave indicada, igual que hace el navegador.
+#
+# Uso: python -m benchmarks.bench_interacciones [--actualizar] [--base benchmarks/baselines/interacciones.json]
+
+import os
+import sys
+import json
+import time
+import argparse
+import functools
+import importlib
+import dataclasses
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTA_BASE = os.path.join(os.path.dirname(__file__), "baselines", "interacciones.json")
+NUM_SESIONES = 3000
+NRCS_SELECCION = 6
+
+# Funciones que se cuentan (módulo, nombre). La app las importa con "from ... import" en cada rerun,
+# así que basta con reemplazarlas en su módulo antes de ejecutarla
+CONTADAS = [
+    ("Funciones.siiau_client", "peticion"),
+    ("Funciones.form_handler", "fetch_form_options_with_descriptions"),
+    ("Funciones.form_handler", "show_abbreviations"),
+    ("Funciones.form_handler", "precargar_carreras"),
+    ("Funciones.session_store", "guardar_datos_sesion"),
+    ("Funciones.utils", "crear_clases_desde_dataframe"),
+    ("Funciones.utils", "detectar_cruces"),
+    ("Funciones.solver", "generar_horarios"),
+    ("Diseño.styles", "apply_dataframe_styles"),
+    ("Diseño.styles", "apply_dataframe_styles_with_cruces"),
+    ("Funciones.artifact_cache", "obtener_artefacto"),
+    ("Funciones.schedule", "create_schedule_sheet"),
+    ("Funciones.schedule", "create_schedule_pdf"),
+    ("Funciones.schedule", "export_schedule_json"),
+    ("Funciones.excel_export", "exportar_horario_excel"),
+]
+
+PESTANAS = {
+    1: "1️⃣ Consulta Inicial",
+    2: "2️⃣ Selección de Materias",
+    3: "3️⃣ Generar Horario",
+}
+
+class Contador:
+    """Reemplaza las funciones de CONTADAS por envolturas que cuentan sus llamadas."""
+
+    def __init__(self):
+        self.llamadas = Counter()
+        self._originales = []
+
+    def instalar(self):
+        for nombre_modulo, nombre in CONTADAS:
+            modulo = importlib.import_module(nombre_modulo)
+            original = getattr(modulo, nombre)
+            self._originales.append((modulo, nombre, original))
+            setattr(modulo, nombre, self._envolver(original, nombre))
+
+    def _envolver(self, funcion, nombre):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            self.llamadas[nombre] += 1
+            return funcion(*args, **kwargs)
+        return envoltura
+
+    def desinstalar(self):
+        for modulo, nombre, original in reversed(self._originales):
+            setattr(modulo, nombre, original)
+        self._originales.clear()
+
+@contextmanager
+def _rerun_de_fragmento(app, clave):
+    """
+    Durante el bloque, los reruns de `app` ejecutan solo el fragmento `clave` (como al cambiar un widget
+    que está dentro de él). Si la app no tiene ese fragmento, el rerun es completo.
+    """
+    from streamlit.runtime.scriptrunner import ScriptRunner
+    ids = list(app._fragment_storage._ids_by_target_key.get(clave, {})) if clave else []
+    init_original, request_original = ScriptRunner.__init__, ScriptRunner.request_rerun
+
+    # AppTest crea un ScriptRunner por rerun con una petición inicial de rerun completo, con la que se
+    # fusiona la de los widgets: las dos tienen que llevar el fragmento
+    def __init__(self, *args, **kwargs):
+        kwargs["initial_rerun_data"] = dataclasses.replace(kwargs["initial_rerun_data"], fragment_id_queue=ids)
+        init_original(self, *args, **kwargs)
+
+    def request_rerun(self, rerun_data):
+        return request_original(self, dataclasses.replace(rerun_data, fragment_id_queue=ids))
+
+    if ids:
+        ScriptRunner.__init__, ScriptRunner.request_rerun = __init__, request_rerun
+    try:
+        yield bool(ids)
+    finally:
+        ScriptRunner.__init__, ScriptRunner.request_rerun = init_original, request_original
+
+def _esperar_carreras(limite=30):
+    """Espera a que terminen las descargas de carreras en segundo plano (no deben caer en otra medición)."""
+    from Funciones import form_handler
+    fin = time.monotonic() + limite
+    while form_handler._en_curso and time.monotonic() < fin:
+        time.sleep(0.01)
+
+def _cambiar_carrera(app):
+    selector = next(s for s in app.selectbox if s.label == "Selecciona tu carrera:")
+    otra = next(o for o in selector.options if o != selector.value)
+    selector.set_value(otra)
+
+def _cambiar_grupo(app):
+    # Las opciones del árbol son las descripciones (format_func); el valor se fija con los NRC
+    selector = next(m for m in app.multiselect if m.key and m.key.startswith("nrcs_"))
+    nrcs = app.session_state["indice_secciones"].nrcs_de(selector.key[len("nrcs_"):])
+    selector.set_value([next(n for n in nrcs if n not in selector.value)])
+
+# (nombre, pestaña abierta, clave del fragmento que contiene el widget o None, acción sobre el árbol)
+INTERACCIONES = [
+    ("pestaña 1: cambiar de carrera", 1, "consulta", _cambiar_carrera),
+    ("pestaña 2: cambiar el grupo de una materia", 2, "materias", _cambiar_grupo),
+    ("pestaña 2: buscar combinaciones sin cruces", 2, "generador",
+     lambda app: app.button(key="buscar_combinaciones").click()),
+    ("pestaña 3: incluir la oferta completa en el Excel", 3, "excel",
+     lambda app: app.checkbox(key="excel_con_oferta").check()),
+    ("barra lateral: mostrar tiempos (pestaña 3 abierta)", 3, None,
+     lambda app: app.checkbox(key="mostrar_tiempos").check()),
+]
+
+def _nueva_app(oferta):
+    """AppTest con una consulta ya hecha y una selección de NRCS_SELECCION grupos sobre `oferta`."""
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_file(os.path.join(RAIZ, "streamlit_app.py"), default_timeout=120)
+    nrcs = list(oferta["NRC"].unique()[:NRCS_SELECCION])
+    app.session_state["query_state"] = {
+        "done": True, "table_data": None, "selected_nrcs": nrcs,
+        "selected_subjects": sorted(set(oferta[oferta["NRC"].isin(nrcs)]["Materia"])),
+    }
+    app.session_state["expanded_data"] = oferta
+    app.session_state["selected_options"] = {"ciclop": {"value": "202520", "description": "Calendario 25 B"}}
+    return app
+
+def medir_interaccion(contador, oferta, pestana, fragmento, accion):
+    """
+    Prepara una sesión con la pestaña abierta (reruns completos, sin contar) y mide una interacción.
+    Devuelve (llamadas, si corrió como fragmento, errores de la app).
+    """
+    from Funciones import artifact_cache
+    # Cada medición parte de la caché de artefactos vacía: lo que genere la interacción no lo reutiliza la siguiente
+    artifact_cache.vaciar_memoria()
+    artifact_cache.ARTEFACTOS_DIR = tempfile.mkdtemp(prefix="artefactos-")
+    app = _nueva_app(oferta)
+    app.session_state["pestana"] = PESTANAS[pestana]
+    app.run()
+    app.run()  # El segundo rerun ya encuentra calientes los índices y la caché de artefactos
+    _esperar_carreras()
+    errores = [e.value for e in app.exception]
+
+    accion(app)
+    # AppTest no devuelve el estado de las pestañas con el de los widgets: se vuelve a fijar la abierta
+    app.session_state["pestana"] = PESTANAS[pestana]
+    contador.llamadas.clear()
+    with _rerun_de_fragmento(app, fragmento) as como_fragmento:
+        app.run()
+    _esperar_carreras()
+    errores += [e.value for e in app.exception]
+    return dict(contador.llamadas), como_fragmento, errores
+
+def ejecutar():
+    """Mide todas las interacciones. Devuelve {interacción: {"fragmento": llamadas, "completo": llamadas}}."""
+    os.environ["TIEMPOS_LOG"] = "0"
+    if RAIZ not in sys.path:
+        sys.path.insert(0, RAIZ)
+    from Funciones import siiau_client
+    from Funciones.siiau_local import ServidorSIIAU
+    from benchmarks.sinteticos import generar_oferta_procesada
+
+    servidor = ServidorSIIAU()
+    servidor.iniciar()
+    # form_handler arma sus URL al importarse, ya dentro de la app: basta con cambiar la base antes
+    siiau_client.BASE_URL = servidor.url
+    contador = Contador()
+    contador.instalar()
+    oferta = generar_oferta_procesada(NUM_SESIONES)
+    resultados = {}
+    try:
+        for nombre, pestana, fragmento, accion in INTERACCIONES:
+            resultado = {}
+            for modo, clave in (("fragmento", fragmento), ("completo", None)):
+                llamadas, como_fragmento, errores = medir_interaccion(contador, oferta, pestana, clave, accion)
+                if errores:
+                    print(f"Errores de la app en '{nombre}' ({modo}): {errores[:3]}")
+                if clave and not como_fragmento:
+                    print(f"'{nombre}': la app no tiene el fragmento '{clave}', se midió un rerun completo")
+                resultado[modo] = llamadas
+            resultados[nombre] = resultado
+    finally:
+        contador.desinstalar()
+        servidor.detener()
+    return resultados
+
+def mostrar(resultados):
+    for nombre, resultado in resultados.items():
+        print(f"\n{nombre}")
+        print(f"  {'función':<40} {'fragmento':>9} {'completo':>9}")
+        funciones = sorted(set(resultado["fragmento"]) | set(resultado["completo"]))
+        for funcion in funciones:
+            print(f"  {funcion:<40} {resultado['fragmento'].get(funcion, 0):9d} "
+                  f"{resultado['completo'].get(funcion, 0):9d}")
+        print(f"  {'total':<40} {sum(resultado['fragmento'].values()):9d} "
+              f"{sum(resultado['completo'].values()):9d}")
+
+def comparar(base, resultados):
+    """Regresiones [(interacción, función, llamadas base, llamadas nuevas)] de los reruns de fragmento."""
+    regresiones = []
+    for nombre, resultado in resultados.items():
+        if nombre not in base["interacciones"]:
+            print(f"Sin base para '{nombre}'")
+            continue
+        anteriores = base["interacciones"][nombre]
+        for funcion, llamadas in resultado["fragmento"].items():
+            if llamadas > anteriores.get(funcion, 0):
+                regresiones.append((nombre, funcion, anteriores.get(funcion, 0), llamadas))
+    return regresiones
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Llamadas costosas por interacción con la app.")
+    parser.add_argument("--base", default=RUTA_BASE, help="Cuentas de referencia (JSON)")
+    parser.add_argument("--actualizar", action="store_true", help="Guarda las cuentas medidas como nueva base")
+    args = parser.parse_args(argv)
+
+    resultados = ejecutar()
+    mostrar(resultados)
+    if args.actualizar:
+        documento = {
+            "meta": {"fecha": time.strftime("%Y-%m-%dT%H:%M:%S"), "sesiones": NUM_SESIONES,
+                     "nrcs_seleccion": NRCS_SELECCION},
+            "interacciones": {nombre: resultado["fragmento"] for nombre, resultado in resultados.items()},
+        }
+        with open(args.base, "w", encoding="utf-8") as f:
+            json.dump(documento, f, indent=2, ensure_ascii=False, sort_keys=True)
+        print(f"\nBase guardada en {args.base}")
+        return 0
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    regresiones = comparar(base, resultados)
+    for nombre, funcion, anterior, actual in regresiones:
+        print(f"REGRESIÓN en '{nombre}': {funcion} {anterior} -> {actual} llamadas")
+    if regresiones:
+        return 1
+    print("\nSin llamadas de más respecto a la base")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
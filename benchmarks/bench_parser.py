@@ -0,0 +1,37 @@
+# benchmarks/bench_parser.py
+#
+# Compara el parser anterior (BeautifulSoup + html.parser) contra el parser por fragmentos con lxml.
+# Uso: python -m benchmarks.bench_parser
+
+import time
+import pandas as pd
+from bs4 import BeautifulSoup
+from Funciones.data_processing import extract_table_data, extract_table_data_stream
+from benchmarks.sinteticos import generar_html_oferta
+
+def _fragmentos(contenido, tamano=64 * 1024):
+    for i in range(0, len(contenido), tamano):
+        yield contenido[i:i + tamano]
+
+def parsear_bs4(contenido):
+    soup = BeautifulSoup(contenido.decode("iso-8859-1"), "html.parser")
+    return pd.DataFrame(extract_table_data(soup))
+
+def parsear_lxml(contenido):
+    return pd.DataFrame(extract_table_data_stream(_fragmentos(contenido), "iso-8859-1"))
+
+def main():
+    for num_sesiones in [50, 5000, 50000]:
+        contenido = generar_html_oferta(num_sesiones)
+        tiempos = {}
+        resultados = {}
+        for nombre, funcion in [("bs4", parsear_bs4), ("lxml", parsear_lxml)]:
+            inicio = time.perf_counter()
+            resultados[nombre] = funcion(contenido)
+            tiempos[nombre] = time.perf_counter() - inicio
+        pd.testing.assert_frame_equal(resultados["bs4"], resultados["lxml"])
+        print(f"{num_sesiones:>6} sesiones ({len(contenido) / 1e6:5.1f} MB) | bs4: {tiempos['bs4'] * 1000:9.1f} ms | "
+              f"lxml: {tiempos['lxml'] * 1000:8.1f} ms | x{tiempos['bs4'] / tiempos['lxml']:.1f}")
+
+if __name__ == "__main__":
+    main()
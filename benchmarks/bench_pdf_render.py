@@ -0,0 +1,48 @@
+# benchmarks/bench_pdf_render.py
+#
+# Tiempo de renderizado por PDF de create_schedule_pdf, separado en la preparación de la tabla
+# (schedule_flowables: spans, Paragraphs y estilo) y el maquetado de ReportLab (doc.build).
+# Uso: python -m benchmarks.bench_pdf_render
+
+import io
+import time
+import statistics
+from Funciones.schedule import create_schedule_sheet, schedule_flowables, schedule_doc, pdf_styles
+from benchmarks.sinteticos import generar_oferta_procesada
+
+NUM_PDFS = 200
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+def _horarios(num_pdfs, nrcs_por_horario):
+    oferta = generar_oferta_procesada(num_pdfs * nrcs_por_horario * 2, semilla=nrcs_por_horario)
+    nrcs = oferta["NRC"].unique()
+    return [
+        create_schedule_sheet(oferta[oferta["NRC"].isin(nrcs[i * nrcs_por_horario:(i + 1) * nrcs_por_horario])])
+        for i in range(num_pdfs)
+    ]
+
+def main():
+    inicio = time.perf_counter()
+    pdf_styles()
+    print(f"estilos (una vez por proceso): {(time.perf_counter() - inicio) * 1000:.1f} ms\n")
+    print(f"{'NRC/horario':>11} | {'tabla p50':>9} {'p95':>7} | {'build p50':>9} {'p95':>7} | {'total p50':>9} {'p95':>7} (ms)")
+    for nrcs_por_horario in [3, 7, 12]:
+        tablas, builds, totales = [], [], []
+        for horario in _horarios(NUM_PDFS, nrcs_por_horario):
+            t0 = time.perf_counter()
+            elementos = schedule_flowables(horario, "Calendario 25 B")
+            t1 = time.perf_counter()
+            schedule_doc(io.BytesIO()).build(elementos)
+            t2 = time.perf_counter()
+            tablas.append((t1 - t0) * 1000)
+            builds.append((t2 - t1) * 1000)
+            totales.append((t2 - t0) * 1000)
+        print(f"{nrcs_por_horario:>11} | {statistics.median(tablas):9.2f} {_percentil(tablas, 95):7.2f} | "
+              f"{statistics.median(builds):9.2f} {_percentil(builds, 95):7.2f} | "
+              f"{statistics.median(totales):9.2f} {_percentil(totales, 95):7.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# benchmarks/bench_process_data.py
+#
+# Mide el ahorro de process_data_from_web en memoria frente a la ida y vuelta por datos.json.
+# Uso: python -m benchmarks.bench_process_data
+
+import os
+import json
+import time
+import tempfile
+import tracemalloc
+import pandas as pd
+from Funciones.utils import clean_days
+from Funciones.data_processing import (
+    extract_table_data_stream, filter_relevant_columns, parse_time_range, process_data_from_web
+)
+from benchmarks.sinteticos import generar_html_oferta
+
+def process_data_con_json(df, nombre_archivo):
+    """Flujo anterior: escribe la oferta con indent=4 y la vuelve a leer con pd.read_json."""
+    df = filter_relevant_columns(df).copy()
+    df.columns = ["NRC", "Materia", "Sección", "Sesión", "Hora", "Días", "Edificio", "Aula", "Profesor"]
+    df["Días"] = df["Días"].apply(clean_days)
+    df["Hora"] = df["Hora"].apply(parse_time_range)
+    expanded_data = df.explode("Días").reset_index(drop=True)
+    with open(nombre_archivo, "w", encoding="utf-8") as f:
+        json.dump(expanded_data.to_dict(orient="records"), f, ensure_ascii=False, indent=4)
+    return pd.read_json(nombre_archivo, encoding="utf-8")
+
+def _medir(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    duracion = time.perf_counter() - inicio
+    # La memoria se mide en una segunda pasada para que tracemalloc no distorsione el tiempo
+    tracemalloc.start()
+    funcion(*args)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duracion, pico, resultado
+
+def main():
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = os.path.join(directorio, "datos.json")
+        for num_sesiones in [5000, 50000]:
+            crudo = pd.DataFrame(extract_table_data_stream([generar_html_oferta(num_sesiones)], "iso-8859-1"))
+            t_json, m_json, esperado = _medir(process_data_con_json, crudo, archivo)
+            t_mem, m_mem, obtenido = _medir(process_data_from_web, crudo)
+            pd.testing.assert_frame_equal(esperado, obtenido, check_dtype=False)
+            print(f"{num_sesiones:>6} sesiones | con JSON: {t_json * 1000:8.1f} ms, pico {m_json / 1e6:6.1f} MB | "
+                  f"en memoria: {t_mem * 1000:7.1f} ms, pico {m_mem / 1e6:6.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# benchmarks/bench_schedule_sheet.py
+#
+# Compara create_schedule_sheet vectorizado contra la versión anterior con iterrows.
+# Uso: python -m benchmarks.bench_schedule_sheet
+
+import time
+import pandas as pd
+from Funciones.schedule import create_schedule_sheet
+from benchmarks.sinteticos import generar_oferta_procesada
+
+def create_schedule_sheet_iterrows(expanded_data):
+    """Implementación original fila por fila, conservada solo como referencia."""
+    hours_list = [
+        "07:00 AM - 07:59 AM", "08:00 AM - 08:59 AM", "09:00 AM - 09:59 AM", "10:00 AM - 10:59 AM",
+        "11:00 AM - 11:59 AM", "12:00 PM - 12:59 PM", "01:00 PM - 01:59 PM", "02:00 PM - 02:59 PM",
+        "03:00 PM - 03:59 PM", "04:00 PM - 04:59 PM", "05:00 PM - 05:59 PM", "06:00 PM - 06:59 PM",
+        "07:00 PM - 07:59 PM", "08:00 PM - 08:59 PM"
+    ]
+    days = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"]
+    schedule = pd.DataFrame(columns=["Hora"] + days)
+    schedule["Hora"] = hours_list
+
+    for index, row in expanded_data.iterrows():
+        for hour_range in hours_list:
+            start_hour, end_hour = [pd.to_datetime(hr, format="%I:%M %p") for hr in hour_range.split(" - ")]
+            class_start, class_end = [pd.to_datetime(hr, format="%I:%M %p") for hr in row["Hora"].split(" - ")]
+            if start_hour < class_end and class_start < end_hour:
+                day_col = row["Días"]
+
+                materia = row.get("Materia", "Información no disponible")
+                edificio = row.get("Edificio", "")
+                letra_edificio = edificio[-1] if edificio else ""
+                aula = row.get("Aula", "Información no disponible")
+                profesor = row.get("Profesor", "Información no disponible")
+
+                content = f"{materia}\n{letra_edificio} - {aula}\n{profesor}"
+
+                if pd.notna(schedule.loc[schedule["Hora"] == hour_range, day_col].values[0]):
+                    schedule.loc[schedule["Hora"] == hour_range, day_col] += "\n" + content
+                else:
+                    schedule.loc[schedule["Hora"] == hour_range, day_col] = content
+
+    return schedule
+
+def _medir(funcion, datos, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion(datos)
+    return (time.perf_counter() - inicio) / repeticiones, resultado
+
+def main():
+    for num_clases, repeticiones in [(50, 5), (5000, 1)]:
+        datos = generar_oferta_procesada(num_clases)
+        t_anterior, esperado = _medir(create_schedule_sheet_iterrows, datos, repeticiones)
+        t_nuevo, obtenido = _medir(create_schedule_sheet, datos, repeticiones * 10)
+        pd.testing.assert_frame_equal(esperado, obtenido)
+        print(f"{num_clases:>6} clases | iterrows: {t_anterior * 1000:10.1f} ms | "
+              f"vectorizado: {t_nuevo * 1000:8.2f} ms | x{t_anterior / t_nuevo:,.0f}")
+
+if __name__ == "__main__":
+    main()
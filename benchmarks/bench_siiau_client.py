@@ -0,0 +1,70 @@
+# benchmarks/bench_siiau_client.py
+#
+# Compara requests.post "suelto" (lo que hacía la app) con el cliente compartido de SIIAU contra el
+# servidor local: conexiones abiertas, tiempo con latencia, errores 503 intermitentes y respuestas estancadas.
+# Uso: python -m benchmarks.bench_siiau_client
+
+import time
+import requests
+from Funciones import siiau_client
+from Funciones.siiau_local import ServidorSIIAU, RUTA_OFERTA
+from Funciones.form_handler import build_post_data
+from Funciones.data_processing import fetch_table_data
+from benchmarks.sinteticos import generar_html_oferta
+
+PETICIONES = 50
+POST_DATA = build_post_data({"ciclop": {"value": "202520"}, "cup": {"value": "D"}, "majrp": {"value": "INCO"}})
+
+def post_suelto(url):
+    response = requests.post(url, data=POST_DATA, timeout=10)
+    response.raise_for_status()
+    return response.content
+
+def post_cliente(url, sesion):
+    return siiau_client.post(url, data=POST_DATA, sesion=sesion).content
+
+def _ronda(servidor, funcion, peticiones=PETICIONES):
+    """Devuelve (segundos, peticiones correctas, conexiones nuevas en el servidor)."""
+    url = servidor.url + RUTA_OFERTA
+    conexiones = servidor.conexiones
+    correctas = 0
+    inicio = time.perf_counter()
+    for _ in range(peticiones):
+        try:
+            funcion(url)
+            correctas += 1
+        except requests.exceptions.RequestException:
+            pass
+    return time.perf_counter() - inicio, correctas, servidor.conexiones - conexiones
+
+def _imprimir(escenario, nombre, resultado, peticiones=PETICIONES):
+    duracion, correctas, conexiones = resultado
+    print(f"{escenario:<22} {nombre:<8} {duracion:7.2f} s | {correctas:>3}/{peticiones} correctas | "
+          f"{conexiones:>3} conexiones")
+
+def main():
+    oferta = generar_html_oferta(2000)
+    print(f"Oferta de {len(oferta) / 1e6:.1f} MB, {PETICIONES} consultas por escenario\n")
+
+    with ServidorSIIAU(oferta=oferta, retraso=0.02) as servidor:
+        sesion = siiau_client.crear_sesion()
+        _imprimir("latencia 20 ms", "suelto", _ronda(servidor, post_suelto))
+        _imprimir("latencia 20 ms", "cliente", _ronda(servidor, lambda url: post_cliente(url, sesion)))
+        df = fetch_table_data(servidor.url + RUTA_OFERTA, POST_DATA)
+        print(f"{'':<22} fetch_table_data a través del cliente: {len(df)} filas")
+
+    with ServidorSIIAU(oferta=oferta, fallos=2) as servidor:
+        sesion = siiau_client.crear_sesion(backoff=0.01)
+        _imprimir("2 x 503 por consulta", "suelto", _ronda(servidor, post_suelto))
+        _imprimir("2 x 503 por consulta", "cliente", _ronda(servidor, lambda url: post_cliente(url, sesion)))
+
+    peticiones = 5
+    with ServidorSIIAU(oferta=oferta, fallos=1, lento=2.0) as servidor:
+        sesion = siiau_client.crear_sesion(backoff=0.01)
+        _imprimir("1 estancada (2 s)", "suelto", _ronda(servidor, post_suelto, peticiones), peticiones)
+        _imprimir("1 estancada (2 s)", "cliente", _ronda(
+            servidor, lambda url: siiau_client.post(url, data=POST_DATA, sesion=sesion, timeout=(1, 0.3)),
+            peticiones), peticiones)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# benchmarks/sinteticos.py
+
+import random
+import pandas as pd
+# El HTML de oferta sintético lo genera el servidor local de SIIAU; se reexporta para los benchmarks
+from Funciones.siiau_local import EDIFICIOS, generar_html_oferta
+
+DIAS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"]
+
+def _hora_12h(minutos):
+    horas, mins = divmod(minutos, 60)
+    sufijo = "AM" if horas < 12 else "PM"
+    horas = horas % 12 or 12
+    return f"{horas:02d}:{mins:02d} {sufijo}"
+
+def generar_oferta_procesada(num_sesiones, semilla=0):
+    """
+    Genera una oferta ya procesada (una fila por sesión y día) como la que devuelve process_data_from_web.
+    Cada NRC tiene dos sesiones en días distintos y cada materia tiene varias secciones.
+    """
+    rnd = random.Random(semilla)
+    filas = []
+    nrc = 200000
+    while len(filas) < num_sesiones:
+        nrc += 1
+        materia = f"MATERIA SINTETICA {nrc % max(1, num_sesiones // 20)}"
+        profesor = f"PROFESOR {rnd.randint(1, max(1, num_sesiones // 10))}"
+        inicio = rnd.randrange(7 * 60, 19 * 60, 60)
+        fin = inicio + rnd.choice([55, 115])
+        hora = f"{_hora_12h(inicio)} - {_hora_12h(fin)}"
+        for sesion, dia in enumerate(rnd.sample(DIAS, 2), start=1):
+            filas.append({
+                "NRC": nrc,
+                "Materia": materia,
+                "Sección": f"D{nrc % 30:02d}",
+                "Sesión": sesion,
+                "Hora": hora,
+                "Días": dia,
+                "Edificio": rnd.choice(EDIFICIOS),
+                "Aula": f"A{rnd.randint(1, 300):03d}",
+                "Profesor": profesor,
+            })
+    return pd.DataFrame(filas[:num_sesiones])
@@ -0,0 +1,224 @@
+# benchmarks/suite.py
+#
+# Suite de rendimiento de todo el flujo (parseo -> procesamiento -> cruces -> horario -> PDF -> estilos)
+# con ofertas sintéticas de SIIAU de distintos tamaños. Guarda los resultados como JSON y compara dos
+# ejecuciones para detectar regresiones.
+#
+# Uso:
+#   python -m benchmarks.suite ejecutar [--tamanos 50,500,5000,50000] [--salida benchmarks/baselines/local.json]
+#   python -m benchmarks.suite comparar benchmarks/baselines/base.json nuevo.json [--umbral 0.2]
+#
+# `comparar` termina con código 1 si alguna etapa es más lenta (o usa más memoria) que la base por
+# encima del umbral, para poder usarlo en CI.
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tracemalloc
+import pandas as pd
+from bs4 import BeautifulSoup
+from Funciones.data_processing import extract_table_data, extract_table_data_stream, process_data_from_web
+from Funciones.utils import crear_clases_desde_dataframe, detectar_cruces
+from Funciones.schedule import create_schedule_sheet, create_schedule_pdf
+from Funciones.section_index import IndiceSecciones
+from Diseño.styles import apply_dataframe_styles, apply_dataframe_styles_with_cruces
+from benchmarks.sinteticos import generar_html_oferta
+
+TAMANOS = [50, 500, 5000, 50000]
+NRCS_SELECCION = 8       # Tamaño de un horario típico: las etapas por estudiante se miden con esta selección
+TIEMPO_POR_ETAPA = 2.0   # Segundos de repeticiones por etapa y tamaño (como mínimo una)
+MAX_REPETICIONES = 7
+UMBRAL = 0.20
+RUTA_BASE = os.path.join(os.path.dirname(__file__), "baselines", "base.json")
+
+def _fragmentos(contenido, tamano=64 * 1024):
+    for i in range(0, len(contenido), tamano):
+        yield contenido[i:i + tamano]
+
+def _calendario(hoja):
+    """Calendario de la pestaña 2 (índice de horas, columnas de días) a partir de la hoja del horario."""
+    return hoja.set_index("Hora").fillna("")
+
+def _vista_previa(filas):
+    """Tabla de la vista previa de la pestaña 2, con las mismas columnas y orden que la app."""
+    dias_orden = {"Lunes": 0, "Martes": 1, "Miércoles": 2, "Jueves": 3, "Viernes": 4, "Sábado": 5}
+    tabla = filas[["Materia", "NRC", "Días", "Hora", "Profesor", "Edificio", "Aula"]].copy()
+    tabla["Dia_Orden"] = tabla["Días"].astype(object).map(dias_orden)
+    return tabla.sort_values(["Dia_Orden", "Hora"])
+
+# Cada etapa recibe el contexto con las salidas de las anteriores y devuelve su propia salida.
+# Las de la oferta completa crecen con el tamaño; las de la selección miden el trabajo por estudiante.
+ETAPAS = [
+    ("extract_table_data", "tabla_bs4",
+     lambda c: pd.DataFrame(extract_table_data(BeautifulSoup(c["html"].decode("iso-8859-1"), "html.parser")))),
+    ("extract_table_data_stream", "tabla",
+     lambda c: pd.DataFrame(extract_table_data_stream(_fragmentos(c["html"]), "iso-8859-1"))),
+    ("process_data_from_web", "oferta", lambda c: process_data_from_web(c["tabla"])),
+    ("crear_clases_desde_dataframe", "clases", lambda c: crear_clases_desde_dataframe(c["oferta"])),
+    ("detectar_cruces[aula]", "cruces_aula", lambda c: detectar_cruces(c["clases"], agrupar_por="aula")),
+    ("detectar_cruces", "cruces", lambda c: detectar_cruces(crear_clases_desde_dataframe(c["seleccion"]))),
+    ("create_schedule_sheet", "hoja", lambda c: create_schedule_sheet(c["seleccion"])),
+    ("create_schedule_pdf", "pdf", lambda c: create_schedule_pdf(c["hoja"], "Calendario 25 B").getvalue()),
+    ("apply_dataframe_styles", "estilo",
+     lambda c: apply_dataframe_styles(_vista_previa(c["seleccion"]), c["cruces"], c["clases_seleccion"]).to_html()),
+    ("apply_dataframe_styles_with_cruces", "estilo_calendario",
+     lambda c: apply_dataframe_styles_with_cruces(_calendario(c["hoja"]), c["cruces"], c["clases_seleccion"]).to_html()),
+]
+
+def _medir_tiempo(funcion, contexto, presupuesto):
+    """Repite la etapa hasta agotar `presupuesto` segundos (mínimo una vez). Devuelve (resultado, tiempos)."""
+    tiempos = []
+    inicio_total = time.perf_counter()
+    while True:
+        inicio = time.perf_counter()
+        resultado = funcion(contexto)
+        tiempos.append(time.perf_counter() - inicio)
+        if len(tiempos) >= MAX_REPETICIONES or time.perf_counter() - inicio_total >= presupuesto:
+            return resultado, tiempos
+
+def _medir_memoria(funcion, contexto):
+    """Pico de memoria de Python (MB) de una ejecución, medido aparte para no inflar los tiempos."""
+    tracemalloc.start()
+    try:
+        funcion(contexto)
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+def _preparar_seleccion(contexto):
+    """Selección de un estudiante (los primeros NRC de la oferta) para las etapas por estudiante."""
+    indice = IndiceSecciones(contexto["oferta"])
+    contexto["seleccion"] = indice.filas(list(indice.secciones)[:NRCS_SELECCION])
+    contexto["clases_seleccion"] = crear_clases_desde_dataframe(contexto["seleccion"])
+
+def ejecutar_tamano(num_sesiones, presupuesto=TIEMPO_POR_ETAPA, memoria=True):
+    """Mide todas las etapas con una oferta de `num_sesiones` sesiones. Devuelve {etapa: medidas}."""
+    contexto = {"html": generar_html_oferta(num_sesiones)}
+    resultados = {}
+    for nombre, salida, funcion in ETAPAS:
+        resultado, tiempos = _medir_tiempo(funcion, contexto, presupuesto)
+        contexto[salida] = resultado
+        if salida == "oferta":
+            _preparar_seleccion(contexto)
+        medidas = {
+            "mediana_s": statistics.median(tiempos),
+            "min_s": min(tiempos),
+            "repeticiones": len(tiempos),
+        }
+        if memoria:
+            medidas["pico_mb"] = _medir_memoria(funcion, contexto)
+        resultados[nombre] = medidas
+        print(f"  {nombre:<36} {medidas['mediana_s'] * 1000:10.2f} ms"
+              + (f" | pico {medidas['pico_mb']:8.2f} MB" if memoria else ""))
+    return resultados
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def ejecutar(tamanos=TAMANOS, presupuesto=TIEMPO_POR_ETAPA, memoria=True):
+    """Ejecuta la suite completa. Devuelve el documento JSON de resultados."""
+    resultados = {}
+    for num_sesiones in tamanos:
+        print(f"Oferta de {num_sesiones} sesiones")
+        for etapa, medidas in ejecutar_tamano(num_sesiones, presupuesto, memoria).items():
+            resultados[f"{etapa}/{num_sesiones}"] = medidas
+    return {
+        "meta": {
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "tamanos": list(tamanos),
+        },
+        "resultados": resultados,
+    }
+
+def comparar(base, nuevo, umbral=UMBRAL):
+    """
+    Compara dos documentos de resultados etapa por etapa.
+    Devuelve la lista de regresiones [(clave, medida, valor base, valor nuevo)] que superan el umbral.
+    Los tiempos se comparan por mediana; las medidas de menos de 1 ms o 0.1 MB no cuentan como regresión
+    porque a esa escala domina el ruido.
+    """
+    regresiones = []
+    print(f"{'etapa/tamaño':<48} {'base':>11} {'nuevo':>11} {'cambio':>8}")
+    for clave, medidas_base in base["resultados"].items():
+        medidas = nuevo["resultados"].get(clave)
+        if medidas is None:
+            continue
+        for medida, minimo, unidad, escala in (("mediana_s", 1e-3, "ms", 1000), ("pico_mb", 0.1, "MB", 1)):
+            if medida not in medidas_base or medida not in medidas:
+                continue
+            anterior, actual = medidas_base[medida], medidas[medida]
+            cambio = (actual - anterior) / anterior if anterior else 0.0
+            regresion = cambio > umbral and max(anterior, actual) >= minimo
+            if regresion:
+                regresiones.append((clave, medida, anterior, actual))
+            print(f"{clave + (' (memoria)' if medida == 'pico_mb' else ''):<48} "
+                  f"{anterior * escala:8.2f} {unidad} {actual * escala:8.2f} {unidad} {cambio:+7.0%}"
+                  + ("  <-- REGRESIÓN" if regresion else ""))
+    faltantes = sorted(set(base["resultados"]) - set(nuevo["resultados"]))
+    if faltantes:
+        print(f"Sin medir en la ejecución nueva: {', '.join(faltantes)}")
+    return regresiones
+
+def _leer(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suite de rendimiento con ofertas sintéticas de SIIAU.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    ejecutar_parser = subparsers.add_parser("ejecutar", help="Mide todas las etapas y guarda los resultados")
+    ejecutar_parser.add_argument("--tamanos", default=",".join(str(t) for t in TAMANOS),
+                                 help="Sesiones por oferta, separadas por coma")
+    ejecutar_parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto, solo se muestran)")
+    ejecutar_parser.add_argument("--presupuesto", type=float, default=TIEMPO_POR_ETAPA,
+                                 help="Segundos de repeticiones por etapa")
+    ejecutar_parser.add_argument("--sin-memoria", action="store_true", help="No mide el pico de memoria")
+    ejecutar_parser.add_argument("--comparar-con", nargs="?", const=RUTA_BASE,
+                                 help="Compara al terminar con una base (por defecto, baselines/base.json)")
+    ejecutar_parser.add_argument("--umbral", type=float, default=UMBRAL)
+
+    comparar_parser = subparsers.add_parser("comparar", help="Compara dos resultados y marca las regresiones")
+    comparar_parser.add_argument("base")
+    comparar_parser.add_argument("nuevo")
+    comparar_parser.add_argument("--umbral", type=float, default=UMBRAL,
+                                 help="Aumento relativo tolerado (0.2 = 20 %%)")
+    args = parser.parse_args(argv)
+
+    if args.comando == "ejecutar":
+        tamanos = [int(t) for t in args.tamanos.split(",") if t.strip()]
+        documento = ejecutar(tamanos, args.presupuesto, not args.sin_memoria)
+        if args.salida:
+            os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+            with open(args.salida, "w", encoding="utf-8") as f:
+                json.dump(documento, f, indent=2, ensure_ascii=False)
+            print(f"Resultados guardados en {args.salida}")
+        if not args.comparar_con:
+            return 0
+        base, nuevo = _leer(args.comparar_con), documento
+    else:
+        base, nuevo = _leer(args.base), _leer(args.nuevo)
+
+    regresiones = comparar(base, nuevo, args.umbral)
+    if regresiones:
+        print(f"{len(regresiones)} regresiones por encima del {args.umbral:.0%}")
+        return 1
+    print(f"Sin regresiones por encima del {args.umbral:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
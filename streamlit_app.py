@@ -1,6 +1,7 @@
 import os
 import json
-import base64
+import time
+import functools
 import logging
 import requests
 import pandas as pd
@@ -8,16 +9,33 @@ import streamlit as st
 from io import BytesIO
 import streamlit.components.v1 as components
 # from streamlit_pdf_viewer import pdf_viewer
-from Diseño.styles import apply_dataframe_styles, set_page_style, apply_dataframe_styles_with_cruces, get_reportlab_styles
-from Funciones.schedule import create_schedule_sheet, create_schedule_pdf
-from Funciones.data_processing import fetch_table_data, process_data_from_web, cargar_datos_desde_json, guardar_datos_local
+from Diseño.styles import apply_dataframe_styles, set_page_style, apply_dataframe_styles_with_cruces
+from Funciones.data_processing import process_data_from_web, cargar_oferta
+from Funciones.session_store import nuevo_id_sesion, ruta_sesion, guardar_datos_sesion, cargar_datos_sesion, existen_datos_sesion, eliminar_sesion
+from Funciones.offer_cache import obtener_oferta
 from Funciones.utils import detectar_cruces, crear_clases_desde_dataframe, generar_mensaje_cruces
-from Funciones.form_handler import fetch_form_options_with_descriptions, build_post_data, show_abbreviations, FORM_URL, POST_URL
+from Funciones.solver import generar_horarios, MAX_HORARIOS
+from Funciones.section_index import indice_de_oferta
+from Funciones.artifact_cache import huella_horario, obtener_artefacto, estadisticas_artefactos
+from Funciones.stage_timing import etapa, registrar, iniciar_ronda, ronda_actual, resumen
+from Funciones.session_profiler import iniciar_perfil, seccion_memoria
+from Funciones.form_handler import fetch_form_options_with_descriptions, build_post_data, show_abbreviations, precargar_carreras, FORM_URL, POST_URL
+
+# Funciones.schedule (ReportLab), Funciones.excel_export (xlsxwriter) y Funciones.batch_render (pypdf) se
+# importan donde se usan: ninguno hace falta para la pestaña 1 y cargarlos retrasaba el primer render
+# de cada worker nuevo (ver benchmarks/bench_arranque.py)
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Cada rerun es una ronda de mediciones; el panel de tiempos de la barra lateral muestra las de esta
+inicio_rerun = time.perf_counter()
+iniciar_ronda()
+# Perfilado de este rerun a pedido: ?perfil=cprofile o ?perfil=muestreo con &perfil_token=<PERFIL_TOKEN>
+# (o PERFIL_APP para todas las sesiones)
+perfil = iniciar_perfil(st.query_params.get("perfil"), st.query_params.get("perfil_token"))
+
 # --------------------------------------------------
 # INICIALIZACIÓN DEL ESTADO
 # --------------------------------------------------
@@ -35,7 +53,8 @@ def initialize_session_state():
         ]),
         'selected_options': {},
         'clases_seleccionadas': [],    # <-- Añadido para persistencia
-        'cruces_detectados': {}        # <-- Cambiado a diccionario para persistencia
+        'cruces_detectados': {},       # <-- Cambiado a diccionario para persistencia
+        'session_id': nuevo_id_sesion() # Identifica el almacenamiento propio de esta sesión
     }
     
     for key, default_value in required_keys.items():
@@ -101,26 +120,25 @@ def reset_query_state():
         ]),
         'selected_options': st.session_state.get('selected_options', {}),
         'clases_seleccionadas': [], # Restablecer
-        'cruces_detectados': {}     # Restablecer
+        'cruces_detectados': {},    # Restablecer
+        'session_id': st.session_state.get('session_id') or nuevo_id_sesion()
     }
     
     # Limpiar y reconstruir el estado
     st.session_state.clear()
     st.session_state.update(new_state)
     
-    # Limpiar archivos temporales de manera segura
+    # Limpiar solo los archivos de esta sesión
     try:
-        if os.path.exists('datos.json'):
-            os.remove('datos.json')
+        eliminar_sesion(st.session_state.session_id)
     except Exception as e:
         logger.error(f"Error al eliminar archivo temporal: {str(e)}")
         # No es crítico, podemos continuar
 
 def guardar_datos_local(data):
-    """Guarda los datos en un archivo JSON"""
+    """Guarda los datos en el almacenamiento JSON de la sesión actual"""
     try:
-        with open('datos.json', 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        guardar_datos_sesion(st.session_state.session_id, data)
     except Exception as e:
         logger.error(f"Error al guardar datos: {str(e)}")
         st.error(f"Error al guardar datos: {str(e)}")
@@ -135,22 +153,25 @@ def validate_data(df):
     if df.empty:
         raise ValueError("El DataFrame está vacío")
 
-def mostrar_opciones_pdf(schedule_df):
+def mostrar_opciones_pdf(huella, obtener_hoja):
     """Muestra opciones para ver y descargar el horario en formato PDF."""
+    from Funciones.schedule import create_schedule_pdf
     try:
-        pdf_buffer = create_schedule_pdf(
-            schedule_df,
-            st.session_state.selected_options["ciclop"]["description"]
-        )
-        pdf_buffer.seek(0) # Asegúrate de que el buffer esté al inicio para su lectura
+        # El PDF se genera una sola vez por horario (mismos NRC, ciclo y oferta), aunque lo pidan varias sesiones
+        ciclo = st.session_state.selected_options["ciclop"]["description"]
+        pdf_bytes = obtener_artefacto(huella, "pdf", lambda: create_schedule_pdf(obtener_hoja(), ciclo).getvalue())
+        if not pdf_bytes:
+            raise ValueError("El PDF generado está vacío")
+        pdf_buffer = BytesIO(pdf_bytes)
 
         # Opcion 1: Botón para descargar el PDF
         st.download_button(
             label="📄 Descargar PDF",
-            data=pdf_buffer.getvalue(), # Usar .getvalue() para obtener los bytes
+            data=pdf_bytes,
             file_name="mi_horario.pdf",
             mime="application/pdf",
-            key="download_pdf_main_tab" # Añade un key único para este botón
+            key="download_pdf_main_tab", # Añade un key único para este botón
+            on_click="ignore"
         )
 
         st.markdown("---")
@@ -187,28 +208,47 @@ with st.sidebar:
     st.markdown(f"**Versión:** {VERSION}")
     st.markdown(f"[Sitio Web]({URL_PAGINA})")
 
-# Pestañas principales
+    st.markdown("---")
+    mostrar_tiempos = st.checkbox("⏱️ Mostrar tiempos", key="mostrar_tiempos")
+    # Se llena al final del script, cuando ya se midieron todas las etapas de este rerun
+    panel_tiempos = st.empty()
+    panel_perfil = st.empty()
+
+# Pestañas principales. Con on_change="rerun" solo se ejecuta la pestaña abierta (tabN.open): cambiar de
+# pestaña es un rerun completo, así que la que se abre siempre parte del estado actual de la sesión
 tab1, tab2, tab3, tab4 = st.tabs([
     "1️⃣ Consulta Inicial", 
     "2️⃣ Selección de Materias", 
     "3️⃣ Generar Horario",
     "📢 Feedback"
-])
+], key="pestana", on_change="rerun")
 
 # --------------------------------------------------
-# Contenido de las pestañas principales
+# Regiones de las pestañas
 # --------------------------------------------------
-with tab1:
+# Cada región interactiva es un fragmento: un cambio en uno de sus widgets vuelve a ejecutar solo esa
+# región con las entradas con que se llamó, no la app entera. Lo que queda fuera (la barra lateral, su
+# panel de tiempos) se actualiza en el siguiente rerun completo. Las descargas no provocan ningún rerun.
+@st.fragment(key="consulta")
+@etapa("fragmento.consulta")
+def formulario_consulta():
+    """Pestaña 1: formulario de consulta de la oferta."""
     st.markdown("## 📋 Consulta la Oferta Académica")
     
     form_options = fetch_form_options_cached(FORM_URL)
     if not form_options:
         st.stop()
+    # Las carreras de todos los centros se descargan en segundo plano para que cambiar de centro sea inmediato
+    precargar_carreras([opt["value"] for opt in form_options.get("cup", [])])
     
+    # Al volver a la pestaña, el formulario parte de la última consulta hecha
+    previas = st.session_state.selected_options
     selected_options = {}
     for field, options in form_options.items():
         display_options = [f"{opt['value']} - {opt['description']}" for opt in options]
-        selected = st.selectbox(f"Selecciona {field.replace('p', '')}:", display_options)
+        previa = previas.get(field, {}).get("value")
+        posicion = next((i for i, opt in enumerate(options) if opt["value"] == previa), 0)
+        selected = st.selectbox(f"Selecciona {field.replace('p', '')}:", display_options, index=posicion)
         value, desc = selected.split(" - ", 1)
         selected_options[field] = {"value": value, "description": desc}
 
@@ -216,8 +256,11 @@ with tab1:
         try:
             carreras = show_abbreviations(selected_options["cup"]["value"])
             if carreras:
+                claves = list(carreras)
+                previa = previas.get("majrp", {}).get("value")
                 selected_carrera = st.selectbox("Selecciona tu carrera:", 
-                                                 [f"{k} - {v}" for k, v in carreras.items()])
+                                                 [f"{k} - {v}" for k, v in carreras.items()],
+                                                 index=claves.index(previa) if previa in claves else 0)
                 abrev, desc = selected_carrera.split(" - ", 1)
                 selected_options["majrp"] = {"value": abrev, "description": desc}
                 st.info("Asegurate de seleccionar el codigo de carrera correccto, ya que en algunos casos pueden existir mas de una clave para una misma carrera")
@@ -232,7 +275,8 @@ with tab1:
             with st.status("Consultando datos...", expanded=True) as status:
                 try:
                     post_data = build_post_data(selected_options)
-                    table_data = fetch_table_data(POST_URL, post_data)
+                    with etapa("obtener_oferta"):
+                        table_data = obtener_oferta(POST_URL, post_data)
                     
                     if table_data is not None:
                         st.session_state.query_state.update({
@@ -242,21 +286,21 @@ with tab1:
                         st.session_state.selected_options = selected_options
                         
                         # Procesar y validar datos
-                        processed_data = process_data_from_web(table_data)
+                        # La oferta se guarda en disco en segundo plano; la interfaz usa el DataFrame en memoria
+                        processed_data = process_data_from_web(
+                            table_data, ruta_sesion(st.session_state.session_id, "oferta.arrow", crear=True)
+                        )
                         validate_data(processed_data)
                         
                         st.session_state.expanded_data = processed_data
                         
                         guardar_datos_local({
-                            "oferta_academica": st.session_state.expanded_data.to_dict(orient="records"),
                             "ciclo": selected_options["ciclop"]["description"]
                         })
                         status.update(label="Consulta completada!", state="complete")
-                        
-                        st.success("""
-                        ✅ Consulta exitosa!  
-                        **Haz click en la pestaña '2️⃣ Selección de Materias'** para continuar.
-                        """)
+                        # Rerun completo para que la barra lateral muestre el ciclo consultado
+                        st.session_state.consulta_completada = True
+                        st.rerun()
                 except ValueError as e:
                     logger.error(f"Error de validación de datos: {str(e)}")
                     st.error(f"Error en los datos recibidos: {str(e)}")
@@ -267,155 +311,197 @@ with tab1:
                     logger.error(f"Error inesperado al consultar: {str(e)}")
                     st.error(f"Error al consultar: {str(e)}")
 
-with tab2:
+    if st.session_state.pop("consulta_completada", False):
+        st.success("""
+        ✅ Consulta exitosa!  
+        **Haz click en la pestaña '2️⃣ Selección de Materias'** para continuar.
+        """)
+
+@st.fragment(key="generador")
+@etapa("fragmento.generador")
+def generador_horarios(indice, selected_subjects):
+    """Pestaña 2: búsqueda de horarios sin cruces para las materias elegidas."""
+    max_horarios = st.number_input("Máximo de horarios a mostrar:", min_value=1, max_value=MAX_HORARIOS, value=10)
+    if st.button("Buscar combinaciones", key="buscar_combinaciones"):
+        st.session_state.horarios_generados = {
+            "materias": list(selected_subjects),
+            "horarios": list(generar_horarios(indice.filas_de_materias(selected_subjects), selected_subjects, max_resultados=max_horarios))
+        }
+
+    busqueda = st.session_state.get("horarios_generados")
+    if busqueda and busqueda["materias"] == list(selected_subjects):
+        if not busqueda["horarios"]:
+            st.warning("No se encontró ninguna combinación sin cruces para las materias seleccionadas.")
+        for i, horario in enumerate(busqueda["horarios"]):
+            col_desc, col_btn = st.columns([4, 1])
+            col_desc.markdown(f"**Opción {i + 1}:** " + ", ".join(f"{m} ({nrc})" for m, nrc in horario.items()))
+            if col_btn.button("Usar", key=f"usar_horario_{i}"):
+                st.session_state.query_state["selected_nrcs"] = list(horario.values())
+                datos = cargar_datos_sesion(st.session_state.session_id)
+                datos["materias_seleccionadas"] = list(selected_subjects)
+                datos["nrcs_seleccionados"] = list(horario.values())
+                guardar_datos_local(datos)
+                # Limpiar el estado de los multiselect para que tomen la nueva selección por defecto.
+                # El rerun es de la app (solo corre la pestaña abierta): los multiselect de grupos
+                # están en el fragmento de la selección, no en este
+                for materia in selected_subjects:
+                    st.session_state.pop(f"nrcs_{materia}", None)
+                st.rerun()
+
+        if busqueda["horarios"]:
+            # Todas las opciones en un solo PDF (una página por opción), renderizado en paralelo
+            if st.button("📄 Preparar PDF con todas las opciones", key="pdf_opciones"):
+                from Funciones.schedule import create_schedule_sheet
+                from Funciones.batch_render import renderizar_pdfs
+                with st.spinner("Generando PDF..."):
+                    ciclo = st.session_state.selected_options["ciclop"]["description"]
+                    hojas = [create_schedule_sheet(indice.filas(list(h.values()))) for h in busqueda["horarios"]]
+                    try:
+                        busqueda["pdf"] = renderizar_pdfs(hojas, ciclo, formato="pdf")
+                    except Exception as e:
+                        logger.error(f"Error al generar el PDF de las opciones: {str(e)}")
+                        st.error("No se pudo generar el PDF con las opciones. Intenta nuevamente.")
+            if busqueda.get("pdf"):
+                st.download_button(
+                    label="⬇️ Descargar opciones en PDF",
+                    data=busqueda["pdf"],
+                    file_name="opciones_horario.pdf",
+                    mime="application/pdf",
+                    key="download_pdf_opciones",
+                    on_click="ignore"
+                )
+
+@st.fragment(key="materias")
+@etapa("fragmento.materias")
+def seleccion_materias():
+    """Pestaña 2: materias, grupos, cruces y vista previa de la selección."""
     if not st.session_state.query_state.get('done'):
         st.warning("Primero realiza una consulta en la pestaña 'Consulta Inicial'")
-    else:
-        st.markdown("## 📚 Selección de Materias")
-        
-        if os.path.exists('datos.json'):
-            try:
-                datos = cargar_datos_desde_json()
-                st.session_state.expanded_data = pd.DataFrame(datos.get("oferta_academica", []))
-                st.session_state.query_state["selected_subjects"] = datos.get("materias_seleccionadas", [])
-                st.session_state.query_state["selected_nrcs"] = datos.get("nrcs_seleccionados", [])
-            except Exception as e:
-                logger.error(f"Error al cargar datos: {str(e)}")
-                st.error(f"Error al cargar datos guardados: {str(e)}")
-
-        # Validar datos antes de continuar
+        return
+    st.markdown("## 📚 Selección de Materias")
+    
+    # Solo se recurre al disco si la oferta no está ya en memoria
+    if st.session_state.expanded_data.empty and existen_datos_sesion(st.session_state.session_id):
         try:
-            validate_data(st.session_state.expanded_data)
-        except ValueError as e:
-            st.error(f"Error en los datos: {str(e)}")
-            st.error("Por favor, realiza una nueva consulta.")
-            st.stop()
-
-        materias = st.session_state.expanded_data["Materia"].unique()
-        selected_subjects = st.multiselect(
-            "Materias disponibles:",
-            materias,
-            default=st.session_state.query_state.get("selected_subjects", [])
-        )
+            datos = cargar_datos_sesion(st.session_state.session_id)
+            oferta = cargar_oferta(ruta_sesion(st.session_state.session_id, "oferta.arrow"))
+            if oferta is not None:
+                st.session_state.expanded_data = oferta
+            st.session_state.query_state["selected_subjects"] = datos.get("materias_seleccionadas", [])
+            st.session_state.query_state["selected_nrcs"] = datos.get("nrcs_seleccionados", [])
+        except Exception as e:
+            logger.error(f"Error al cargar datos: {str(e)}")
+            st.error(f"Error al cargar datos guardados: {str(e)}")
 
-        if selected_subjects:
-            st.session_state.query_state["selected_subjects"] = selected_subjects
-            df_filtrado = st.session_state.expanded_data[
-                st.session_state.expanded_data["Materia"].isin(selected_subjects)
-            ].copy()
-            
-            # Optimizar operaciones con el DataFrame
-            df_filtrado['Edificio_simple'] = df_filtrado['Edificio'].str[-1].fillna('')
-            
-            st.markdown("### 🔍 Grupos Disponibles")
+    # Validar datos antes de continuar
+    try:
+        validate_data(st.session_state.expanded_data)
+    except ValueError as e:
+        st.error(f"Error en los datos: {str(e)}")
+        st.error("Por favor, realiza una nueva consulta.")
+        st.stop()
+
+    # El índice de secciones se construye una sola vez por oferta cargada
+    with etapa("indice_secciones"):
+        indice = indice_de_oferta(st.session_state.expanded_data, st.session_state.get("indice_secciones"))
+    st.session_state.indice_secciones = indice
+
+    materias = indice.materias
+    selected_subjects = st.multiselect(
+        "Materias disponibles:",
+        materias,
+        default=st.session_state.query_state.get("selected_subjects", [])
+    )
+
+    if selected_subjects:
+        st.session_state.query_state["selected_subjects"] = selected_subjects
+
+        # Generador automático de horarios sin cruces
+        with st.expander("⚡ Generar horarios sin cruces automáticamente"):
+            generador_horarios(indice, selected_subjects)
 
-            all_nrcs = []
+        st.markdown("### 🔍 Grupos Disponibles")
+
+        all_nrcs = []
+        with etapa("grupos_disponibles", materias=len(selected_subjects)):
             for materia in selected_subjects:
                 with st.expander(f"📖 {materia}"):
-                    grupos = df_filtrado[df_filtrado["Materia"] == materia]
-                    
-                    # Agrupar por NRC para mostrar todos los horarios
-                    grupos_agrupados = grupos.groupby('NRC').agg({
-                        'Profesor': 'first',
-                        'Días': lambda x: ', '.join(x.astype(str)),
-                        'Hora': lambda x: ', '.join(x.astype(str)),
-                        'Edificio_simple': lambda x: ', '.join(x.astype(str)),
-                        'Aula': lambda x: ', '.join(x.astype(str))
-                    }).reset_index()
-                    
-                    # Crear descripción completa para cada NRC
-                    descripciones_nrc = []
-                    for _, row in grupos_agrupados.iterrows():
-                        nrc_info = f"{row['NRC']} | {row['Profesor']} | "
-                        
-                        # Separar los diferentes horarios
-                        dias = row['Días'].split(', ')
-                        horas = row['Hora'].split(', ')
-                        edificios = row['Edificio_simple'].split(', ')
-                        aulas = row['Aula'].split(', ')
-                        
-                        horarios = []
-                        for dia, hora, edificio, aula in zip(dias, horas, edificios, aulas):
-                            horarios.append(f"{dia} {hora} ({edificio}-{aula})")
-                        
-                        nrc_info += " | ".join(horarios)
-                        descripciones_nrc.append(nrc_info)
-                    
-                    # Mostrar multiselect con descripciones completas
+                    # Opciones y descripciones salen del índice: no se agrupa la oferta en cada rerun
+                    nrcs_materia = indice.nrcs_de(materia)
+                    nrcs_previos = set(st.session_state.query_state.get("selected_nrcs", []))
                     seleccionados = st.multiselect(
                         f"Selecciona grupos para {materia}",
-                        grupos_agrupados["NRC"].unique(),
-                        format_func=lambda x: next((n for n in descripciones_nrc if str(x) in n.split(' | ')[0]), str(x)),
+                        nrcs_materia,
+                        format_func=indice.descripcion,
                         key=f"nrcs_{materia}",
-                        default=[n for n in grupos_agrupados["NRC"] if n in st.session_state.query_state.get("selected_nrcs", [])]
+                        default=[n for n in nrcs_materia if n in nrcs_previos]
                     )
                     all_nrcs.extend(seleccionados)
-            
-            # Solo si hay NRCs seleccionados, procedemos a guardar, generar vista previa y detectar cruces
-            if all_nrcs:
-                st.session_state.query_state['selected_nrcs'] = all_nrcs
-                try:
+        
+        # Solo si hay NRCs seleccionados, procedemos a guardar, generar vista previa y detectar cruces
+        if all_nrcs:
+            st.session_state.query_state['selected_nrcs'] = all_nrcs
+            try:
+                # Solo se guarda y se recalculan clases y cruces cuando cambia la selección,
+                # no cuando el rerun lo provoca otro widget
+                seleccion = (indice, tuple(selected_subjects), tuple(all_nrcs))
+                if st.session_state.get("seleccion_procesada") != seleccion:
                     guardar_datos_local({
-                        "oferta_academica": st.session_state.expanded_data.to_dict(orient="records"),
                         "materias_seleccionadas": selected_subjects,
                         "nrcs_seleccionados": all_nrcs,
                         "ciclo": st.session_state.selected_options["ciclop"]["description"]
                     })
-                    
+
                     # --------------------------------------------------
                     # CALCULAR Y ALMACENAR CLASES SELECCIONADAS Y CRUCES EN SESSION_STATE
                     # Esto DEBE hacerse antes de la Detección de Cruces y el Calendario
                     # --------------------------------------------------
-                    st.session_state.clases_seleccionadas = crear_clases_desde_dataframe(
-                        st.session_state.expanded_data[
-                            st.session_state.expanded_data["NRC"].isin(all_nrcs)
-                        ]
-                    )
+                    st.session_state.clases_seleccionadas = crear_clases_desde_dataframe(indice.filas(all_nrcs))
                     # Asumiendo que detectar_cruces devuelve un diccionario de {dia: [(Clase, Clase), ...]}
                     st.session_state.cruces_detectados = detectar_cruces(st.session_state.clases_seleccionadas)
-
-                    # ---
-                    ### **Detección de Cruces de Horario (Sección de Mensajes)**
-                    # ---
-                    st.markdown("---")
-                    st.markdown("## 🔍 Detección de Cruces de Horario")
+                    st.session_state.seleccion_procesada = seleccion
+
+                # ---
+                ### **Detección de Cruces de Horario (Sección de Mensajes)**
+                # ---
+                st.markdown("---")
+                st.markdown("## 🔍 Detección de Cruces de Horario")
+                
+                if st.session_state.cruces_detectados:
+                    st.error("🚨 Se detectaron los siguientes conflictos de horario:")
                     
-                    if st.session_state.cruces_detectados:
-                        st.error("🚨 Se detectaron los siguientes conflictos de horario:")
-                        
-                        # --- INICIO DEL CAMBIO CLAVE ---
-                        # Usamos la función `generar_mensaje_cruces` de `Funciones/utils.py`
-                        # para obtener los mensajes ya formateados.
-                        mensajes_cruce = generar_mensaje_cruces(st.session_state.cruces_detectados)
-                        for mensaje in mensajes_cruce:
-                            st.markdown(mensaje) # Cada mensaje es una cadena de texto lista para mostrar.
-                        # --- FIN DEL CAMBIO CLAVE ---
-                        
-                        st.warning("Por favor ajusta tus selecciones para resolver los conflictos")
-                    else:
-                        st.success("""
-                        ✅ No se detectaron conflictos de horario!  
-                        **Revisa la 'Vista Previa del Horario'** y luego haz click en la pestaña '3️⃣ Generar Horario'.
-                        """)
-
-                    # --------------------------------------------------
-                    # Vista Previa y Visualización de Calendario Combinadas
-                    # --------------------------------------------------
-                    st.markdown("---")
-                    st.markdown("## 📅 Vista Previa de tu Horario")
-                    
-                    # Crear DataFrame resumen
-                    horario_preliminar = st.session_state.expanded_data[
-                        st.session_state.expanded_data["NRC"].isin(all_nrcs)
-                    ][['Materia', 'NRC', 'Días', 'Hora', 'Profesor', 'Edificio', 'Aula']]
-                    
-                    # Ordenar por días y hora para mejor visualización
-                    dias_orden = {'Lunes': 0, 'Martes': 1, 'Miércoles': 2, 
-                                  'Jueves': 3, 'Viernes': 4, 'Sábado': 5}
-                    horario_preliminar['Dia_Orden'] = horario_preliminar['Días'].map(dias_orden)
-                    horario_preliminar = horario_preliminar.sort_values(['Dia_Orden', 'Hora'])
+                    # --- INICIO DEL CAMBIO CLAVE ---
+                    # Usamos la función `generar_mensaje_cruces` de `Funciones/utils.py`
+                    # para obtener los mensajes ya formateados.
+                    mensajes_cruce = generar_mensaje_cruces(st.session_state.cruces_detectados)
+                    for mensaje in mensajes_cruce:
+                        st.markdown(mensaje) # Cada mensaje es una cadena de texto lista para mostrar.
+                    # --- FIN DEL CAMBIO CLAVE ---
                     
-                    # Mostrar tabla con estilo
+                    st.warning("Por favor ajusta tus selecciones para resolver los conflictos")
+                else:
+                    st.success("""
+                    ✅ No se detectaron conflictos de horario!  
+                    **Revisa la 'Vista Previa del Horario'** y luego haz click en la pestaña '3️⃣ Generar Horario'.
+                    """)
+
+                # --------------------------------------------------
+                # Vista Previa y Visualización de Calendario Combinadas
+                # --------------------------------------------------
+                st.markdown("---")
+                st.markdown("## 📅 Vista Previa de tu Horario")
+                
+                # Crear DataFrame resumen
+                horario_preliminar = indice.filas(all_nrcs)[['Materia', 'NRC', 'Días', 'Hora', 'Profesor', 'Edificio', 'Aula']]
+                
+                # Ordenar por días y hora para mejor visualización
+                dias_orden = {'Lunes': 0, 'Martes': 1, 'Miércoles': 2, 
+                              'Jueves': 3, 'Viernes': 4, 'Sábado': 5}
+                horario_preliminar['Dia_Orden'] = horario_preliminar['Días'].astype(object).map(dias_orden)
+                horario_preliminar = horario_preliminar.sort_values(['Dia_Orden', 'Hora'])
+                
+                # Mostrar tabla con estilo (el Styler se evalúa al serializarse en st.dataframe)
+                with etapa("estilos_vista_previa"):
                     st.dataframe(
                     apply_dataframe_styles(
                         horario_preliminar,
@@ -425,92 +511,96 @@ with tab2:
                     height=500,
                     use_container_width=True
                 )
-                    
-                    # Integración de la Visualización de Calendario
-                    st.markdown("---")
-                    st.markdown("## 🗓️ Vista Previa del Horario")
-                    try:
-                        # Definir la lista de horas fijas exactamente como en schedule.py
-                        hours_list_calendar = [
-                            "07:00 AM - 07:59 AM", "08:00 AM - 08:59 AM", "09:00 AM - 09:59 AM", "10:00 AM - 10:59 AM",
-                            "11:00 AM - 11:59 AM", "12:00 PM - 12:59 PM", "01:00 PM - 01:59 PM", "02:00 PM - 02:59 PM",
-                            "03:00 PM - 03:59 PM", "04:00 PM - 04:59 PM", "05:00 PM - 05:59 PM", "06:00 PM - 06:59 PM",
-                            "07:00 PM - 07:59 PM", "08:00 PM - 08:59 PM"
-                        ]
-                        days = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado']
-
-                        # Crear el DataFrame del calendario con horas y días fijos
-                        calendario = pd.DataFrame(index=hours_list_calendar, columns=days).fillna('')
-
-                        # Rellenar el calendario con las clases seleccionadas
-                        for clase_obj in st.session_state.clases_seleccionadas:
-                            # --- INICIO DE LA CORRECCIÓN DE DÍAS ---
-                            # Normalizar los días de la clase. Asumimos que clase_obj.dia es una cadena.
-                            # Si es un solo día (ej. "Lunes"), lo ponemos en una lista.
-                            # Si son varios días (ej. "Lunes, Miércoles"), los separamos y los ponemos en una lista.
-                            clase_dias_raw = clase_obj.dia # Obtener el atributo 'dia'
-                            
-                            # Si es una cadena, intentar dividirla por comas o slash para obtener una lista de días
-                            if isinstance(clase_dias_raw, str):
-                                if ',' in clase_dias_raw:
-                                    dias_de_esta_clase = [d.strip() for d in clase_dias_raw.split(',')]
-                                elif '/' in clase_dias_raw:
-                                    dias_de_esta_clase = [d.strip() for d in clase_dias_raw.split('/')]
-                                else:
-                                    dias_de_esta_clase = [clase_dias_raw.strip()]
-                            elif isinstance(clase_dias_raw, list): # Si ya es una lista, usarla directamente
-                                dias_de_esta_clase = [d.strip() for d in clase_dias_raw]
+                
+                # Integración de la Visualización de Calendario
+                st.markdown("---")
+                st.markdown("## 🗓️ Vista Previa del Horario")
+                try:
+                    # Definir la lista de horas fijas exactamente como en schedule.py
+                    hours_list_calendar = [
+                        "07:00 AM - 07:59 AM", "08:00 AM - 08:59 AM", "09:00 AM - 09:59 AM", "10:00 AM - 10:59 AM",
+                        "11:00 AM - 11:59 AM", "12:00 PM - 12:59 PM", "01:00 PM - 01:59 PM", "02:00 PM - 02:59 PM",
+                        "03:00 PM - 03:59 PM", "04:00 PM - 04:59 PM", "05:00 PM - 05:59 PM", "06:00 PM - 06:59 PM",
+                        "07:00 PM - 07:59 PM", "08:00 PM - 08:59 PM"
+                    ]
+                    days = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado']
+
+                    # Crear el DataFrame del calendario con horas y días fijos
+                    inicio_calendario = time.perf_counter()
+                    calendario = pd.DataFrame(index=hours_list_calendar, columns=days).fillna('')
+
+                    # Rellenar el calendario con las clases seleccionadas
+                    for clase_obj in st.session_state.clases_seleccionadas:
+                        # --- INICIO DE LA CORRECCIÓN DE DÍAS ---
+                        # Normalizar los días de la clase. Asumimos que clase_obj.dia es una cadena.
+                        # Si es un solo día (ej. "Lunes"), lo ponemos en una lista.
+                        # Si son varios días (ej. "Lunes, Miércoles"), los separamos y los ponemos en una lista.
+                        clase_dias_raw = clase_obj.dia # Obtener el atributo 'dia'
+                        
+                        # Si es una cadena, intentar dividirla por comas o slash para obtener una lista de días
+                        if isinstance(clase_dias_raw, str):
+                            if ',' in clase_dias_raw:
+                                dias_de_esta_clase = [d.strip() for d in clase_dias_raw.split(',')]
+                            elif '/' in clase_dias_raw:
+                                dias_de_esta_clase = [d.strip() for d in clase_dias_raw.split('/')]
                             else:
-                                # Manejar otros tipos de datos si es necesario (ej. si es None)
-                                dias_de_esta_clase = []
-                                st.warning(f"Formato de día inválido para la clase {clase_obj.materia}: {clase_dias_raw}")
-
-                            # --- FIN DE LA CORRECCIÓN DE DÍAS ---
-
-                            # Convertir las horas de la clase a formato de fecha y hora para comparación
-                            try:
-                                # Asumiendo que clase_obj.hora_inicio y hora_fin están en formato HH:MM (24h)
-                                # y que los rangos de hours_list_calendar están en HH:MM AM/PM
-                                class_start_dt = pd.to_datetime(clase_obj.hora_inicio, format="%H:%M")
-                                class_end_dt = pd.to_datetime(clase_obj.hora_fin, format="%H:%M")
-                            except ValueError:
-                                st.warning(f"Formato de hora inválido para la clase {clase_obj.materia}: {clase_obj.hora_inicio}-{clase_obj.hora_fin}. No se mostrará correctamente en el calendario.")
-                                continue # Saltar esta clase si las horas no son válidas
-
-                            # Iterar por cada día que realmente tiene la clase (ahora ya es una lista)
-                            for dia_clase in dias_de_esta_clase:
-                                if dia_clase in days: # Asegurarse de que el día esté en las columnas del calendario
-                                    # Iterar sobre cada intervalo de hora en el calendario
-                                    for hour_range_str in hours_list_calendar:
-                                        try:
-                                            # Convertir el rango de horas del calendario a formato de fecha y hora
-                                            interval_start_str, interval_end_str = hour_range_str.split(' - ')
-                                            interval_start_dt = pd.to_datetime(interval_start_str, format="%I:%M %p")
-                                            interval_end_dt = pd.to_datetime(interval_end_str, format="%I:%M %p")
-
-                                            # Lógica de superposición de tiempo:
-                                            # La clase se superpone con el intervalo si:
-                                            # (inicio_clase < fin_intervalo) AND (fin_clase > inicio_intervalo)
-                                            if class_start_dt < interval_end_dt and class_end_dt > interval_start_dt:
-                                                # Contenido a añadir a la celda
-                                                new_content = (
-                                                    f"{clase_obj.materia}\n"
-                                                    f"(NRC: {clase_obj.nrc})\n"
-                                                    f"({clase_obj.edificio}-{clase_obj.aula})"
-                                                )
-                                                
-                                                current_cell_content = calendario.loc[hour_range_str, dia_clase]
-                                                if pd.isna(current_cell_content) or current_cell_content == '':
-                                                    calendario.loc[hour_range_str, dia_clase] = new_content
-                                                else:
-                                                    # Si ya hay contenido, añadir un separador y el nuevo contenido
-                                                    calendario.loc[hour_range_str, dia_clase] += f"\n---\n{new_content}"
-                                        except ValueError:
-                                            # Esto puede ocurrir si un rango de hour_list_calendar no se parsea bien
-                                            st.warning(f"Error interno al parsear el intervalo de hora del calendario: {hour_range_str}")
-                                            continue
-
-                        # Mostrar el DataFrame con los estilos
+                                dias_de_esta_clase = [clase_dias_raw.strip()]
+                        elif isinstance(clase_dias_raw, list): # Si ya es una lista, usarla directamente
+                            dias_de_esta_clase = [d.strip() for d in clase_dias_raw]
+                        else:
+                            # Manejar otros tipos de datos si es necesario (ej. si es None)
+                            dias_de_esta_clase = []
+                            st.warning(f"Formato de día inválido para la clase {clase_obj.materia}: {clase_dias_raw}")
+
+                        # --- FIN DE LA CORRECCIÓN DE DÍAS ---
+
+                        # Convertir las horas de la clase a formato de fecha y hora para comparación
+                        try:
+                            # Asumiendo que clase_obj.hora_inicio y hora_fin están en formato HH:MM (24h)
+                            # y que los rangos de hours_list_calendar están en HH:MM AM/PM
+                            class_start_dt = pd.to_datetime(clase_obj.hora_inicio, format="%H:%M")
+                            class_end_dt = pd.to_datetime(clase_obj.hora_fin, format="%H:%M")
+                        except ValueError:
+                            st.warning(f"Formato de hora inválido para la clase {clase_obj.materia}: {clase_obj.hora_inicio}-{clase_obj.hora_fin}. No se mostrará correctamente en el calendario.")
+                            continue # Saltar esta clase si las horas no son válidas
+
+                        # Iterar por cada día que realmente tiene la clase (ahora ya es una lista)
+                        for dia_clase in dias_de_esta_clase:
+                            if dia_clase in days: # Asegurarse de que el día esté en las columnas del calendario
+                                # Iterar sobre cada intervalo de hora en el calendario
+                                for hour_range_str in hours_list_calendar:
+                                    try:
+                                        # Convertir el rango de horas del calendario a formato de fecha y hora
+                                        interval_start_str, interval_end_str = hour_range_str.split(' - ')
+                                        interval_start_dt = pd.to_datetime(interval_start_str, format="%I:%M %p")
+                                        interval_end_dt = pd.to_datetime(interval_end_str, format="%I:%M %p")
+
+                                        # Lógica de superposición de tiempo:
+                                        # La clase se superpone con el intervalo si:
+                                        # (inicio_clase < fin_intervalo) AND (fin_clase > inicio_intervalo)
+                                        if class_start_dt < interval_end_dt and class_end_dt > interval_start_dt:
+                                            # Contenido a añadir a la celda
+                                            new_content = (
+                                                f"{clase_obj.materia}\n"
+                                                f"(NRC: {clase_obj.nrc})\n"
+                                                f"({clase_obj.edificio}-{clase_obj.aula})"
+                                            )
+                                            
+                                            current_cell_content = calendario.loc[hour_range_str, dia_clase]
+                                            if pd.isna(current_cell_content) or current_cell_content == '':
+                                                calendario.loc[hour_range_str, dia_clase] = new_content
+                                            else:
+                                                # Si ya hay contenido, añadir un separador y el nuevo contenido
+                                                calendario.loc[hour_range_str, dia_clase] += f"\n---\n{new_content}"
+                                    except ValueError:
+                                        # Esto puede ocurrir si un rango de hour_list_calendar no se parsea bien
+                                        st.warning(f"Error interno al parsear el intervalo de hora del calendario: {hour_range_str}")
+                                        continue
+
+                    registrar("calendario", time.perf_counter() - inicio_calendario)
+
+                    # Mostrar el DataFrame con los estilos
+                    with etapa("estilos_calendario"):
                         st.dataframe(
                             apply_dataframe_styles_with_cruces(
                                 calendario.fillna(''), 
@@ -520,106 +610,135 @@ with tab2:
                             height=min(600, 50 + 45 * len(hours_list_calendar)), # Altura dinámica
                             use_container_width=True
                         )
-                    except Exception as e:
-                        st.warning(f"No se pudo generar el calendario visual. Error: {str(e)}")
-                        st.exception(e) # Mostrar la excepción completa para depuración
-                    
                 except Exception as e:
-                    logger.error(f"Error al guardar selección o generar vistas: {str(e)}")
-                    st.error(f"No se pudo guardar tu selección o generar vistas. Intenta nuevamente: {str(e)}")
-            else:
-                st.info("Selecciona al menos un grupo para ver la vista previa del horario y detectar cruces.")
+                    st.warning(f"No se pudo generar el calendario visual. Error: {str(e)}")
+                    st.exception(e) # Mostrar la excepción completa para depuración
+                
+            except Exception as e:
+                logger.error(f"Error al guardar selección o generar vistas: {str(e)}")
+                st.error(f"No se pudo guardar tu selección o generar vistas. Intenta nuevamente: {str(e)}")
+        else:
+            st.info("Selecciona al menos un grupo para ver la vista previa del horario y detectar cruces.")
+
+@st.fragment(key="excel")
+@etapa("fragmento.excel")
+def columna_excel(huella, ciclo, obtener_hoja, indice, nrcs):
+    """Pestaña 3: descarga en Excel. Marcar la oferta completa solo vuelve a ejecutar esta columna."""
+    from Funciones.excel_export import exportar_horario_excel
+    # La oferta completa (hoja extra) puede tener decenas de miles de filas: solo si se pide
+    incluir_oferta = st.checkbox("Incluir la oferta completa", key="excel_con_oferta")
+    excel_bytes = obtener_artefacto(
+        huella, "completo.xlsx" if incluir_oferta else "horario.xlsx",
+        lambda: exportar_horario_excel(
+            obtener_hoja(), ciclo, sesiones=indice.filas(nrcs),
+            oferta=st.session_state.expanded_data if incluir_oferta else None
+        )
+    )
+    st.download_button(
+        label="📊 Descargar Excel",
+        data=excel_bytes,
+        file_name="mi_horario.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        key="download_excel",
+        on_click="ignore"
+    )
 
-with tab3:
-    if not st.session_state.query_state.get('done'):
-        st.warning("Por favor completa primero la consulta en la pestaña '1️⃣ Consulta Inicial'")
-    elif not st.session_state.query_state.get('selected_nrcs'):
-        st.info("Selecciona materias y grupos en la pestaña '2️⃣ Selección de Materias'")
-    else:
-        st.markdown("## 🗓️ Vista Previa del Horario")
+# --------------------------------------------------
+# Contenido de las pestañas principales
+# --------------------------------------------------
+if tab1.open:
+    with tab1:
+        formulario_consulta()
+
+if tab2.open:
+    with tab2, seccion_memoria(perfil, "tab2"):
+        seleccion_materias()
+
+if tab3.open:
+    with tab3, seccion_memoria(perfil, "tab3"):
+        if not st.session_state.query_state.get('done'):
+            st.warning("Por favor completa primero la consulta en la pestaña '1️⃣ Consulta Inicial'")
+        elif not st.session_state.query_state.get('selected_nrcs'):
+            st.info("Selecciona materias y grupos en la pestaña '2️⃣ Selección de Materias'")
+        else:
+            st.markdown("## 🗓️ Vista Previa del Horario")
+            from Funciones.schedule import create_schedule_sheet, export_schedule_json
         
-        try:
-            # Validar datos antes de generar el horario
-            validate_data(st.session_state.expanded_data)
+            try:
+                # Validar datos antes de generar el horario
+                validate_data(st.session_state.expanded_data)
             
-            schedule_df = create_schedule_sheet(
-                st.session_state.expanded_data[
-                    st.session_state.expanded_data["NRC"].isin(st.session_state.query_state['selected_nrcs'])
-                ]
-            )
+                indice = indice_de_oferta(st.session_state.expanded_data, st.session_state.get("indice_secciones"))
+                st.session_state.indice_secciones = indice
+                nrcs = st.session_state.query_state['selected_nrcs']
+                ciclo = st.session_state.selected_options["ciclop"]["description"]
+                huella = huella_horario(nrcs, ciclo, indice.version)
+                # La hoja del horario solo se construye si falta algún archivo en la caché de artefactos
+                obtener_hoja = functools.cache(lambda: create_schedule_sheet(indice.filas(nrcs)))
             
-            pdf_buffer = mostrar_opciones_pdf(schedule_df)
+                pdf_buffer = mostrar_opciones_pdf(huella, obtener_hoja)
             
-            st.markdown("---")
-            st.markdown("### 💾 Descargar Horario")
-            col1, col2, col3 = st.columns(3)
+                st.markdown("---")
+                st.markdown("### 💾 Descargar Horario")
+                col1, col2, col3 = st.columns(3)
             
-            with col1:
-                if pdf_buffer:
+                with col1:
+                    if pdf_buffer:
+                        st.download_button(
+                            label="📄 Descargar PDF",
+                            data=pdf_buffer,
+                            file_name="mi_horario.pdf",
+                            mime="application/pdf",
+                            key="download_pdf",
+                            on_click="ignore"
+                        )
+            
+                with col2:
+                    columna_excel(huella, ciclo, obtener_hoja, indice, nrcs)
+            
+                with col3:
+                    # Materias y NRC salen de la propia selección para que el archivo dependa solo de la huella
+                    nrcs_ordenados = sorted(nrcs)
+                    materias_horario = sorted({indice.secciones[n].materia for n in nrcs if n in indice.secciones})
+                    json_bytes = obtener_artefacto(huella, "json", lambda: export_schedule_json(
+                        obtener_hoja(), materias_horario, nrcs_ordenados, ciclo
+                    ))
                     st.download_button(
-                        label="📄 Descargar PDF",
-                        data=pdf_buffer,
-                        file_name="mi_horario.pdf",
-                        mime="application/pdf",
-                        key="download_pdf"
+                        label="📝 Descargar JSON",
+                        data=json_bytes,
+                        file_name="mi_horario.json",
+                        mime="application/json",
+                        key="download_json",
+                        on_click="ignore"
                     )
             
-            with col2:
-                excel_buffer = BytesIO()
-                with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
-                    schedule_df.to_excel(writer, sheet_name='Horario', index=False)
-                excel_buffer.seek(0)
-                st.download_button(
-                    label="📊 Descargar Excel",
-                    data=excel_buffer,
-                    file_name="mi_horario.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    key="download_excel"
-                )
-            
-            with col3:
-                json_data = {
-                    "horario": schedule_df.to_dict(orient='records'),
-                    "materias": st.session_state.query_state.get("selected_subjects", []),
-                    "nrcs": st.session_state.query_state.get("selected_nrcs", []),
-                    "ciclo": st.session_state.selected_options["ciclop"]["description"]
-                }
-                json_buffer = BytesIO()
-                json_buffer.write(json.dumps(json_data, indent=2).encode('utf-8'))
-                json_buffer.seek(0)
-                st.download_button(
-                    label="📝 Descargar JSON",
-                    data=json_buffer,
-                    file_name="mi_horario.json",
-                    mime="application/json",
-                    key="download_json"
-                )
+                try:
+                    if st.session_state.get("horario_guardado") != huella:
+                        guardar_datos_local({
+                            "materias_seleccionadas": st.session_state.query_state.get("selected_subjects", []),
+                            "nrcs_seleccionados": nrcs,
+                            "horario_generado": json.loads(json_bytes)["horario"],
+                            "ciclo": ciclo
+                        })
+                        st.session_state.horario_guardado = huella
+                except Exception as e:
+                    logger.error(f"Error al guardar horario: {str(e)}")
+                    st.error("No se pudo guardar el horario generado")
             
-            try:
-                guardar_datos_local({
-                    "oferta_academica": st.session_state.expanded_data.to_dict(orient='records'),
-                    "materias_seleccionadas": st.session_state.query_state.get("selected_subjects", []),
-                    "nrcs_seleccionados": st.session_state.query_state.get("selected_nrcs", []),
-                    "horario_generado": schedule_df.to_dict(orient='records'),
-                    "ciclo": st.session_state.selected_options["ciclop"]["description"]
-                })
+            except ValueError as e:
+                st.error(f"Error en los datos: {str(e)}")
+                st.error("No se pudo generar el horario debido a problemas en los datos.")
             except Exception as e:
-                logger.error(f"Error al guardar horario: {str(e)}")
-                st.error("No se pudo guardar el horario generado")
-            
-        except ValueError as e:
-            st.error(f"Error en los datos: {str(e)}")
-            st.error("No se pudo generar el horario debido a problemas en los datos.")
-        except Exception as e:
-            logger.error(f"Error al generar el horario: {str(e)}")
-            st.error(f"Error al generar el horario: {str(e)}")
+                logger.error(f"Error al generar el horario: {str(e)}")
+                st.error(f"Error al generar el horario: {str(e)}")
 
 # --------------------------------------------------
 # Pestaña de Feedback
 # --------------------------------------------------
-with tab4:
-    st.markdown("## 📢 Feedback y Sugerencias")
-    components.iframe(form_url, height=800, scrolling=True)
+if tab4.open:
+    with tab4:
+        st.markdown("## 📢 Feedback y Sugerencias")
+        components.iframe(form_url, height=800, scrolling=True)
 
 # --------------------------------------------------
 # Footer de la aplicación
@@ -633,4 +752,47 @@ st.markdown(
     </div>
     """,
     unsafe_allow_html=True
-)
\ No newline at end of file
+)
+
+# --------------------------------------------------
+# Panel de tiempos (opcional)
+# --------------------------------------------------
+registrar("rerun", time.perf_counter() - inicio_rerun)
+if perfil is not None:
+    st.session_state.perfil_rerun = perfil.detener()
+    logger.info(f"Perfil del rerun ({st.session_state.perfil_rerun['modo']}):\n{st.session_state.perfil_rerun['resumen']}")
+if mostrar_tiempos:
+    with panel_tiempos.container():
+        estadisticas = resumen()
+        filas_tiempos = [
+            {
+                "Etapa": nombre,
+                "Este rerun (ms)": round(segundos * 1000, 1),
+                "p50 (ms)": round(estadisticas[nombre]["p50_ms"], 1),
+                "p95 (ms)": round(estadisticas[nombre]["p95_ms"], 1),
+                "n": estadisticas[nombre]["n"],
+            }
+            for nombre, segundos in ronda_actual()
+        ]
+        st.dataframe(pd.DataFrame(filas_tiempos), hide_index=True, use_container_width=True)
+        artefactos = estadisticas_artefactos()
+        st.caption(
+            f"Caché de archivos: {artefactos['tasa_aciertos']:.0%} de aciertos, "
+            f"{artefactos['entradas_memoria']} en memoria"
+        )
+
+# El último perfil se conserva en la sesión: descargarlo provoca otro rerun (que genera uno nuevo si sigue activo)
+if st.session_state.get("perfil_rerun"):
+    with panel_perfil.container():
+        resultado = st.session_state.perfil_rerun
+        st.markdown(f"**Perfil ({resultado['modo']}):** {resultado['segundos'] * 1000:.0f} ms")
+        nombre_archivo, datos_perfil = resultado["archivo"]
+        st.download_button("🔬 Descargar perfil", data=datos_perfil, file_name=nombre_archivo,
+                           mime="application/octet-stream", key="download_perfil", on_click="ignore")
+        for seccion, memoria in resultado["memoria"].items():
+            st.caption(f"Memoria {seccion}: pico {memoria['pico_mb']:.1f} MB, neto {memoria['neto_mb']:+.1f} MB")
+        with st.expander("Detalle"):
+            st.code(resultado["resumen"])
+            for seccion, memoria in resultado["memoria"].items():
+                st.markdown(f"**Reservas en {seccion}**")
+                st.dataframe(pd.DataFrame(memoria["lineas"]), hide_index=True, use_container_width=True)
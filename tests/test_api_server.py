@@ -0,0 +1,123 @@
+# tests/test_api_server.py
+#
+# La API contra el servidor local de SIIAU: ETag y 304, filtros de la oferta, errores 400/404/502 y una
+# sola consulta a SIIAU cuando llegan a la vez varias peticiones de una oferta que aún no está cargada.
+# Uso: python -m pytest tests
+
+import json
+import threading
+from collections import OrderedDict
+import pytest
+import requests
+from Funciones import api_server, form_handler, offer_cache, siiau_client
+from Funciones.api_server import ServidorAPI
+from Funciones.siiau_local import ServidorSIIAU, RUTA_FORMULARIO, RUTA_OFERTA
+
+def _nrc(nrc, materia, hora, dias):
+    return (f"<tr><td>{nrc}</td><td>I{nrc % 9000:04d}</td><td>{materia}</td><td>D01</td><td>8</td><td>40</td>"
+            f"<td>10</td><td><table><tr><td>01</td><td>{hora}</td><td>{dias}</td><td>DEDX</td><td>A001</td>"
+            f"<td>13/01/25 - 30/05/25</td></tr></table></td>"
+            f"<td><table><tr><td>01</td><td>PROFESOR DE PRUEBA</td></tr></table></td></tr>")
+
+OFERTA = "\n".join([
+    '<html><body><table border="1">',
+    '<tr><th colspan="9">OFERTA</th></tr>',
+    "<tr><th>NRC</th><th>Clave</th><th>Materia</th><th>Sec</th><th>CR</th><th>CUP</th><th>DIS</th>"
+    "<th>Ses/Hora/Días/Edif/Aula/Periodo</th><th>Ses/Profesor</th></tr>",
+    _nrc(100001, "PROGRAMACION", "0700-0855", "L . . . . ."),
+    _nrc(100002, "CALCULO", "1100-1255", ". M . . . ."),
+    _nrc(100003, "PROGRAMACION AVANZADA", "1500-1655", ". . . . V ."),
+    "</table></body></html>",
+])
+CONSULTA = "ciclo=202520&cup=D&carrera=INCO"
+
+@pytest.fixture
+def siiau(monkeypatch, tmp_path):
+    """Apunta la API a un servidor local nuevo, con la caché de ofertas vacía y reintentos rápidos."""
+    def iniciar(**kwargs):
+        servidor = ServidorSIIAU(oferta=OFERTA.encode("iso-8859-1"), **kwargs)
+        servidor.iniciar()
+        servidores.append(servidor)
+        monkeypatch.setattr(form_handler, "FORM_URL", servidor.url + RUTA_FORMULARIO)
+        monkeypatch.setattr(form_handler, "POST_URL", servidor.url + RUTA_OFERTA)
+        return servidor
+
+    servidores = []
+    monkeypatch.setattr(offer_cache, "CACHE_PATH", str(tmp_path / "ofertas.sqlite3"))
+    monkeypatch.setattr(api_server, "_ofertas", OrderedDict())
+    monkeypatch.setattr(siiau_client, "BACKOFF", 0.01)
+    siiau_client.cerrar_sesion()
+    yield iniciar
+    siiau_client.cerrar_sesion()
+    for servidor in servidores:
+        servidor.detener()
+
+@pytest.fixture
+def api():
+    with ServidorAPI() as servidor:
+        yield servidor
+
+def _get(api, ruta, **kwargs):
+    return requests.get(api.url + ruta, timeout=30, **kwargs)
+
+def _nrcs(response):
+    assert response.status_code == 200, response.text
+    return sorted({str(fila["NRC"]) for fila in response.json()})
+
+def test_etag_y_304(siiau, api):
+    servidor = siiau()
+    response = _get(api, f"/api/oferta?{CONSULTA}")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    repetida = _get(api, f"/api/oferta?{CONSULTA}", headers={"If-None-Match": etag})
+    assert repetida.status_code == 304
+    assert repetida.content == b""
+    assert servidor.peticiones == 1
+
+def test_filtros_de_la_oferta(siiau, api):
+    siiau()
+    assert _nrcs(_get(api, f"/api/oferta?{CONSULTA}")) == ["100001", "100002", "100003"]
+    assert _nrcs(_get(api, f"/api/oferta?{CONSULTA}&materia=programacion")) == ["100001", "100003"]
+    assert _nrcs(_get(api, f"/api/oferta?{CONSULTA}&nrc=100002,100003")) == ["100002", "100003"]
+    assert _nrcs(_get(api, f"/api/oferta?{CONSULTA}&dia=martes")) == ["100002"]
+    assert _nrcs(_get(api, f"/api/oferta?{CONSULTA}&desde=11:00")) == ["100002", "100003"]
+    assert _nrcs(_get(api, f"/api/oferta?{CONSULTA}&hasta=13:00")) == ["100001", "100002"]
+    assert _nrcs(_get(api, f"/api/oferta?{CONSULTA}&desde=09:00&hasta=13:00")) == ["100002"]
+
+@pytest.mark.parametrize("hora", ["24:00", "12:60", "7", "-1:00"])
+def test_hora_invalida(siiau, api, hora):
+    siiau()
+    response = _get(api, f"/api/oferta?{CONSULTA}&desde={hora}")
+    assert response.status_code == 400
+    assert "desde" in response.json()["error"]
+
+def test_nrc_desconocido(siiau, api):
+    siiau()
+    response = _get(api, f"/api/cruces?{CONSULTA}&nrcs=100001,999999")
+    assert response.status_code == 404
+    assert "999999" in response.json()["error"]
+
+def test_siiau_caido(siiau, api):
+    servidor = siiau(fallos=siiau_client.REINTENTOS + 1)
+    response = _get(api, f"/api/oferta?{CONSULTA}")
+    assert response.status_code == 502
+    assert servidor.peticiones == siiau_client.REINTENTOS + 1
+
+def test_peticiones_simultaneas_consultan_siiau_una_vez(siiau, api):
+    servidor = siiau(retraso=0.3)
+    respuestas = []
+    barrera = threading.Barrier(8)
+
+    def pedir():
+        barrera.wait()
+        respuestas.append(_get(api, f"/api/oferta?{CONSULTA}"))
+
+    hilos = [threading.Thread(target=pedir) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert [r.status_code for r in respuestas] == [200] * 8
+    assert len({json.dumps(r.json(), sort_keys=True) for r in respuestas}) == 1
+    assert servidor.peticiones == 1
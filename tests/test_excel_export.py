@@ -0,0 +1,63 @@
+# tests/test_excel_export.py
+#
+# Abre con openpyxl el libro que genera exportar_horario_excel y comprueba que las clases de varias horas
+# salen combinadas (o, con una versión de xlsxwriter no probada, escritas sin combinar).
+# Uso: python -m pytest tests
+
+import io
+import openpyxl
+import pandas as pd
+from Funciones import excel_export
+from Funciones.schedule import create_schedule_sheet, vertical_spans
+from Funciones.excel_export import exportar_horario_excel
+from benchmarks.sinteticos import generar_oferta_procesada
+
+def _libro(schedule, **kwargs):
+    return openpyxl.load_workbook(io.BytesIO(exportar_horario_excel(schedule, "Calendario 25 B", **kwargs)))
+
+def _tramos_esperados(schedule):
+    """
+    Rangos combinados esperados en la hoja "Horario" (filas y columnas de openpyxl, desde 1), calculados
+    directamente de la cuadrícula.
+    """
+    vacia = excel_export._vacia
+    dias = [c for c in schedule.columns if c != "Hora"]
+    if "Sábado" in dias and schedule["Sábado"].map(vacia).all():
+        dias.remove("Sábado")
+    filas = [fila for _, fila in schedule.iterrows() if not all(vacia(fila[d]) for d in schedule.columns[1:])]
+    columnas = [[None if vacia(fila[dia]) else str(fila[dia]) for fila in filas] for dia in dias]
+    # Fila 1 de vertical_spans = primera fila de datos (fila 4 de la hoja, tras título, subtítulo y encabezado)
+    return {
+        (inicio + 3, j + 1, fin + 3, j + 1)
+        for (j, inicio), (_, fin) in vertical_spans(columnas)
+        if columnas[j - 1][inicio - 1] is not None
+    }
+
+def test_cuadricula_con_celdas_combinadas():
+    oferta = generar_oferta_procesada(200)
+    schedule = create_schedule_sheet(oferta.iloc[:20])
+    esperados = _tramos_esperados(schedule)
+    assert esperados  # La muestra tiene clases de varias horas
+
+    libro = _libro(schedule, sesiones=oferta.iloc[:20], oferta=oferta)
+    assert libro.sheetnames == ["Horario", "Sesiones", "Oferta"]
+    hoja = libro["Horario"]
+    combinados = {(r.min_row, r.min_col, r.max_row, r.max_col) for r in hoja.merged_cells.ranges}
+    # Título y subtítulo ocupan las dos primeras filas de lado a lado
+    assert {(r0, c0) for r0, c0, _, _ in combinados if r0 <= 2} == {(1, 1), (2, 1)}
+    assert {r for r in combinados if r[0] > 2} == esperados
+    for fila, columna, _, _ in esperados:
+        assert hoja.cell(fila, columna).value
+    assert libro["Oferta"].max_row == len(oferta) + 1
+
+def test_cuadricula_sin_combinar_en_version_no_probada(monkeypatch):
+    monkeypatch.setattr(excel_export.xlsxwriter, "__version__", "99.0.0")
+    oferta = generar_oferta_procesada(200)
+    schedule = create_schedule_sheet(oferta.iloc[:20])
+
+    hoja = _libro(schedule)["Horario"]
+    combinados = [r for r in hoja.merged_cells.ranges if r.min_row > 2]
+    assert combinados == []
+    # El texto sigue en la primera celda de cada clase
+    for fila, columna, _, _ in _tramos_esperados(schedule):
+        assert hoja.cell(fila, columna).value
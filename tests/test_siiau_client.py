@@ -0,0 +1,48 @@
+# tests/test_siiau_client.py
+#
+# Comportamiento del cliente de SIIAU contra el servidor local: reintentos ante errores 503, error al
+# agotarlos, corte por timeout de lectura de una respuesta estancada y reutilización de la conexión.
+# Uso: python -m pytest tests
+
+import time
+import pytest
+import requests
+from Funciones import siiau_client
+from Funciones.siiau_local import ServidorSIIAU, RUTA_OFERTA
+from Funciones.form_handler import build_post_data
+
+POST_DATA = build_post_data({"ciclop": {"value": "202520"}, "cup": {"value": "D"}, "majrp": {"value": "INCO"}})
+
+def _post(servidor, sesion, **kwargs):
+    return siiau_client.post(servidor.url + RUTA_OFERTA, data=POST_DATA, sesion=sesion, **kwargs)
+
+def test_reintenta_los_503():
+    with ServidorSIIAU(fallos=2) as servidor:
+        response = _post(servidor, siiau_client.crear_sesion(backoff=0.01))
+        assert response.status_code == 200
+        assert b"<table" in response.content
+        assert servidor.peticiones == 3
+
+def test_falla_al_agotar_los_reintentos():
+    with ServidorSIIAU(fallos=siiau_client.REINTENTOS + 1) as servidor:
+        with pytest.raises(requests.exceptions.RequestException):
+            _post(servidor, siiau_client.crear_sesion(backoff=0.01))
+        assert servidor.peticiones == siiau_client.REINTENTOS + 1
+
+def test_corta_por_timeout_de_lectura_y_reintenta(monkeypatch):
+    monkeypatch.setattr(siiau_client, "READ_TIMEOUT", 0.2)
+    # La primera respuesta se queda callada 2 s; el cliente debe cortarla y la segunda llega bien
+    with ServidorSIIAU(fallos=1, lento=2.0) as servidor:
+        inicio = time.perf_counter()
+        response = _post(servidor, siiau_client.crear_sesion(backoff=0.01))
+        assert time.perf_counter() - inicio < 2.0
+        assert response.status_code == 200
+        assert servidor.peticiones == 2
+
+def test_reutiliza_la_conexion():
+    with ServidorSIIAU() as servidor:
+        sesion = siiau_client.crear_sesion()
+        for _ in range(5):
+            _post(servidor, sesion).content
+        assert servidor.peticiones == 5
+        assert servidor.conexiones == 1